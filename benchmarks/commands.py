@@ -0,0 +1,323 @@
+"""
+Wall time of the CLI commands against a synthetic database.
+
+Generates a database with synthetic.py (or copies one given with --db, so
+it is never modified), replaces the Gemini model with a stub that answers
+after a fixed latency, then calls each command function in cli.py as a
+logged-in user and reports the median and worst time per command. Startup
+is timed by running commands in fresh interpreters.
+
+Results can be saved and compared with a saved baseline; the comparison
+exits non-zero when a command got slower than the threshold allows:
+
+    python benchmarks/commands.py --users 100 --transactions 1000 --save benchmarks/results/baseline.json
+    python benchmarks/commands.py --users 100 --transactions 1000 --compare benchmarks/results/baseline.json
+    python benchmarks/commands.py --db big.db --latency 1.5 advice simulate_scenario
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from startup import time_command  # noqa: E402
+from synthetic import generate, CATEGORIES, INCOME_DESCRIPTIONS  # noqa: E402
+
+# Commands run in fresh interpreters for the startup figures
+STARTUP_COMMANDS = ['--help', 'logout']
+# Slowdowns below this many milliseconds are treated as noise when comparing
+NOISE_MS = 5.0
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for the Gemini model: answers every prompt plausibly after `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        keywords = {name: descriptions for name, (_, _, _, descriptions) in CATEGORIES.items()}
+        keywords.update(INCOME_DESCRIPTIONS)
+        self.keywords = {word.lower(): name for name, descriptions in keywords.items()
+                         for description in descriptions for word in description.split() if len(word) > 3}
+
+    def category(self, description):
+        words = description.lower().split()
+        return next((self.keywords[word] for word in words if word in self.keywords), 'Miscellaneous')
+
+    def generate_content(self, parts, generation_config=None, request_options=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        prompt = parts[0]
+        if 'JSON object mapping every description' in prompt:
+            return StubResponse(json.dumps({d: self.category(d) for d in json.loads(parts[1])}))
+        if 'Categorize the following transaction' in prompt:
+            return StubResponse(json.dumps({'category': self.category(parts[1])}))
+        if 'actionable advice' in prompt:
+            return StubResponse(json.dumps({'analysis': 'Spending is stable.',
+                                            'advice': ['Cut eating out', 'Automate savings']}))
+        if 'financial impact' in prompt:
+            return StubResponse(json.dumps({'analysis': 'Manageable.', 'impact': 'Savings fall slightly.'}))
+        return StubResponse('The scenario lowers your monthly net slightly.')
+
+
+class Context:
+    """Database handles and users shared by the command set-ups."""
+
+    def __init__(self):
+        from finance_manager.cli import open_db
+        from finance_manager.models import User
+        self.db = open_db()
+        users = [user_id for (user_id,) in self.db.query(User.id).order_by(User.id)]
+        self.db.commit()
+        self.user = users[0]
+        # Users whose history delete_transactions may wipe, one per run
+        self.spare_users = users[1:]
+        self.random = random.Random(0)
+
+    def log_in(self, user_id):
+        from finance_manager import session
+        session.save(session.issue(user_id, f"User {user_id}", f"user{user_id}@example.com"))
+
+    def transaction_id(self, user_id):
+        from sqlalchemy import func
+        from finance_manager.models import Transaction
+        low, high = self.db.query(func.min(Transaction.id), func.max(Transaction.id)).filter(
+            Transaction.user_id == user_id).one()
+        self.db.commit()
+        return self.random.randint(low, high)
+
+    def forget_responses(self, user_id):
+        """Drop cached AI responses so the next advice or scenario call reaches the model."""
+        from finance_manager import response_cache
+        response_cache.invalidate(self.db, user_id)
+        self.db.commit()
+
+
+def _commands():
+    """
+    name -> prepare(context), which returns (user id, stdin text, call).
+    Commands run in this order, so 'advice_cached' follows 'advice'.
+    """
+    from finance_manager import cli
+
+    def add_transaction(ctx):
+        category = ctx.random.choice(list(CATEGORIES))
+        description = ctx.random.choice(CATEGORIES[category][3])
+        # The last line answers the duplicate prompt when the same transaction comes up twice
+        return ctx.user, f"{description}\n{ctx.random.randint(100, 5000)}\nexpense\ny\n", cli.add_transaction
+
+    def transactions(ctx):
+        return ctx.user, '', cli.transactions
+
+    def search(ctx):
+        category = ctx.random.choice(list(CATEGORIES))
+        word = ctx.random.choice(CATEGORIES[category][3]).split()[0]
+        return ctx.user, '', lambda: cli.search(word[:3])
+
+    def set_budget(ctx):
+        return ctx.user, '', lambda: cli.set_budget('Food', ctx.random.randint(1000, 20000) * 100)
+
+    def advice(ctx):
+        ctx.forget_responses(ctx.user)
+        return ctx.user, '', cli.advice
+
+    def advice_cached(ctx):
+        return ctx.user, '', cli.advice
+
+    def update_transaction(ctx):
+        transaction_id = ctx.transaction_id(ctx.user)
+        return ctx.user, f"{transaction_id}\n{ctx.random.randint(100, 5000)}\n\n\n", cli.update_transaction
+
+    def delete_transactions(ctx):
+        return ctx.spare_users.pop(), '', cli.delete_transactions
+
+    def simulate_scenario(ctx):
+        ctx.forget_responses(ctx.user)
+        return ctx.user, '', lambda: cli.simulate_scenario("My rent goes up by 20%")
+
+    def report(ctx):
+        return ctx.user, '', cli.report
+
+    def simulate(ctx):
+        return ctx.user, '', lambda: cli.simulate(10, [('Car loan', 1500000)], [('Food', 20)])
+
+    return {function.__name__: function for function in (
+        add_transaction, transactions, search, set_budget, advice, advice_cached, update_transaction,
+        delete_transactions, simulate_scenario, report, simulate,
+    )}
+
+
+def run_command(ctx, prepare, runs):
+    """Wall time of `runs` calls of a command, in seconds; set-up is not timed."""
+    timings = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            user_id, stdin, call = prepare(ctx)
+            ctx.log_in(user_id)
+            saved_stdin, sys.stdin = sys.stdin, io.StringIO(stdin)
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    call()
+                    timings.append(time.perf_counter() - start)
+            finally:
+                sys.stdin = saved_stdin
+    return timings
+
+
+def summarize(timings):
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'max_ms': max(timings) * 1000,
+        'runs_ms': [t * 1000 for t in timings],
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print current against baseline medians; return the names of commands that regressed."""
+    regressions = []
+    print(f"\n{'command':24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:24} {'-':>10} {result['median_ms']:9.1f}ms {'new':>8}")
+            continue
+        old, new = before['median_ms'], result['median_ms']
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold and new - old > NOISE_MS
+        if regressed:
+            regressions.append(name)
+        print(f"{name:24} {old:9.1f}ms {new:9.1f}ms {change:+7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def positive(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('commands', nargs='*', help='Commands to time (default: all, plus startup)')
+    parser.add_argument('--db', help='Database made by synthetic.py to copy instead of generating one')
+    parser.add_argument('--users', type=positive, default=100)
+    parser.add_argument('--transactions', type=positive, default=1000, help='Transactions per generated user')
+    parser.add_argument('--runs', type=positive, default=5)
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds the stub model takes to answer')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before failing (0.2 = 20%%)')
+    options = parser.parse_args()
+    # delete_transactions empties a different spare user (any but the first) on every run
+    deletes = not options.commands or 'delete_transactions' in options.commands
+    if deletes and not options.db and options.users <= options.runs:
+        parser.error(f"delete_transactions needs --users greater than --runs (got --users {options.users} and "
+                     f"--runs {options.runs}); raise --users, lower --runs or leave delete_transactions out")
+
+    workdir = tempfile.mkdtemp(prefix='fm-bench-')
+    try:
+        path = os.path.join(workdir, 'finance_manager.db')
+        if options.db:
+            shutil.copy(options.db, path)
+        else:
+            generate(f"sqlite:///{path}", options.users, options.transactions)
+
+        # The database, caches and session token all live in workdir
+        os.chdir(workdir)
+        os.environ['FM_DATABASE_URL'] = f"sqlite:///{path}"
+        os.environ['FM_REPORT_CACHE_DIR'] = os.path.join(workdir, '.fm_cache')
+        os.environ['FM_SOCKET'] = os.path.join(workdir, 'no-daemon.sock')
+        os.environ['FM_CONFIG_DIR'] = workdir
+
+        from finance_manager import ai
+        from finance_manager.ai_client import AIClient
+        model = StubModel(options.latency)
+        # Generous rate limits: the benchmark measures the commands, not the token bucket
+        ai.client = AIClient(model, rate=1000, burst=1000)
+
+        commands = _commands()
+        selected = options.commands or list(commands) + [f"startup {c}" for c in STARTUP_COMMANDS]
+        unknown = [name for name in selected if name not in commands and not name.startswith('startup ')]
+        if unknown:
+            parser.error(f"unknown commands: {', '.join(unknown)} (choose from {', '.join(commands)})")
+
+        ctx = Context()
+        if len(ctx.spare_users) < options.runs and 'delete_transactions' in selected:
+            parser.error(f"delete_transactions needs more users than --runs: the database has "
+                         f"{len(ctx.spare_users) + 1} users and --runs is {options.runs}")
+
+        results = {}
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        for name in selected:
+            if name.startswith('startup '):
+                ctx.log_in(ctx.user)
+                timings = time_command(name[len('startup '):], workdir, env, options.runs)
+            else:
+                timings = run_command(ctx, commands[name], options.runs)
+            results[name] = summarize(timings)
+            print(f"{name:24} median {results[name]['median_ms']:8.1f} ms   worst {results[name]['max_ms']:8.1f} ms")
+        print(f"(stub model called {model.calls} times, {options.latency}s each)")
+        ctx.db.close()
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if options.save:
+        os.makedirs(os.path.dirname(os.path.abspath(options.save)), exist_ok=True)
+        with open(options.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'date': datetime.now().isoformat(timespec='seconds'),
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'db': options.db,
+                    'users': options.users,
+                    'transactions': options.transactions,
+                    'runs': options.runs,
+                    'latency': options.latency,
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"Saved results to {options.save}")
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f"\nSlower than the baseline by more than {options.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Load test for the HTTP API.
+
+Starts `serve-api` on a synthetic database (generated with synthetic.py,
+or a copy of one given with --db) with the Gemini model replaced by the
+stub from commands.py. It then runs --concurrency virtual users for
+--duration seconds. Each user keeps one connection open and loops over a
+weighted mix of requests: listing transactions, adding one, reading
+budgets, asking for advice and running a small simulation. Requests per
+second and latency percentiles are reported per endpoint.
+
+With --url an already running server is tested instead. The virtual users
+then log in as the synthetic users (password "benchmark") rather than
+using tokens minted locally; --login does the same against the
+self-started server, which puts bcrypt in the measurement.
+
+    python benchmarks/load_test.py --users 200 --transactions 500 --concurrency 200 --duration 30
+    python benchmarks/load_test.py --db big.db --concurrency 500 --latency 1.5
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --users 1000 --concurrency 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import generate, CATEGORIES, PASSWORD  # noqa: E402
+
+# Relative frequency of each request in the mix
+MIX = {
+    'GET /transactions': 40,
+    'POST /transactions': 20,
+    'GET /budgets': 20,
+    'GET /advice': 10,
+    'POST /simulate': 10,
+}
+
+
+class Connection:
+    """A keep-alive HTTP/1.1 connection sending JSON requests."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if token:
+            head += f"Authorization: Bearer {token}\r\n"
+        if data:
+            head += "Content-Type: application/json\r\n"
+        try:
+            self.writer.write(head.encode('latin-1') + b"\r\n" + data)
+            await self.writer.drain()
+            response = await self.reader.readuntil(b'\r\n\r\n')
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        lines = response.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ')[1])
+        headers = {name.strip().lower(): value.strip()
+                   for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+        payload = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, json.loads(payload) if payload else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {name: [] for name in MIX}
+        self.errors = {name: {} for name in MIX}
+
+    def record(self, name, seconds, status):
+        self.latencies[name].append(seconds)
+        if status >= 400:
+            self.errors[name][status] = self.errors[name].get(status, 0) + 1
+
+    def report(self, elapsed):
+        def percentile(values, p):
+            return sorted(values)[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"\n{'endpoint':20} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  errors")
+        for name, values in self.latencies.items():
+            if not values:
+                continue
+            errors = ', '.join(f"{status}: {count}" for status, count in sorted(self.errors[name].items())) or '-'
+            print(f"{name:20} {len(values):9} {len(values) / elapsed:8.1f} {statistics.median(values) * 1000:8.1f} "
+                  f"{percentile(values, 95):8.1f} {percentile(values, 99):8.1f} {max(values) * 1000:8.1f}  {errors}")
+        print(f"{'total':20} {total:9} {total / elapsed:8.1f}")
+
+
+def _request_for(name, rng):
+    """(method, path, body) for one request of the mix."""
+    if name == 'GET /transactions':
+        return 'GET', f"/transactions?limit={rng.choice([20, 50, 100])}", None
+    if name == 'POST /transactions':
+        category = rng.choice(list(CATEGORIES))
+        return 'POST', '/transactions', {
+            'description': rng.choice(CATEGORIES[category][3]), 'amount': rng.randint(100, 5000),
+            'type': 'expense', 'allow_duplicate': True}
+    if name == 'GET /budgets':
+        return 'GET', '/budgets', None
+    if name == 'GET /advice':
+        return 'GET', '/advice', None
+    return 'POST', '/simulate', {'salary_change': rng.choice([-10, 0, 10]), 'cuts': [{'category': 'Food', 'percent': 20}],
+                                 'paths': 1000, 'seed': rng.randint(0, 1000)}
+
+
+async def virtual_user(host, port, user_id, token, login, deadline, stats, seed):
+    rng = random.Random(seed)
+    names, weights = list(MIX), list(MIX.values())
+    connection = Connection(host, port)
+    try:
+        if login:
+            status, body = await connection.request('POST', '/login', {
+                'email': f"user{user_id}@example.com", 'password': PASSWORD})
+            if status != 200:
+                print(f"Login failed for user {user_id}: {status} {body}", file=sys.stderr)
+                return
+            token = body['token']
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = _request_for(name, rng)
+            started = time.perf_counter()
+            try:
+                status, _ = await connection.request(method, path, body, token)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                status = 599
+            stats.record(name, time.perf_counter() - started, status)
+    finally:
+        connection.close()
+
+
+async def run_load(host, port, user_ids, tokens, login, concurrency, duration):
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(
+        virtual_user(host, port, user_ids[i % len(user_ids)], tokens.get(user_ids[i % len(user_ids)]), login,
+                     deadline, stats, i)
+        for i in range(concurrency)
+    ))
+    stats.report(time.monotonic() - started)
+
+
+def wait_until_ready(host, port, server, timeout=60):
+    async def check():
+        connection = Connection(host, port)
+        try:
+            status, _ = await connection.request('GET', '/health')
+            return status == 200
+        finally:
+            connection.close()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("The API server exited during start-up.")
+        try:
+            if asyncio.run(check()):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("The API server did not start in time.")
+
+
+def serve_with_stub(port, latency):
+    """Entry point of the server subprocess: serve-api with the stub model."""
+    from commands import StubModel
+    from finance_manager import ai
+    from finance_manager.ai_client import AIClient
+    from finance_manager.server import serve
+    # Generous rate limits: the load test measures the server, not the token bucket
+    ai.client = AIClient(StubModel(latency), rate=1000, burst=1000)
+    serve('127.0.0.1', port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Test the server at this URL instead of starting one')
+    parser.add_argument('--db', help='Database made by synthetic.py to copy instead of generating one')
+    parser.add_argument('--users', type=int, default=200, help='Synthetic users (accounts the virtual users share)')
+    parser.add_argument('--transactions', type=int, default=500, help='Transactions per generated user')
+    parser.add_argument('--concurrency', type=int, default=200, help='Virtual users sending requests at once')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds the stub model takes to answer')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the self-started server')
+    parser.add_argument('--login', action='store_true', help='Log in through the API instead of minting tokens')
+    parser.add_argument('--serve-stub', action='store_true', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.serve_stub:
+        serve_with_stub(options.port, options.latency)
+        return
+
+    if options.url:
+        url = urlsplit(options.url)
+        asyncio.run(run_load(url.hostname, url.port or 80, list(range(1, options.users + 1)), {}, True,
+                             options.concurrency, options.duration))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='fm-load-')
+    server = None
+    try:
+        path = os.path.join(workdir, 'finance_manager.db')
+        if options.db:
+            shutil.copy(options.db, path)
+        else:
+            generate(f"sqlite:///{path}", options.users, options.transactions)
+
+        # The server and this process share the database URL and session secret, so tokens minted here are valid
+        os.environ.update({
+            'FM_DATABASE_URL': f"sqlite:///{path}",
+            'FM_REPORT_CACHE_DIR': os.path.join(workdir, '.fm_cache'),
+            'FM_CONFIG_DIR': workdir,
+            'PYTHONPATH': ROOT,
+        })
+        from finance_manager import session
+        from finance_manager.database import create_db_engine
+        from sqlalchemy import text
+        engine = create_db_engine(os.environ['FM_DATABASE_URL'])
+        with engine.connect() as connection:
+            users = connection.execute(text("SELECT id, name, email FROM users ORDER BY id")).all()
+        engine.dispose()
+        tokens = {} if options.login else {id: session.issue(id, name, email) for id, name, email in users}
+
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve-stub',
+                                   '--port', str(options.port), '--latency', str(options.latency)],
+                                  cwd=workdir, stdout=subprocess.DEVNULL)
+        wait_until_ready('127.0.0.1', options.port, server)
+        print(f"{options.concurrency} virtual users for {options.duration:g}s against {len(users)} accounts "
+              f"(stub model latency {options.latency}s)")
+        asyncio.run(run_load('127.0.0.1', options.port, [id for id, _, _ in users], tokens, options.login,
+                             options.concurrency, options.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
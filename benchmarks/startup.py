@@ -0,0 +1,73 @@
+"""
+Startup time of CLI commands.
+
+Each command is run in a fresh interpreter, as `fm.sh` does, by a
+logged-in user of a throwaway database in a temporary directory. Reports the median and best
+wall time per command:
+
+    python benchmarks/startup.py [--runs 10] [COMMAND ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_COMMANDS = ['--help', 'logout', 'transactions', 'budgets']
+
+# Creates the schema and a logged-in user so commands do their real work
+SETUP = """
+from finance_manager.database import init_db, SessionLocal
+from finance_manager.models import User
+from finance_manager import session
+init_db()
+db = SessionLocal()
+user = User(name='Bench', email='bench@example.com', password_hash='-')
+db.add(user)
+db.commit()
+session.save(session.issue(user.id, user.name, user.email))
+"""
+
+
+def time_run(argv, cwd, env, runs):
+    """Wall time of `runs` fresh runs of argv, in seconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_command(command, cwd, env, runs):
+    return time_run([sys.executable, '-m', 'finance_manager.main', *command.split()], cwd, env, runs)
+
+
+def report(label, timings):
+    print(f"{label:24} median {statistics.median(timings) * 1000:7.1f} ms   best {min(timings) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('commands', nargs='*', default=DEFAULT_COMMANDS)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        # Keep the benchmark's session token out of the real config directory
+        env = dict(os.environ, PYTHONPATH=ROOT, FM_CONFIG_DIR=cwd)
+        # Interpreter startup alone, the floor for every command
+        report('python -c pass', time_run([sys.executable, '-c', 'pass'], cwd, env, options.runs))
+
+        subprocess.run([sys.executable, '-c', SETUP], cwd=cwd, env=env, check=True)
+
+        for command in options.commands:
+            report(command, time_command(command, cwd, env, options.runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Synthetic SQLite databases for benchmarks.
+
+Creates users with a monthly salary, occasional side income and spending
+spread over typical categories with realistic amounts, plus monthly
+budgets, a warm category cache and the running and period totals the
+commands read. Every user's password is "benchmark".
+
+    python benchmarks/synthetic.py --users 1000 --transactions 2000 bench.db
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'benchmark'
+# bcrypt hash of PASSWORD, shared by every user: hashing per user would dominate generation time
+PASSWORD_HASH = '$2b$12$YHTB26UjeiA8exi3E4/VOubxSXSBnM0dLlIQidY1LuzauI7.faPpe'
+USER_CHUNK = 200
+
+# Category: (share of expenses, median amount in Ksh, spread, sample descriptions)
+CATEGORIES = {
+    'Food': (0.30, 450, 0.6, ['Java House lunch', 'Naivas supermarket', 'Carrefour groceries', 'KFC Westlands']),
+    'Transport': (0.20, 300, 0.7, ['Uber ride', 'Bolt trip', 'Matatu fare', 'Shell fuel']),
+    'Utilities': (0.08, 2500, 0.5, ['KPLC tokens', 'Nairobi Water bill', 'Zuku internet', 'Safaricom airtime']),
+    'Entertainment': (0.10, 1200, 0.8, ['Netflix subscription', 'Showmax', 'Cinema tickets', 'Concert tickets']),
+    'Shopping': (0.10, 2500, 0.9, ['Jumia order', 'Kilimall order', 'Mr Price clothes', 'Bata shoes']),
+    'Health': (0.05, 2000, 0.8, ['Goodlife pharmacy', 'Clinic consultation', 'Lab tests', 'Dentist visit']),
+    'Rent': (0.02, 25000, 0.3, ['Monthly rent', 'Rent payment']),
+    'Education': (0.05, 5000, 0.7, ['School fees', 'Udemy course', 'Textbooks', 'Tuition']),
+    'Transfers': (0.10, 1500, 1.0, ['Send money to family', 'M-Pesa transfer', 'Pay bill', 'Buy goods']),
+}
+INCOME_DESCRIPTIONS = {'Salary': ['Salary payment', 'Monthly salary'],
+                       'Income': ['Freelance payment', 'Side hustle income', 'Interest received']}
+
+
+def generate(url, users=100, transactions=1000, months=24, seed=0, quiet=False):
+    """
+    Fill the database at `url` (created if needed) with `users` users of
+    about `transactions` transactions each over the last `months` months.
+    """
+    os.environ['FM_DATABASE_URL'] = url
+    from sqlalchemy import insert, text
+    from finance_manager.database import create_db_engine, schema_version
+    from finance_manager.models import Base, User, Category, Transaction, Budget, CategoryCache
+    from finance_manager.cache import normalize_description
+    from finance_manager.search import create_index
+    from finance_manager.dedupe import fingerprint
+
+    engine = create_db_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        create_index(connection)
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    now = datetime.utcnow().replace(microsecond=0)
+    span = int(months * 30.4 * 86400)
+
+    with engine.begin() as connection:
+        names = list(CATEGORIES) + list(INCOME_DESCRIPTIONS)
+        connection.execute(insert(Category), [{'name': name} for name in names])
+        category_ids = dict(connection.execute(text("SELECT name, id FROM categories")).all())
+        cache = [{'description': normalize_description(description), 'category': name, 'hits': 0}
+                 for name, (_, _, _, descriptions) in CATEGORIES.items() for description in descriptions]
+        cache += [{'description': normalize_description(description), 'category': name, 'hits': 0}
+                  for name, descriptions in INCOME_DESCRIPTIONS.items() for description in descriptions]
+        connection.execute(insert(CategoryCache), cache)
+        first_user = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar() + 1
+
+    expense_names = list(CATEGORIES)
+    shares = np.array([CATEGORIES[name][0] for name in expense_names])
+    medians = np.array([CATEGORIES[name][1] for name in expense_names], dtype=float)
+    spreads = np.array([CATEGORIES[name][2] for name in expense_names])
+    expense_descriptions = [CATEGORIES[name][3] for name in expense_names]
+    expense_ids = np.array([category_ids[name] for name in expense_names])
+
+    for chunk_start in range(0, users, USER_CHUNK):
+        chunk = range(first_user + chunk_start, first_user + min(users, chunk_start + USER_CHUNK))
+        user_rows, transaction_rows, budget_rows = [], [], []
+        for user_id in chunk:
+            user_rows.append({'id': user_id, 'name': f"User {user_id}", 'email': f"user{user_id}@example.com",
+                              'password_hash': PASSWORD_HASH})
+
+            # A salary about every 30 days, different for each user
+            salary = int(rng.lognormal(np.log(80000), 0.5)) * 100
+            paydays = [now - timedelta(days=30.4 * m) for m in range(months)]
+            transaction_rows += [{'user_id': user_id, 'category_id': category_ids['Salary'], 'amount': salary,
+                                  'type': 'income', 'timestamp': payday,
+                                  'description': INCOME_DESCRIPTIONS['Salary'][m % 2]}
+                                 for m, payday in enumerate(paydays)]
+
+            count = max(0, transactions - months)
+            offsets = rng.integers(0, span, size=count)
+            side_income = rng.random(count) < 0.03
+            category = rng.choice(len(expense_names), size=count, p=shares / shares.sum())
+            amounts = np.rint(rng.lognormal(np.log(medians[category]), spreads[category]) * 100).astype(np.int64)
+            amounts[side_income] = np.rint(rng.lognormal(np.log(5000), 0.8, side_income.sum()) * 100)
+            ids = np.where(side_income, category_ids['Income'], expense_ids[category])
+            picks = rng.integers(0, 12, size=count)  # multiple of every description list's length
+            for offset, amount, category_id, income, index, pick in zip(
+                    offsets.tolist(), amounts.tolist(), ids.tolist(), side_income.tolist(), category.tolist(),
+                    picks.tolist()):
+                descriptions = INCOME_DESCRIPTIONS['Income'] if income else expense_descriptions[index]
+                transaction_rows.append({'user_id': user_id, 'category_id': category_id, 'amount': amount,
+                                         'type': 'income' if income else 'expense',
+                                         'timestamp': now - timedelta(seconds=offset),
+                                         'description': descriptions[pick % len(descriptions)]})
+
+            for name in rng.choice(expense_names, size=3, replace=False):
+                monthly = CATEGORIES[name][1] * 100 * transactions / months * CATEGORIES[name][0]
+                budget_rows.append({'user_id': user_id, 'category_id': category_ids[name],
+                                    'amount': int(round(monthly, -4)) or 100000, 'period': 'monthly'})
+
+        for row in transaction_rows:
+            row['fingerprint'] = fingerprint(row['user_id'], row['timestamp'], row['amount'], row['type'],
+                                             row['description'])
+        with engine.begin() as connection:
+            connection.execute(insert(User), user_rows)
+            connection.execute(insert(Transaction), transaction_rows)
+            connection.execute(insert(Budget), budget_rows)
+        if not quiet:
+            print(f"  {chunk_start + len(chunk)}/{users} users", end='\r', file=sys.stderr)
+
+    _rebuild_totals(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"PRAGMA user_version = {schema_version()}")
+    engine.dispose()
+    if not quiet:
+        print(f"\rGenerated {users} users and about {users * transactions} transactions "
+              f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def _rebuild_totals(engine):
+    """Recompute category_totals and period_totals from the transactions (SQLite)."""
+    buckets = {
+        'day': "date(timestamp)",
+        'week': "date(timestamp, '-' || ((CAST(strftime('%w', timestamp) AS INTEGER) + 6) % 7) || ' days')",
+        'month': "date(timestamp, 'start of month')",
+    }
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM category_totals")
+        connection.exec_driver_sql("DELETE FROM period_totals")
+        connection.exec_driver_sql("""
+            INSERT INTO category_totals (user_id, category_id, type, amount, count)
+            SELECT user_id, category_id, type, SUM(amount), COUNT(*) FROM transactions
+            GROUP BY user_id, category_id, type
+        """)
+        for period, start in buckets.items():
+            connection.exec_driver_sql(f"""
+                INSERT INTO period_totals (user_id, category_id, type, period, start, amount, count)
+                SELECT user_id, category_id, type, '{period}', {start}, SUM(amount), COUNT(*) FROM transactions
+                GROUP BY user_id, category_id, type, {start}
+            """)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=1000, help='Transactions per user')
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    if os.path.exists(options.path):
+        parser.error(f"{options.path} already exists")
+    generate(f"sqlite:///{os.path.abspath(options.path)}", options.users, options.transactions,
+             options.months, options.seed)
+
+
+if __name__ == '__main__':
+    main()
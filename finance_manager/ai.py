@@ -1,62 +1,92 @@
 import os
+import json
 
-from click import prompt
-from dotenv import load_dotenv
-import google.generativeai as genai
+from finance_manager.ai_client import AIClient
 
-# Load environment variables
-load_dotenv()
+# Created on first use so that commands which never call Gemini don't pay for
+# importing and configuring the SDK. Assign an AIClient here to use another model.
+client = None
 
-# Configure the API key
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Ask for JSON responses (equivalent to genai.GenerationConfig(response_mime_type=...))
+JSON_RESPONSE = {"response_mime_type": "application/json"}
+
+
+def get_client():
+    """Return the shared AI client, configuring Gemini the first time."""
+    global client
+    if client is None:
+        from dotenv import load_dotenv
+        import google.generativeai as genai
+
+        # Load environment variables and configure the API key
+        load_dotenv()
+        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+        # All requests go through the client for rate limiting, timeouts and retries
+        client = AIClient(genai.GenerativeModel('gemini-1.5-flash'))
+    return client
+
+
+CATEGORIZE_BATCH_PROMPT = """
+    Categorize each of the following transaction descriptions into a standard financial category (e.g., Food, Utilities, Entertainment, etc.).
+    Respond with a JSON object mapping every description, exactly as given, to its category.
+    """
 
 
 def categorize_transaction(description):
     prompt = f"Categorize the following transaction description into a standard financial category (e.g., Food, Utilities, Entertainment, etc.)."
 
     try:
-        return model.generate_content([prompt, description],
-                                      generation_config=genai.GenerationConfig(
-                                          response_mime_type="application/json"
-                                      )
-                                      )
+        return get_client().generate([prompt, description],
+                                     generation_config=JSON_RESPONSE)
     except Exception as e:
         print(f"Error categorizing transaction: {e}")
         return "Uncategorized"
 
 
-def generate_financial_advice(transactions):
-    # Summarize the transactions
-    summary = "\n".join([
-        f"{txn['type'].capitalize()}: {txn['amount']} in {txn['category']}"
-        for txn in transactions
-    ])
+def categorize_batches(batches):
+    """
+    Categorize lists of descriptions, one request per list, sent concurrently.
+
+    Returns one {description: category} dict per batch; descriptions the
+    model could not categorize map to "Uncategorized".
+    """
+    responses = get_client().generate_many([[CATEGORIZE_BATCH_PROMPT, json.dumps(batch)] for batch in batches],
+                                           generation_config=JSON_RESPONSE)
+
+    results = []
+    for batch, response in zip(batches, responses):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            result = json.loads(response.text)
+        except Exception as e:
+            print(f"Error categorizing transactions: {e}")
+            result = {}
+        if not isinstance(result, dict):
+            result = {}
+        results.append({description: result.get(description) or "Uncategorized" for description in batch})
+    return results
+
+
+def generate_financial_advice(summary):
+    # `summary` holds aggregated statistics (see finance_manager.summary), not raw transactions
 
     # Create the prompt for generating advice
     prompt = f"""
-        Analyze the following financial transactions (all amounts are in Kenyan Shillings, Ksh) and provide actionable advice to improve savings and manage expenses:
+        Analyze the following summary of financial transactions (all amounts are in Kenyan Shillings, Ksh) and provide actionable advice to improve savings and manage expenses:
         Provide your advice in bullet points.
         """
 
     try:
-        return model.generate_content([prompt, summary],
-                                      generation_config=genai.GenerationConfig(
-                                          response_mime_type="application/json"
-                                      )
-                                      )
+        return get_client().generate([prompt, summary],
+                                     generation_config=JSON_RESPONSE)
     except Exception as e:
         print(f"Error generating financial advice: {e}")
         return "No advice available at the moment."
 
-def simulate_financial_scenario(transactions, scenario):
-    summary = "\n".join([
-        f"{txn['type'].capitalize()}: {txn['amount']} in {txn['category']}"
-        for txn in transactions
-    ])
-
+def simulate_financial_scenario(summary, scenario):
     prompt = f"""
-    Given the following transactions: {summary} (all amounts are in Kenyan Shillings, Ksh), analyze the financial impact of the scenario below:
+    Given the following summary of transactions: {summary} (all amounts are in Kenyan Shillings, Ksh), analyze the financial impact of the scenario below:
     {scenario}
     Provide a detailed and clear description of the impact.
     Please generate a financial report in the following format:
@@ -67,11 +97,24 @@ def simulate_financial_scenario(transactions, scenario):
     """
 
     try:
-        return model.generate_content([prompt],
-                                      generation_config=genai.GenerationConfig(
-                                          response_mime_type="application/json"
-                                      ))
+        return get_client().generate([prompt],
+                                     generation_config=JSON_RESPONSE)
     except Exception as e:
         print(f"Error suggesting budget adjustments: {e}")
         return "No budget suggestions available."
 
+
+
+def narrate_simulation(results):
+    # `results` are the numbers from finance_manager.simulation; the model only explains them
+    prompt = """
+    Below are the results of a Monte Carlo simulation of a user's balance with and without a scenario (all amounts are in Kenyan Shillings, Ksh).
+    Explain in a short paragraph what the scenario changes and how risky it is, then give two or three practical suggestions.
+    Only use the numbers given; do not make up new ones.
+    """
+
+    try:
+        return get_client().generate([prompt, results])
+    except Exception as e:
+        print(f"Error narrating the simulation: {e}")
+        return "No narration available at the moment."
@@ -0,0 +1,114 @@
+"""
+Rate-limited, retrying client around the Gemini model.
+
+Requests share a token bucket so bursts (bulk imports, several users) stay
+within quota, each attempt has a timeout, transient failures are retried
+with jittered exponential backoff, and at most `concurrency` calls are in
+flight at once, whichever threads make them; `generate_many` runs requests
+concurrently on a thread pool of that size.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from finance_manager import profiling
+
+CONCURRENCY = int(os.getenv('FM_AI_CONCURRENCY', '4'))
+# Requests per second allowed on average, and how many may be sent in a burst
+RATE = float(os.getenv('FM_AI_RATE', '4'))
+BURST = int(os.getenv('FM_AI_BURST', '8'))
+TIMEOUT = float(os.getenv('FM_AI_TIMEOUT', '30'))
+RETRIES = int(os.getenv('FM_AI_RETRIES', '3'))
+BACKOFF = 0.5
+
+
+def retryable_errors():
+    """Transient errors worth retrying (the Google API exceptions are imported on first use)."""
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        TimeoutError,
+        ConnectionError,
+    )
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIClient:
+    def __init__(self, model, concurrency=CONCURRENCY, rate=RATE, burst=BURST, timeout=TIMEOUT, retries=RETRIES):
+        self.model = model
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.bucket = TokenBucket(rate, burst)
+        # Bounds calls made from any thread, not just the generate_many pool
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ai')
+        return self._executor
+
+    def generate(self, parts, generation_config=None):
+        """Call the model, retrying transient failures; raises the last error when all attempts fail."""
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                with self.slots:
+                    response = self.model.generate_content(parts,
+                                                           generation_config=generation_config,
+                                                           request_options={'timeout': self.timeout})
+                profiling.record_ai_call(time.perf_counter() - started, attempt + 1, response)
+                return response
+            except Exception as e:
+                if attempt == self.retries or not isinstance(e, retryable_errors()):
+                    profiling.record_ai_call(time.perf_counter() - started, attempt + 1, None)
+                    raise
+                # Full jitter keeps concurrent retries from arriving together
+                time.sleep(random.uniform(0, BACKOFF * 2 ** attempt))
+
+    def generate_many(self, requests, generation_config=None):
+        """
+        Run several requests concurrently, returning results in order.
+
+        Each result is either the model response or the exception that
+        request finally failed with.
+        """
+        def run(parts):
+            try:
+                return self.generate(parts, generation_config)
+            except Exception as e:
+                return e
+
+        return list(self.executor.map(run, requests))
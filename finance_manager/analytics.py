@@ -0,0 +1,253 @@
+"""
+Columnar cash-flow analytics.
+
+A user's transactions are loaded once into NumPy arrays (day number,
+amount in cents, category code, expense flag) and every report figure is
+computed from them in vectorized passes. Reading a million rows out of the
+database is the slow part, so the arrays are kept in a snapshot file per
+user, keyed on the user's data version: any change to their transactions
+makes the next report reload, and otherwise a report reads a few
+megabytes from disk. The daemon and the API server also keep the columns
+of the last MEMORY_SIZE users in memory. Snapshots are named after the
+database as well, so databases that share FM_REPORT_CACHE_DIR never read
+each other's. Archived transactions are only included when asked for.
+"""
+import hashlib
+import os
+import threading
+from collections import namedtuple, OrderedDict
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import cast, func, select, Date, Integer
+
+from finance_manager.models import Transaction, Category
+from finance_manager import profiling, retention
+
+SNAPSHOT_DIR = os.getenv('FM_REPORT_CACHE_DIR', '.fm_cache')
+# Rows fetched from the database cursor at a time while loading
+FETCH_SIZE = 65536
+# Users whose columns stay in memory in long-running processes
+MEMORY_SIZE = int(os.getenv('FM_REPORT_MEMORY_SIZE', '8'))
+
+Columns = namedtuple('Columns', ['day', 'amount', 'category', 'expense', 'categories'])
+"""
+day: days since 1970-01-01 (int32); amount: cents (int64); category: index
+into `categories` (int32); expense: True for expenses (bool).
+"""
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _day_number(dialect_name):
+    if dialect_name == 'sqlite':
+        return cast(func.julianday(Transaction.timestamp) - 2440587.5, Integer)
+    return cast(Transaction.timestamp, Date) - cast('1970-01-01', Date)
+
+
+def _read_columns(db, user_id, include_archive=False):
+    """Stream a user's transactions (and optionally their archive) from the database into arrays."""
+    dialect = db.get_bind().dialect
+    statement = select(
+        _day_number(dialect.name),
+        Transaction.amount,
+        Transaction.category_id,
+        cast(Transaction.type == 'expense', Integer),
+    ).where(Transaction.user_id == user_id, Transaction.timestamp.is_not(None))
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    # The DBAPI cursor hands back plain tuples, which NumPy converts far faster than Row objects
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+    finally:
+        cursor.close()
+    if include_archive:
+        chunks.append(_read_archive(db, user_id))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int64)
+
+    category_ids, codes = np.unique(data[:, 2], return_inverse=True)
+    names = dict(db.query(Category.id, Category.name).filter(Category.id.in_(category_ids.tolist())))
+    return Columns(
+        day=data[:, 0].astype(np.int32),
+        amount=data[:, 1].copy(),
+        category=codes.astype(np.int32),
+        expense=data[:, 3].astype(bool),
+        categories=[names.get(int(category_id), 'Unknown') for category_id in category_ids],
+    )
+
+
+def _read_archive(db, user_id):
+    """Archived transactions as (day, amount, category_id, expense) rows."""
+    rows = [(microseconds // 86400000000, amount, category_id, type == 'expense')
+            for _, microseconds, category_id, type, amount, *_ in retention.iter_archived(db, user_id)
+            if microseconds is not None]
+    return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+
+def _database_key(db):
+    """Short hash identifying the session's database, with relative SQLite paths made absolute."""
+    url = db.get_bind().url
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+        url = url.set(database=os.path.abspath(url.database))
+    return hashlib.sha256(url.render_as_string(hide_password=False).encode('utf-8')).hexdigest()[:16]
+
+
+def _snapshot_path(database, user_id, include_archive=False):
+    return os.path.join(SNAPSHOT_DIR, f"columns-{database}-{user_id}{'-archive' if include_archive else ''}.npz")
+
+
+def _recall(memory_key, data_version):
+    with _memory_lock:
+        entry = _memory.get(memory_key)
+        if entry is None or entry[0] != data_version:
+            return None
+        _memory.move_to_end(memory_key)
+        return entry[1]
+
+
+def _remember(memory_key, data_version, columns):
+    with _memory_lock:
+        _memory[memory_key] = (data_version, columns)
+        _memory.move_to_end(memory_key)
+        while len(_memory) > MEMORY_SIZE:
+            _memory.popitem(last=False)
+
+
+@profiling.timed('load columns')
+def load_columns(db, user, include_archive=False):
+    """Columns for a user's transactions, from memory, the snapshot file or the database."""
+    database = _database_key(db)
+    memory_key = (database, user.id, include_archive)
+    columns = _recall(memory_key, user.data_version)
+    if columns is not None:
+        return columns
+
+    path = _snapshot_path(database, user.id, include_archive)
+    columns = None
+    try:
+        with np.load(path, allow_pickle=False) as snapshot:
+            if int(snapshot['data_version']) == user.data_version:
+                columns = Columns(snapshot['day'], snapshot['amount'], snapshot['category'],
+                                  snapshot['expense'], snapshot['categories'].tolist())
+    except (OSError, KeyError, ValueError):
+        pass
+
+    if columns is None:
+        columns = _read_columns(db, user.id, include_archive)
+        os.makedirs(SNAPSHOT_DIR, mode=0o700, exist_ok=True)
+        # Unique per thread: API server threads may load the same user at once
+        temporary = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp.npz"
+        np.savez(temporary, data_version=user.data_version, day=columns.day, amount=columns.amount,
+                 category=columns.category, expense=columns.expense,
+                 categories=np.array(columns.categories, dtype=str))
+        os.replace(temporary, path)
+
+    _remember(memory_key, user.data_version, columns)
+    return columns
+
+
+def month_numbers(day):
+    """Months since 1970-01 for day numbers."""
+    return day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+
+
+def current_month():
+    """Months since 1970-01 for the current (UTC) month."""
+    today = datetime.utcnow()
+    return (today.year - 1970) * 12 + today.month - 1
+
+
+def month_label(month):
+    return str(np.datetime64(int(month), 'M'))
+
+
+def group_sum(keys, values, size):
+    """Sum `values` per integer key in [0, size); exact for totals below 2**53 cents."""
+    return np.rint(np.bincount(keys, weights=values, minlength=size)).astype(np.int64)
+
+
+def rolling_mean(values, window):
+    """Mean of each value and the window - 1 before it (fewer at the start)."""
+    totals = np.cumsum(values, dtype=np.float64)
+    totals[window:] = totals[window:] - totals[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return totals / counts
+
+
+Report = namedtuple('Report', ['months', 'categories', 'movers', 'income', 'expenses', 'count'])
+
+
+@profiling.timed('build report')
+def build_report(columns, months=12, window=3, top=5):
+    """
+    Cash-flow report over the last `months` calendar months with data.
+
+    months: (label, income, expenses, net, savings rate, rolling average of expenses)
+    categories: (name, expenses, share, transactions, monthly average), largest first
+    movers: (name, latest month, average of the `window` months before, change), largest change first
+    """
+    if not len(columns.day):
+        return None
+
+    month = month_numbers(columns.day)
+    last = int(month.max())
+    first = max(int(month.min()), last - months + 1)
+    # Earlier months still feed the rolling averages and the movers' baseline
+    start = max(int(month.min()), first - window)
+    selected = month >= start
+    index = month[selected] - start
+    size = last - start + 1
+
+    amount = columns.amount[selected]
+    expense = columns.expense[selected]
+    category = columns.category[selected]
+    income_by_month = group_sum(index, np.where(expense, 0, amount), size)
+    expense_by_month = group_sum(index, np.where(expense, amount, 0), size)
+    rolling = rolling_mean(expense_by_month, window)
+
+    shown = slice(first - start, size)
+    income = income_by_month[shown]
+    expenses = expense_by_month[shown]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        savings = np.where(income > 0, (income - expenses) / income, np.nan)
+    month_rows = [
+        (month_label(start + i), int(income_by_month[i]), int(expense_by_month[i]),
+         int(income_by_month[i] - expense_by_month[i]), float(savings[i - shown.start]), float(rolling[i]))
+        for i in range(shown.start, size)
+    ]
+
+    # Expenses per category within the report period
+    in_period = expense & (index >= shown.start)
+    n_categories = len(columns.categories)
+    by_category = group_sum(category[in_period], amount[in_period], n_categories)
+    counts = np.bincount(category[in_period], minlength=n_categories)
+    total_expenses = int(expenses.sum())
+    order = np.argsort(-by_category, kind='stable')
+    category_rows = [
+        (columns.categories[c], int(by_category[c]), by_category[c] / total_expenses if total_expenses else 0.0,
+         int(counts[c]), by_category[c] / len(income))
+        for c in order if counts[c]
+    ]
+
+    # Latest month against the average of the months before it, per category
+    matrix_keys = index[expense] * n_categories + category[expense]
+    matrix = group_sum(matrix_keys, amount[expense], size * n_categories).reshape(size, n_categories)
+    latest = matrix[-1]
+    previous = matrix[max(0, size - 1 - window):size - 1]
+    baseline = previous.mean(axis=0) if len(previous) else np.zeros(n_categories)
+    change = latest - baseline
+    movers = [
+        (columns.categories[c], int(latest[c]), float(baseline[c]), float(change[c]))
+        for c in np.argsort(-np.abs(change), kind='stable')[:top] if change[c]
+    ]
+
+    return Report(month_rows, category_rows, movers, int(income.sum()), total_expenses,
+                  int(np.count_nonzero(index >= shown.start)))
@@ -0,0 +1,79 @@
+"""
+Budget periods.
+
+A budget applies to the current week (from Monday), the current calendar
+month, or a custom range of days. Spending in a period is read from the
+day/week/month buckets in period_totals, so checking a budget reads a row
+or a few rows however many transactions the user has.
+"""
+from datetime import datetime, timedelta
+
+from finance_manager import queries
+from finance_manager.totals import bucket_start, spent_between, next_month
+
+PERIODS = ('weekly', 'monthly', 'custom')
+
+
+def today():
+    """Current day in the timezone transactions are stamped in (UTC)."""
+    return datetime.utcnow().date()
+
+
+def period_bounds(budget, day):
+    """
+    (start, end) of the budget's period containing `day`, end exclusive.
+    A custom period is its own range whatever the day; None if it has no dates.
+    """
+    if budget.period == 'custom':
+        if budget.starts_on is None or budget.ends_on is None:
+            return None
+        return budget.starts_on, budget.ends_on + timedelta(days=1)
+    if budget.period == 'weekly':
+        start = bucket_start('week', day)
+        return start, start + timedelta(weeks=1)
+    start = bucket_start('month', day)
+    return start, next_month(start)
+
+
+def describe_period(budget, bounds):
+    """Short label such as '2026-10', 'week of 2026-10-12' or '2026-10-01 to 2026-12-31'."""
+    if bounds is None:
+        return budget.period
+    if budget.period == 'custom':
+        return f"{budget.starts_on:%Y-%m-%d} to {budget.ends_on:%Y-%m-%d}"
+    if budget.period == 'weekly':
+        return f"week of {bounds[0]:%Y-%m-%d}"
+    return f"{bounds[0]:%Y-%m}"
+
+
+def spent_in_period(db, budget, day):
+    """Expenses in cents in the budget's period containing `day`, or None when no period contains it."""
+    bounds = period_bounds(budget, day)
+    if bounds is None or not bounds[0] <= day < bounds[1]:
+        return None
+    return spent_between(db, budget.user_id, [budget.category_id], *bounds).get(budget.category_id, 0)
+
+
+def overview(db, user_id, day):
+    """
+    (category, period label, budget, spent) for each of a user's budgets,
+    with spending in the period containing `day`.
+
+    Budgets sharing a period (all weekly, all monthly, each custom range)
+    are summed in one query.
+    """
+    budgets = queries.budgets_with_category(db, user_id).all()
+
+    groups = {}
+    for budget, _ in budgets:
+        bounds = period_bounds(budget, day)
+        if bounds is not None:
+            groups.setdefault(bounds, []).append(budget.category_id)
+    spent = {bounds: spent_between(db, user_id, category_ids, *bounds) for bounds, category_ids in groups.items()}
+
+    rows = []
+    for budget, category in budgets:
+        bounds = period_bounds(budget, day)
+        amount = spent[bounds].get(budget.category_id, 0) if bounds is not None else 0
+        rows.append((category, describe_period(budget, bounds), budget.amount, amount))
+    return rows
@@ -0,0 +1,122 @@
+import re
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import insert
+
+from finance_manager.models import CategoryCache
+
+# Number of descriptions kept in the in-process LRU layer
+CACHE_SIZE = 4096
+
+_TOKEN = re.compile(r"[a-z][a-z&']*")
+
+
+def normalize_description(description):
+    """
+    Reduce a description to its merchant words so recurring payments share a key.
+
+    'NAIVAS Supermarket #0231' and 'naivas supermarket 0412' both become
+    'naivas supermarket': case, punctuation and reference numbers are dropped.
+    """
+    key = " ".join(_TOKEN.findall(description.lower()))
+    return key[:255] or description.strip().lower()[:255]
+
+
+class CacheStats:
+    def __init__(self):
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.db_hits
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self):
+        return (f"{self.hits} hits ({self.memory_hits} memory, {self.db_hits} database), "
+                f"{self.misses} misses, {self.hit_rate:.0%} hit rate")
+
+
+class DescriptionCache:
+    """Description -> category cache: an in-process LRU in front of the category_cache table."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.stats = CacheStats()
+        # The LRU is shared by the API server's worker threads; database work happens outside the lock
+        self.lock = threading.Lock()
+
+    def _remember(self, key, category):
+        with self.lock:
+            self.entries[key] = category
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_many(self, db, descriptions):
+        """Return {description: category} for every description that is cached."""
+        found = {}
+        pending = {}
+        with self.lock:
+            for description in descriptions:
+                key = normalize_description(description)
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[description] = self.entries[key]
+                    self.stats.memory_hits += 1
+                else:
+                    pending.setdefault(key, []).append(description)
+
+        if pending:
+            rows = db.query(CategoryCache.description, CategoryCache.category).filter(
+                CategoryCache.description.in_(list(pending))
+            ).all()
+            for key, category in rows:
+                self._remember(key, category)
+                for description in pending.pop(key):
+                    found[description] = category
+                    self.stats.db_hits += 1
+            if rows:
+                db.query(CategoryCache).filter(
+                    CategoryCache.description.in_([key for key, _ in rows])
+                ).update({CategoryCache.hits: CategoryCache.hits + 1}, synchronize_session=False)
+
+        self.stats.misses += sum(len(items) for items in pending.values())
+        return found
+
+    def get(self, db, description):
+        return self.get_many(db, [description]).get(description)
+
+    def put_many(self, db, categories):
+        """Cache {description: category}; the rows are committed with the caller's transaction."""
+        new = {}
+        for description, category in categories.items():
+            if not category or category == "Uncategorized":
+                continue
+            key = normalize_description(description)
+            if key not in self.entries:
+                new[key] = category
+            self._remember(key, category)
+
+        if new:
+            existing = {key for key, in db.query(CategoryCache.description).filter(
+                CategoryCache.description.in_(list(new))
+            )}
+            rows = [{'description': key, 'category': category, 'hits': 0}
+                    for key, category in new.items() if key not in existing]
+            if rows:
+                db.execute(insert(CategoryCache), rows)
+
+    def put(self, db, description, category):
+        self.put_many(db, {description: category})
+
+
+description_cache = DescriptionCache()
+
@@ -0,0 +1,95 @@
+import json
+import os
+
+from finance_manager.ai import categorize_transaction, categorize_batches
+from finance_manager.cache import description_cache, normalize_description
+from finance_manager.classifier import get_classifier, CONFIDENCE_THRESHOLD
+from finance_manager import profiling
+
+# 'hybrid' asks Gemini only when the local classifier is unsure,
+# 'local' never leaves the machine and 'llm' always asks Gemini.
+MODE = os.getenv('FM_CATEGORIZER', 'hybrid')
+
+
+def _local_guess(db, description):
+    if MODE == 'llm':
+        return None, 0.0
+    with profiling.phase('local classifier'):
+        return get_classifier(db).predict(description)
+
+
+def _remember(db, categories):
+    description_cache.put_many(db, categories)
+    classifier = get_classifier(db)
+    for description, category in categories.items():
+        classifier.learn(description, category)
+
+
+@profiling.timed('categorize')
+def categorize(db, description):
+    """
+    Return the category for a description.
+
+    Cached descriptions are answered directly, then the local classifier is
+    tried; Gemini is only asked when the classifier is not confident. If
+    Gemini fails, the classifier's best guess is used so nothing is lost.
+    """
+    category = description_cache.get(db, description)
+    if category:
+        return category
+
+    guess, confidence = _local_guess(db, description)
+    if guess and (confidence >= CONFIDENCE_THRESHOLD or MODE == 'local'):
+        return guess
+    if MODE == 'local':
+        return "Uncategorized"
+
+    db.commit()  # don't hold a database transaction (and its lock) open during the Gemini call
+    response = categorize_transaction(description)
+    try:
+        category = json.loads(response.text).get("category")
+    except (json.JSONDecodeError, AttributeError):
+        category = None
+
+    if category:
+        _remember(db, {description: category})
+        return category
+    return guess or "Uncategorized"
+
+
+@profiling.timed('categorize')
+def categorize_many(db, descriptions, batch_size):
+    """Categorize distinct descriptions, sending only uncertain cache misses to the model in batches."""
+    unique = list(dict.fromkeys(descriptions))
+    categories = description_cache.get_many(db, unique)
+
+    # Descriptions that normalize to the same key only need to be sent once
+    guesses = {}
+    missing = {}
+    for description in unique:
+        if description in categories:
+            continue
+        guess, confidence = _local_guess(db, description)
+        if guess and (confidence >= CONFIDENCE_THRESHOLD or MODE == 'local'):
+            categories[description] = guess
+        elif MODE == 'local':
+            categories[description] = "Uncategorized"
+        else:
+            guesses[description] = guess
+            missing.setdefault(normalize_description(description), []).append(description)
+
+    # Batches are sent concurrently; the AI client keeps them within the rate limit
+    keys = list(missing)
+    batches = [[missing[key][0] for key in keys[start:start + batch_size]]
+               for start in range(0, len(keys), batch_size)]
+    if batches:
+        db.commit()  # don't hold a database transaction (and its lock) open during the Gemini calls
+    for batch in categorize_batches(batches):
+        _remember(db, batch)
+        for description, category in batch.items():
+            for same in missing[normalize_description(description)]:
+                if category == "Uncategorized" and guesses.get(same):
+                    categories[same] = guesses[same]
+                else:
+                    categories[same] = category
+    return categories
@@ -0,0 +1,115 @@
+import math
+import os
+import threading
+
+from sqlalchemy import func
+
+from finance_manager.models import Category, CategoryCache, Transaction
+from finance_manager.cache import normalize_description
+
+# Predictions at or above this probability are trusted without asking the model
+CONFIDENCE_THRESHOLD = float(os.getenv('FM_CLASSIFIER_THRESHOLD', '0.8'))
+# Additive smoothing for unseen features
+ALPHA = 0.1
+
+
+def features(description):
+    """Word unigrams and bigrams of the normalized description."""
+    tokens = normalize_description(description).split()
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+class LocalClassifier:
+    """
+    Multinomial naive Bayes over description n-grams.
+
+    The index maps each feature to the categories it was seen with, so a
+    prediction only touches the handful of features in the description.
+    """
+
+    def __init__(self):
+        self.categories = []
+        self.category_index = {}
+        self.doc_counts = []
+        self.feature_totals = []
+        self.index = {}
+
+    def _category(self, name):
+        if name not in self.category_index:
+            self.category_index[name] = len(self.categories)
+            self.categories.append(name)
+            self.doc_counts.append(0)
+            self.feature_totals.append(0)
+        return self.category_index[name]
+
+    def learn(self, description, category, weight=1):
+        if not category or category == "Uncategorized":
+            return
+        c = self._category(category)
+        self.doc_counts[c] += weight
+        for feature in features(description):
+            counts = self.index.setdefault(feature, {})
+            counts[c] = counts.get(c, 0) + weight
+            self.feature_totals[c] += weight
+
+    def predict(self, description):
+        """
+        Return (category, confidence), or (None, 0.0) when nothing is known.
+
+        Unknown words are left out of the scores, so the confidence is scaled
+        by the share of the description's words seen in training: one
+        familiar word in an otherwise new description is not a sure match.
+        """
+        if not self.categories:
+            return None, 0.0
+        known = [self.index[f] for f in features(description) if f in self.index]
+        if not known:
+            return None, 0.0
+        words = set(normalize_description(description).split())
+        coverage = sum(1 for word in words if word in self.index) / len(words)
+
+        vocabulary = len(self.index)
+        total_docs = sum(self.doc_counts)
+        scores = []
+        for c in range(len(self.categories)):
+            denominator = self.feature_totals[c] + ALPHA * vocabulary
+            score = math.log(self.doc_counts[c] / total_docs)
+            for counts in known:
+                score += math.log((counts.get(c, 0) + ALPHA) / denominator)
+            scores.append(score)
+
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        confidence = coverage / sum(math.exp(score - top) for score in scores)
+        return self.categories[best], confidence
+
+
+_classifier = None
+_lock = threading.Lock()
+
+
+def get_classifier(db):
+    """
+    Return the process-wide classifier, training it from the database on
+    first use: cached descriptions, the descriptions of categorized
+    transactions and the category names.
+    """
+    global _classifier
+    if _classifier is None:
+        # Threads of the API server arriving together train it once
+        with _lock:
+            if _classifier is None:
+                classifier = LocalClassifier()
+                for description, category, hits in db.query(
+                        CategoryCache.description, CategoryCache.category, CategoryCache.hits):
+                    classifier.learn(description, category, weight=1 + math.log1p(hits or 0))
+                # Each distinct description once, weighted by how often it was used
+                for description, category, count in db.query(
+                        Transaction.description, Category.name, func.count()).join(
+                        Category, Category.id == Transaction.category_id).filter(
+                        Transaction.description.is_not(None)).group_by(Transaction.description, Category.name):
+                    classifier.learn(description, category, weight=1 + math.log1p(count - 1))
+                for name, in db.query(Category.name):
+                    classifier.learn(name, name)
+                _classifier = classifier
+    return _classifier
@@ -1,39 +1,52 @@
-from passlib.hash import bcrypt
-from sqlalchemy.exc import IntegrityError
-from finance_manager.database import init_db, SessionLocal
-from finance_manager.models import User, Transaction, Category, Budget
-from finance_manager.ai import categorize_transaction, generate_financial_advice, simulate_financial_scenario
 import os
+import sys
 import json
-from sqlalchemy import func
-from tabulate import tabulate
+import click
+from datetime import datetime, timedelta
 
+from finance_manager import profiling
 
-# Initialize the database
-init_db()
+# Heavy modules (SQLAlchemy, Gemini, passlib, tabulate) are imported inside the
+# commands that need them, so quick commands such as `logout` start instantly.
 
-# Define the path for storing the logged-in user's email
-SESSION_FILE = './user.txt'
+
+def load_settings():
+    """Load settings (GEMINI_API_KEY, FM_* options) from the .env file into the environment."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def open_db(readonly=False):
+    """Open a database session, creating the schema on first use."""
+    with profiling.phase('open database'):
+        from finance_manager.database import init_db, SessionLocal, ReadSessionLocal, SchemaOutdated
+        try:
+            init_db()
+        except SchemaOutdated as e:
+            print(e)
+            sys.exit(1)
+    return ReadSessionLocal() if readonly else SessionLocal()
 
 def get_logged_in_user():
-    """Retrieve the logged-in user's email from the session file."""
-    if os.path.exists(SESSION_FILE):
-        with open(SESSION_FILE, 'r') as f:
-            return f.read().strip()
-    return None
+    """Return the logged-in user (id, name, email) from the signed session token, or None."""
+    from finance_manager import session
+    return session.load()
 
-def set_logged_in_user(email):
-    """Store the logged-in user's email in the session file."""
-    with open(SESSION_FILE, 'w') as f:
-        f.write(email)
+def set_logged_in_user(user):
+    """Save a signed session token for the user."""
+    from finance_manager import session
+    session.save(session.issue(user.id, user.name, user.email))
 
 def remove_logged_in_user():
-    """Remove the logged-in user's email and delete the session file."""
-    if os.path.exists(SESSION_FILE):
-        os.remove(SESSION_FILE)
+    """Log out by deleting the session token."""
+    from finance_manager import session
+    session.clear()
 
 def signup():
     """Register a new user."""
+    from sqlalchemy.exc import IntegrityError
+    from finance_manager.models import User
+    from finance_manager.session import hash_password
     name = input("Your name: ")
     email = input("Your email: ")
     password = input("Your password: ")
@@ -42,13 +55,14 @@ def signup():
         print("Passwords do not match.")
         return
 
-    db = SessionLocal()
+    db = open_db()
     try:
-        hashed_password = bcrypt.hash(password)
+        with profiling.phase('password hashing'):
+            hashed_password = hash_password(password)
         user = User(name=name, email=email, password_hash=hashed_password)
         db.add(user)
         db.commit()
-        set_logged_in_user(email)  # Save email to session file after successful signup
+        set_logged_in_user(user)  # Save a session token after successful signup
         print(f"User registered and logged in successfully as {name}!")
     except IntegrityError:
         db.rollback()
@@ -58,13 +72,21 @@ def signup():
 
 def login():
     """Log in as a user."""
+    from finance_manager import queries
+    from finance_manager.session import check_password
     email = input("Your email: ")
     password = input("Your password: ")
 
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
-    if user and bcrypt.verify(password, user.password_hash):
-        set_logged_in_user(email)  # Store the email of the logged-in user
+    db = open_db()
+    user = queries.user_by_email(db, email).first()
+    with profiling.phase('password hashing'):
+        verified, new_hash = check_password(password, user.password_hash) if user else (False, None)
+    if verified:
+        if new_hash:
+            # Stored with a different bcrypt cost than FM_BCRYPT_ROUNDS
+            user.password_hash = new_hash
+            db.commit()
+        set_logged_in_user(user)  # Save a session token for the logged-in user
         print(f"Welcome back, {user.name}!")
     else:
         print("Invalid email or password.")
@@ -73,31 +95,37 @@ def login():
 
 def add_transaction():
     """Add a new transaction for the currently logged-in user and track budget usage."""
-    email = get_logged_in_user()
-    if not email:
+    from finance_manager.models import Transaction, Category
+    from finance_manager import budgets, dedupe, queries, response_cache, totals
+    from finance_manager.categorizer import categorize
+    from finance_manager.money import to_cents, format_amount
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to add a transaction.")
         return
 
     description = input("Transaction description: ")
-    amount = float(input("Transaction amount: "))
+    try:
+        amount = to_cents(input("Transaction amount: "))
+    except ValueError as e:
+        print(e)
+        return
     type = input("Transaction type (income/expense): ")
 
-    db = SessionLocal()
+    db = open_db()
     try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print("User not found.")
-            return
-
-        # Categorize the transaction
-        response = categorize_transaction(description)
-        try:
-            result = json.loads(response.text)
-            transaction_category = result.get("category")
-        except (json.JSONDecodeError, AttributeError):
-            print("Error categorizing the transaction.")
-            return
-
+        # Catch a transaction typed in twice before spending a categorization on it
+        timestamp = datetime.utcnow()
+        fingerprint = dedupe.fingerprint(current_user.id, timestamp, amount, type, description)
+        duplicate = dedupe.find_duplicate(db, current_user.id, fingerprint)
+        if duplicate:
+            print(f"This looks like transaction {duplicate.id} from {duplicate.timestamp:%Y-%m-%d %H:%M}.")
+            if input("Add it anyway? (y/N): ").strip().lower() != 'y':
+                print("Transaction not added.")
+                return
+
+        # Categorize the transaction, reusing the cached category for known descriptions
+        transaction_category = categorize(db, description)
         if not transaction_category:
             print("Unable to determine the transaction category.")
             return
@@ -107,32 +135,30 @@ def add_transaction():
         if not category:
             category = Category(name=transaction_category)
             db.add(category)
-            db.commit()
-            db.refresh(category)
+            db.flush()
 
-        # Add the transaction
-        transaction = Transaction(user_id=user.id, category_id=category.id, amount=amount, type=type)
+        # Add the transaction and its running totals in one database transaction
+        transaction = Transaction(user_id=current_user.id, category_id=category.id, amount=amount, type=type,
+                                  timestamp=timestamp, description=description.strip() or None,
+                                  fingerprint=fingerprint)
         db.add(transaction)
+        totals.record(db, current_user.id, category.id, type, amount, timestamp)
+        response_cache.invalidate(db, current_user.id)
         db.commit()
         print(f"Transaction added under category: {transaction_category}")
 
         # Check against budget
         if type == 'expense':
-            budget = db.query(Budget).filter(Budget.category_id == category.id, Budget.user_id == user.id).first()
-            if budget:
-                # Calculate total spending for the category
-                total_spent = db.query(Transaction).filter(
-                    Transaction.user_id == user.id,
-                    Transaction.category_id == category.id,
-                    Transaction.type == 'expense'
-                ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-
+            budget = queries.budget_for(db, current_user.id, category.id).first()
+            # Spending in the budget's current period comes from the period totals
+            total_spent = budgets.spent_in_period(db, budget, timestamp.date()) if budget else None
+            if total_spent is not None:
                 # Compare total spent to budget
                 remaining_budget = budget.amount - total_spent
                 if remaining_budget < 0:
-                    print(f"Alert: You have exceeded your budget for '{transaction_category}' by Ksh {abs(remaining_budget):.2f}!")
+                    print(f"Alert: You have exceeded your {budget.period} budget for '{transaction_category}' by Ksh {format_amount(-remaining_budget)}!")
                 else:
-                    print(f"Remaining budget for '{transaction_category}': Ksh {remaining_budget:.2f}")
+                    print(f"Remaining {budget.period} budget for '{transaction_category}': Ksh {format_amount(remaining_budget)}")
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -142,35 +168,41 @@ def add_transaction():
 
 def advice():
     """Provide financial advice based on the user's transactions."""
-    email = get_logged_in_user()
-    if not email:
+    from finance_manager.models import User
+    from finance_manager import response_cache
+    from finance_manager.summary import build_summary
+    from finance_manager.ai import generate_financial_advice
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to get financial advice.")
         return
 
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
+    db = open_db()
+    user = db.get(User, current_user.id)
     if not user:
         print("User not found. Please register first.")
         db.close()
         return
 
-    transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
-    if not transactions:
-        print("No transactions found.")
-        db.close()
-        return
+    # Reuse the last answer while the user's transactions are unchanged
+    key = response_cache.response_key(user, 'advice')
+    text = response_cache.get(db, key)
+    if text is None:
+        summary = build_summary(db, user.id)
+        if not summary:
+            print("No transactions found.")
+            db.close()
+            return
 
-    formatted_transactions = [
-        {
-            'type': txn.type,
-            'amount': txn.amount,
-            'category': db.query(Category).filter(Category.id == txn.category_id).first().name
-        }
-        for txn in transactions
-    ]
-
-    response = generate_financial_advice(formatted_transactions)
-    result = json.loads(response.text)
+        db.commit()  # don't hold a database transaction open during the Gemini call
+        text = getattr(generate_financial_advice(summary), 'text', None)
+        if text is None:
+            print("No advice available at the moment.")
+            db.close()
+            return
+        response_cache.put(db, user.id, key, 'advice', text)
+
+    result = json.loads(text)
     analysis = result.get("analysis", "No analysis found.")
     advice = result.get("advice", [])
     print("Financial Analysis:")
@@ -184,22 +216,23 @@ def advice():
 
 def set_budget():
     """Set a budget for a specific category."""
-    email = get_logged_in_user()
-    if not email:
+    from finance_manager.models import Category, Budget
+    from finance_manager import queries
+    from finance_manager.money import to_cents, format_amount
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to set a budget.")
         return
 
     category = input("Category name: ")
-    amount = float(input("Budget amount (in Ksh): "))
-
-    db = SessionLocal()
     try:
-        # Get the user from the database
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print("User not found. Please register first.")
-            return
+        amount = to_cents(input("Budget amount (in Ksh): "))
+    except ValueError as e:
+        print(e)
+        return
 
+    db = open_db()
+    try:
         # Check if the category exists
         category_obj = db.query(Category).filter(Category.name == category).first()
         if not category_obj:
@@ -207,17 +240,17 @@ def set_budget():
             return
 
         # Check if a budget already exists for this category
-        existing_budget = db.query(Budget).filter(Budget.category_id == category_obj.id, Budget.user_id == user.id).first()
+        existing_budget = queries.budget_for(db, current_user.id, category_obj.id).first()
         if existing_budget:
             print(f"A budget for '{category}' already exists. Updating the amount.")
             existing_budget.amount = amount
         else:
             # Create a new budget record
-            new_budget = Budget(user_id=user.id, category_id=category_obj.id, amount=amount)
+            new_budget = Budget(user_id=current_user.id, category_id=category_obj.id, amount=amount)
             db.add(new_budget)
 
         db.commit()
-        print(f"Budget of Ksh {amount} has been set for {category}")
+        print(f"Budget of Ksh {format_amount(amount)} has been set for {category}")
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -225,50 +258,77 @@ def set_budget():
         db.close()
 
 
-def transactions():
-    """Display all transactions for the currently logged-in user."""
-    email = get_logged_in_user()
-    if not email:
+def transactions(since=None, until=None, category=None, type=None, limit=None):
+    """Display transactions for the currently logged-in user, streaming rows as they are read."""
+    from finance_manager import queries
+    from finance_manager.money import format_amount
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to view transactions.")
         return
 
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        print("User not found. Please register first.")
+    db = open_db(readonly=True)
+
+    # Rows are printed page by page as they are read, so nothing is held in memory.
+    # Terminals get aligned columns, pipes get tab-separated values.
+    interactive = sys.stdout.isatty()
+    headers = ["ID", "Date", "Type", "Amount (Ksh)", "Category"]
+    row_format = "{:>8}  {:19}  {:7}  {:>14}  {}" if interactive else "\t".join(["{}"] * len(headers))
+
+    found = False
+    try:
+        for txn in queries.iter_transactions(db, current_user.id, since, until, category, type, limit):
+            if not found:
+                print(row_format.format(*headers))
+                found = True
+            print(row_format.format(txn.id, txn.timestamp.strftime('%Y-%m-%d %H:%M:%S'), txn.type,
+                                    format_amount(txn.amount), txn.category))
+        if not found:
+            print("No transactions found.")
+    except BrokenPipeError:
+        # The reader (e.g. `head`) has seen enough; silence the final flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
         db.close()
+
+def search(text, limit=20):
+    """Find the currently logged-in user's transactions by description, best matches first."""
+    from finance_manager import search as full_text
+    from finance_manager.money import format_amount
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to search transactions.")
         return
 
-    # Fetch all transactions for the logged-in user
-    transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
-    if not transactions:
-        print("No transactions found.")
+    db = open_db(readonly=True)
+    try:
+        rows = full_text.search(db, current_user.id, text, limit)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return
+    finally:
         db.close()
+    if not rows:
+        print("No matching transactions found.")
         return
 
-    # Prepare data for the table
-    table_data = []
-    for txn in transactions:
-        category_name = db.query(Category).filter(Category.id == txn.category_id).first().name
-        table_data.append([txn.timestamp.strftime('%Y-%m-%d %H:%M:%S'), txn.type, txn.amount, category_name])
-
-    # Define the table headers
-    headers = ["Date", "Type", "Amount (Ksh)", "Category"]
-
-    # Display the table using tabulate
-    print(tabulate(table_data, headers, tablefmt="grid"))
-
-    db.close()
+    interactive = sys.stdout.isatty()
+    headers = ["ID", "Date", "Type", "Amount (Ksh)", "Category", "Description"]
+    row_format = "{:>8}  {:19}  {:7}  {:>14}  {:15}  {}" if interactive else "\t".join(["{}"] * len(headers))
+    print(row_format.format(*headers))
+    for txn in rows:
+        print(row_format.format(txn.id, txn.timestamp.strftime('%Y-%m-%d %H:%M:%S'), txn.type,
+                                format_amount(txn.amount), txn.category, txn.description))
 
 def logout():
     """Log out the current user"""
-    email = get_logged_in_user()
-    if not email:
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You are not logged in.")
         return
 
-    remove_logged_in_user()  # Delete the session file
-    print(f"You have been logged out, {email}.")
+    remove_logged_in_user()  # Delete the session token
+    print(f"You have been logged out, {current_user.email}.")
 
 def quit_program():
     """Quit the program."""
@@ -277,32 +337,34 @@ def quit_program():
 
 def update_transaction():
     """Update an existing transaction."""
+    from finance_manager.models import Category
+    from finance_manager import dedupe, queries, response_cache, totals
+    from finance_manager.money import to_cents
     
     transaction_id = input("Transaction id")
     amount = input("Amount")
     type = input("Type")
     category = input("Category")
-    email = get_logged_in_user()
-    if not email:
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to update a transaction.")
         return
 
-    db = SessionLocal()
+    db = open_db()
     try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print("User not found.")
-            return
-
         # Fetch the transaction
-        transaction = db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == user.id).first()
+        transaction = queries.user_transaction(db, current_user.id, transaction_id).first()
         if not transaction:
             print("Transaction not found.")
             return
 
+        # Take the old values out of the running totals before changing them
+        totals.record(db, current_user.id, transaction.category_id, transaction.type, transaction.amount,
+                      transaction.timestamp, sign=-1)
+
         # Update the transaction fields if new values are provided
         if amount:
-            transaction.amount = amount
+            transaction.amount = to_cents(amount)
         if type:
             transaction.type = type
 
@@ -317,40 +379,76 @@ def update_transaction():
                 # Create a new category if it doesn't exist
                 new_category = Category(name=category)
                 db.add(new_category)
-                db.commit()  # Commit to generate an ID for the new category
+                db.flush()  # Flush to generate an ID for the new category
                 existing_category = new_category
             
             # Update the transaction's category_id
             transaction.category_id = existing_category.id
 
-        # Commit the updates
+        transaction.fingerprint = dedupe.fingerprint(current_user.id, transaction.timestamp, transaction.amount,
+                                                     transaction.type, transaction.description)
+
+        # Commit the updates together with the new running totals
+        totals.record(db, current_user.id, transaction.category_id, transaction.type, transaction.amount,
+                      transaction.timestamp)
+        response_cache.invalidate(db, current_user.id)
         db.commit()
         print("Transaction updated successfully!")
 
     except Exception as e:
+        db.rollback()
         print(f"An error occurred: {e}")
     finally:
         db.close()
 
-def delete_transactions():
-    """Delete all transactions for the currently logged-in user."""
-    email = get_logged_in_user()
-    if not email:
+def delete_transactions(since=None, until=None, category=None):
+    """
+    Delete the currently logged-in user's transactions, all of them or
+    those in a date range (`until` exclusive) and/or category, in short batches.
+    """
+    from finance_manager.models import Category
+    from finance_manager import retention
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to delete transactions.")
         return
 
-    db = SessionLocal()
+    db = open_db()
     try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print("User not found.")
-            return
+        category_id = None
+        if category:
+            category_id = db.query(Category.id).filter(Category.name == category).scalar()
+            if category_id is None:
+                print(f"Category '{category}' not found.")
+                return
+
+        deleted = retention.delete_transactions(db, current_user.id, since, until, category_id)
+        if since is None and until is None and category is None:
+            print("All transactions have been deleted successfully.")
+        else:
+            print(f"Deleted {deleted} transactions.")
+    except Exception as e:
+        db.rollback()
+        print(f"An error occurred: {e}")
+    finally:
+        db.close()
 
-        # Delete all transactions for the user
-        db.query(Transaction).filter(Transaction.user_id == user.id).delete()
-        db.commit()
+def archive(months=12):
+    """Move the currently logged-in user's transactions older than `months` months into the archive."""
+    from finance_manager import retention
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to archive transactions.")
+        return
 
-        print("All transactions have been deleted successfully.")
+    before = retention.months_ago(months)
+    db = open_db()
+    try:
+        moved, size = retention.archive_transactions(db, current_user.id, before)
+        if moved:
+            print(f"Archived {moved} transactions dated before {before:%Y-%m-%d} ({size / 1024:.0f} KiB compressed).")
+        else:
+            print(f"No transactions dated before {before:%Y-%m-%d}.")
     except Exception as e:
         db.rollback()
         print(f"An error occurred: {e}")
@@ -359,35 +457,41 @@ def delete_transactions():
 
 def simulate_scenario(scenario):
     """Simulate a scenario based on transaction history."""
-    email = get_logged_in_user()
-    if not email:
+    from finance_manager.models import User
+    from finance_manager import response_cache
+    from finance_manager.summary import build_summary
+    from finance_manager.ai import simulate_financial_scenario
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to simulate scenarios.")
         return
 
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
+    db = open_db()
+    user = db.get(User, current_user.id)
     if not user:
         print("User not found. Please register first.")
         db.close()
         return
 
-    transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
-    if not transactions:
-        print("No transactions found.")
-        db.close()
-        return
+    # Reuse the last answer for this scenario while the user's transactions are unchanged
+    key = response_cache.response_key(user, 'scenario', scenario)
+    text = response_cache.get(db, key)
+    if text is None:
+        summary = build_summary(db, user.id)
+        if not summary:
+            print("No transactions found.")
+            db.close()
+            return
 
-    formatted_transactions = [
-        {
-            'type': txn.type,
-            'amount': txn.amount,
-            'category': db.query(Category).filter(Category.id == txn.category_id).first().name
-        }
-        for txn in transactions
-    ]
-
-    response = simulate_financial_scenario(formatted_transactions, scenario)
-    result = json.loads(response.text)
+        db.commit()  # don't hold a database transaction open during the Gemini call
+        text = getattr(simulate_financial_scenario(summary, scenario), 'text', None)
+        if text is None:
+            print("No scenario analysis available at the moment.")
+            db.close()
+            return
+        response_cache.put(db, user.id, key, 'scenario', text)
+
+    result = json.loads(text)
     analysis = result.get("analysis", "No analysis found.")
     impact = result.get("impact", "No impact found.")
 
@@ -400,21 +504,18 @@ def simulate_scenario(scenario):
 
     db.close()
     
-def set_budget(category, amount):
-    """Set a budget for a specific category."""
-    email = get_logged_in_user()
-    if not email:
+def set_budget(category, amount, period='monthly', starts_on=None, ends_on=None):
+    """Set a weekly, monthly or custom-period budget for a specific category."""
+    from finance_manager.models import Category, Budget
+    from finance_manager import queries
+    from finance_manager.money import format_amount
+    current_user = get_logged_in_user()
+    if not current_user:
         print("You must be logged in to set a budget.")
         return
 
-    db = SessionLocal()
+    db = open_db()
     try:
-        # Get the user from the database
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            print("User not found. Please register first.")
-            return
-
         # Check if the category exists
         category_obj = db.query(Category).filter(Category.name == category).first()
         if not category_obj:
@@ -422,22 +523,272 @@ def set_budget(category, amount):
             return
 
         # Check if a budget already exists for this category
-        existing_budget = db.query(Budget).filter(Budget.category_id == category_obj.id, Budget.user_id == user.id).first()
+        existing_budget = queries.budget_for(db, current_user.id, category_obj.id).first()
         if existing_budget:
-            print(f"A budget for '{category}' already exists. Updating the amount.")
+            print(f"A budget for '{category}' already exists. Updating the amount and period.")
             existing_budget.amount = amount
+            existing_budget.period = period
+            existing_budget.starts_on = starts_on
+            existing_budget.ends_on = ends_on
         else:
             # Create a new budget record
-            new_budget = Budget(user_id=user.id, category_id=category_obj.id, amount=amount)
+            new_budget = Budget(user_id=current_user.id, category_id=category_obj.id, amount=amount,
+                                period=period, starts_on=starts_on, ends_on=ends_on)
             db.add(new_budget)
 
         db.commit()
-        print(f"Budget of Ksh {amount} has been set for {category}")
+        if period == 'custom':
+            print(f"Budget of Ksh {format_amount(amount)} has been set for {category} "
+                  f"from {starts_on:%Y-%m-%d} to {ends_on:%Y-%m-%d}")
+        else:
+            print(f"{period.title()} budget of Ksh {format_amount(amount)} has been set for {category}")
 
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
         db.close()
+
+def budgets():
+    """Display all budgets for the currently logged-in user with their remaining amounts."""
+    from tabulate import tabulate
+    from finance_manager.budgets import overview, today
+    from finance_manager.money import from_cents
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to view budgets.")
+        return
+
+    db = open_db(readonly=True)
+
+    # One row per budget; spending in the current period comes from the period totals
+    rows = overview(db, current_user.id, today())
+    if not rows:
+        print("No budgets found.")
+        db.close()
+        return
+
+    table_data = [[category, period, from_cents(budget), from_cents(spent), from_cents(budget - spent)]
+                  for category, period, budget, spent in rows]
+    headers = ["Category", "Period", "Budget (Ksh)", "Spent (Ksh)", "Remaining (Ksh)"]
+    print(tabulate(table_data, headers, tablefmt="grid", floatfmt=".2f"))
+
+    db.close()
+
+def import_statement(path, fmt=None, keep_duplicates=False):
+    """
+    Import transactions for the currently logged-in user from a CSV or JSONL
+    statement, skipping rows they already have unless `keep_duplicates`.
+    """
+    from finance_manager.cache import description_cache
+    from finance_manager.importer import import_transactions, read_statement
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to import transactions.")
+        return
+
+    db = open_db()
+    try:
+        imported, skipped, duplicates = import_transactions(db, current_user.id, read_statement(path, fmt),
+                                                            keep_duplicates=keep_duplicates)
+        print(f"Imported {imported} transactions.")
+        if skipped:
+            print(f"Skipped {skipped} rows that could not be parsed.")
+        if duplicates and keep_duplicates:
+            print(f"{duplicates} of them look like duplicates of transactions you already have.")
+        elif duplicates:
+            print(f"Skipped {duplicates} duplicates of transactions you already have (use --keep-duplicates to import them).")
+        print(f"Category cache: {description_cache.stats}")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        db.close()
+
+def export_transactions(path=None, fmt=None, since=None, until=None):
+    """
+    Export the currently logged-in user's transactions to CSV, JSONL or
+    Parquet, streaming them in chunks. Without a path, CSV and JSONL go to stdout.
+    """
+    from finance_manager import export
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to export transactions.")
+        return
+
+    fmt = fmt or export.format_for(path)
+    if fmt == 'parquet':
+        if not path:
+            print("Parquet exports need an output file.")
+            return
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Parquet exports need pyarrow (pip install pyarrow).")
+            return
+
+    db = open_db(readonly=True)
+    try:
+        if not path:
+            count = export.export(db, current_user.id, fmt, sys.stdout, since, until)
+            print(f"Exported {count} transactions.", file=sys.stderr)
+            return
+
+        # Write next to the target and rename at the end, so a failed export never leaves half a file
+        temporary = f"{path}.tmp"
+        try:
+            if fmt == 'parquet':
+                count = export.export(db, current_user.id, fmt, temporary, since, until)
+            else:
+                with open(temporary, 'w', newline='', encoding='utf-8') as f:
+                    count = export.export(db, current_user.id, fmt, f, since, until)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        print(f"Exported {count} transactions to {path}.")
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        db.close()
+
+def report(months=12, window=3, top=5, include_archive=False):
+    """Display a cash-flow report for the currently logged-in user, computed locally."""
+    from tabulate import tabulate
+    from finance_manager.models import User
+    from finance_manager.analytics import load_columns, build_report
+    from finance_manager.money import format_amount
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to view a report.")
+        return
+
+    db = open_db(readonly=True)
+    try:
+        user = db.get(User, current_user.id)
+        if not user:
+            print("User not found. Please register first.")
+            return
+        result = build_report(load_columns(db, user, include_archive), months, window, top)
+    finally:
+        db.close()
+    if result is None:
+        print("No transactions found.")
+        return
+
+    def percent(value):
+        return "-" if value != value else f"{value:.0%}"  # NaN when there was no income
+
+    savings = (result.income - result.expenses) / result.income if result.income else float('nan')
+    print(f"{result.count} transactions over {len(result.months)} months")
+    print(f"Income: Ksh {format_amount(result.income)}   Expenses: Ksh {format_amount(result.expenses)}   "
+          f"Net: Ksh {format_amount(result.income - result.expenses)}   Savings rate: {percent(savings)}\n")
+
+    print(tabulate(
+        [[month, format_amount(income), format_amount(expenses), format_amount(net), percent(rate),
+          format_amount(round(rolling))] for month, income, expenses, net, rate, rolling in result.months],
+        ["Month", "Income", "Expenses", "Net", "Savings", f"Expenses ({window}-month avg)"],
+        tablefmt="simple", disable_numparse=True, colalign=("left",) + ("right",) * 5))
+    print()
+    print(tabulate(
+        [[name, format_amount(total), f"{share:.1%}", count, format_amount(round(monthly))]
+         for name, total, share, count, monthly in result.categories],
+        ["Category", "Expenses", "Share", "Transactions", "Per month"],
+        tablefmt="simple", disable_numparse=True, colalign=("left", "right", "right", "right", "right")))
+    if result.movers:
+        print(f"\nTop movers ({result.months[-1][0]} vs the previous {window} months' average):")
+        for name, latest, baseline, change in result.movers:
+            print(f"  {name}: Ksh {format_amount(latest)} vs {format_amount(round(baseline))} "
+                  f"({'+' if change > 0 else '-'}{format_amount(round(abs(change)))})")
+
+
+def simulate(salary_change=0.0, recurring=(), cuts=(), horizon=12, paths=5000, seed=0, history_months=12,
+             balance=None, narrate=False):
+    """
+    Project the balance of the currently logged-in user with and without a
+    scenario, using a seeded local simulation; Gemini only narrates the results.
+
+    salary_change is a percentage, recurring a list of (name, cents per month)
+    and cuts a list of (category, percentage).
+    """
+    from tabulate import tabulate
+    from finance_manager.models import User
+    from finance_manager import response_cache
+    from finance_manager.analytics import load_columns, current_month
+    from finance_manager.money import format_amount
+    from finance_manager import simulation
+    current_user = get_logged_in_user()
+    if not current_user:
+        print("You must be logged in to simulate scenarios.")
+        return
+
+    db = open_db(readonly=True)
+    try:
+        user = db.get(User, current_user.id)
+        if not user:
+            print("User not found. Please register first.")
+            return
+        # Archived transactions count towards the starting balance
+        columns = load_columns(db, user, include_archive=True)
+        if not len(columns.day):
+            print("No transactions found.")
+            return
+
+        codes = {name.lower(): code for code, name in enumerate(columns.categories)}
+        unknown = [category for category, _ in cuts if category.lower() not in codes]
+        if unknown:
+            print(f"Unknown categories: {', '.join(unknown)}. Choose from: {', '.join(sorted(columns.categories))}")
+            return
+        scenario = simulation.Scenario(
+            salary_change=salary_change / 100,
+            recurring=list(recurring),
+            cuts={codes[category.lower()]: percent / 100 for category, percent in cuts},
+        )
+        result = simulation.simulate(columns, scenario, current_month(), horizon, paths, seed, history_months,
+                                     balance)
+
+        parts = []
+        if salary_change:
+            parts.append(f"income {salary_change:+g}%")
+        parts += [f"new recurring expense {name} of Ksh {format_amount(amount)}/month" for name, amount in recurring]
+        parts += [f"{category} cut by {percent:g}%" for category, percent in cuts]
+        scenario_text = "; ".join(parts) or "no change"
+
+        print(f"Scenario: {scenario_text}")
+        print(f"{paths} paths from {result.history_months} months of history, seed {seed}. "
+              f"Starting balance: Ksh {format_amount(result.start_balance)}\n")
+        rows = [[month] + [format_amount(round(value)) for value in (
+                    result.baseline[2, i], result.scenario[0, i], result.scenario[2, i], result.scenario[4, i])]
+                for i, month in enumerate(result.months)]
+        print(tabulate(rows, ["Month", "Median now", "Scenario P5", "Scenario median", "Scenario P95"],
+                       tablefmt="simple", disable_numparse=True, colalign=("left",) + ("right",) * 4))
+        print(f"\nMedian monthly net: Ksh {format_amount(round(result.baseline_net))} now, "
+              f"Ksh {format_amount(round(result.scenario_net))} with the scenario")
+        print(f"Chance of the balance dropping below zero: {result.baseline_negative:.0%} now, "
+              f"{result.scenario_negative:.0%} with the scenario")
+
+        if narrate:
+            from finance_manager.ai import narrate_simulation
+            results = simulation.describe(result, scenario_text)
+            key = response_cache.response_key(user, 'simulation', results)
+            db.commit()  # end the read transaction; the cache is read and written in a short write session
+            cache = open_db()
+            try:
+                # get and put each commit, so no transaction is open during the Gemini call
+                text = response_cache.get(cache, key)
+                if text is None:
+                    text = getattr(narrate_simulation(results), 'text', None)
+                    if text is not None:
+                        response_cache.put(cache, user.id, key, 'simulation', text)
+            finally:
+                cache.close()
+            print()
+            print(text or "No narration available at the moment.")
+    finally:
+        db.close()
+
+
 def menu():
     """Display the menu and handle user input."""
     while True:
@@ -454,6 +805,13 @@ def menu():
         print("10. Advice")
         print("11. Delete Transactions")
         print("12. Simulate Scenario")
+        print("13. Import Statement")
+        print("14. View Budgets")
+        print("15. Cash-flow Report")
+        print("16. Simulate Scenario Locally")
+        print("17. Export Transactions")
+        print("18. Archive Old Transactions")
+        print("19. Search Transactions")
         print("Enter a budget: ")
 
         choice = input("Choose an option: ")
@@ -483,10 +841,252 @@ def menu():
         elif choice == '12':
             scenario = input("Enter the scenario: ")
             simulate_scenario(scenario)
-        
+        elif choice == '13':
+            path = input("Statement file (CSV or JSONL): ")
+            import_statement(path)
+        elif choice == '14':
+            budgets()
+        elif choice == '15':
+            report()
+        elif choice == '16':
+            from finance_manager.money import to_cents
+            try:
+                salary_change = float(input("Income change in % (e.g. 10 or -20, blank for none): ") or 0)
+                name = input("New recurring expense name (blank for none): ")
+                recurring = [(name, to_cents(input("Monthly amount (in Ksh): ")))] if name else []
+                category = input("Category to cut (blank for none): ")
+                cuts = [(category, float(input("Cut in %: ")))] if category else []
+            except ValueError as e:
+                print(e)
+                continue
+            simulate(salary_change, recurring, cuts)
+        elif choice == '17':
+            path = input("Export file (.csv, .jsonl or .parquet): ")
+            export_transactions(path)
+        elif choice == '18':
+            try:
+                months = int(input("Keep how many months of transactions? ") or 12)
+            except ValueError:
+                print("Please enter a number of months.")
+                continue
+            archive(months)
+        elif choice == '19':
+            search(input("Search descriptions for: "))
+
         else:
             print("Invalid choice. Please try again.")
 
 
+@click.group()
+@click.option('--profile', is_flag=True, envvar='FM_PROFILE',
+              help='Report time per phase, SQL statements and AI calls on stderr (or set FM_PROFILE=1).')
+@click.option('--profile-json', type=click.Path(dir_okay=False), envvar='FM_PROFILE_JSON',
+              help='Also write the profile metrics to this JSON file.')
+@click.option('--profile-dump', type=click.Path(dir_okay=False), envvar='FM_PROFILE_DUMP',
+              help='Also save cProfile statistics to this file.')
+@click.pass_context
+def cli(ctx, profile, profile_json, profile_dump):
+    """Finance Manager CLI"""
+    load_settings()
+    if profile or profile_json or profile_dump:
+        profiling.start(ctx.invoked_subcommand, dump_path=profile_dump, json_path=profile_json)
+        ctx.call_on_close(profiling.finish)
+
+
+cli.command(name='signup')(signup)
+cli.command(name='login')(login)
+cli.command(name='logout')(logout)
+cli.command(name='add-transaction')(add_transaction)
+cli.command(name='advice')(advice)
+cli.command(name='budgets')(budgets)
+cli.command(name='update-transaction')(update_transaction)
+cli.command(name='menu')(menu)
+
+
+@cli.command(name='set-budget')
+@click.option('--category', prompt='Category name')
+@click.option('--amount', prompt='Budget amount (in Ksh)')
+@click.option('--period', type=click.Choice(['weekly', 'monthly', 'custom']), default='monthly', show_default=True,
+              help='Budget period; custom needs --start and --end.')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day of a custom period.')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last day of a custom period.')
+def set_budget_command(category, amount, period, start, end):
+    """Set a budget for a specific category."""
+    from finance_manager.money import to_cents
+    try:
+        amount = to_cents(amount)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--amount')
+    if period == 'custom':
+        if start is None or end is None:
+            raise click.UsageError("A custom period needs --start and --end.")
+        if end < start:
+            raise click.BadParameter("must not be before --start", param_hint='--end')
+        set_budget(category, amount, period, start.date(), end.date())
+    else:
+        set_budget(category, amount, period)
+
+
+@cli.command(name='delete-transactions')
+@click.option('--since', type=click.DateTime(), help='Only transactions on or after this date.')
+@click.option('--until', type=click.DateTime(), help='Only transactions up to and including this date.')
+@click.option('--category', help='Only transactions in this category.')
+def delete_transactions_command(since, until, category):
+    """Delete your transactions, or only those in a date range or category."""
+    if until is not None and until.time() == datetime.min.time():
+        # A bare date includes the whole day
+        until += timedelta(days=1)
+    delete_transactions(since, until, category)
+
+
+@cli.command(name='transactions')
+@click.option('--since', type=click.DateTime(), help='Only transactions on or after this date.')
+@click.option('--until', type=click.DateTime(), help='Only transactions up to and including this date.')
+@click.option('--category', help='Only transactions in this category.')
+@click.option('--type', 'type_', type=click.Choice(['income', 'expense']), help='Only income or only expenses.')
+@click.option('--limit', type=click.IntRange(min=1), help='Show at most this many transactions.')
+def transactions_command(since, until, category, type_, limit):
+    """Display transactions for the currently logged-in user."""
+    if until is not None and until.time() == datetime.min.time():
+        # A bare date includes the whole day
+        until += timedelta(days=1)
+    transactions(since, until, category, type_, limit)
+
+
+@cli.command(name='simulate-scenario')
+@click.argument('scenario')
+def simulate_scenario_command(scenario):
+    """Simulate a scenario based on transaction history."""
+    simulate_scenario(scenario)
+
+
+@cli.command(name='cache-stats')
+def cache_stats():
+    """Show how many descriptions are cached and how often they were reused."""
+    from sqlalchemy import func
+    from finance_manager.models import CategoryCache
+    db = open_db(readonly=True)
+    try:
+        entries, hits = db.query(func.count(CategoryCache.description), func.sum(CategoryCache.hits)).one()
+        print(f"Cached descriptions: {entries}")
+        print(f"Cache hits served from the database: {hits or 0}")
+    finally:
+        db.close()
+
+
+@cli.command(name='serve')
+@click.option('--socket', 'socket_path', help='Unix socket to listen on (defaults to .fm.sock or FM_SOCKET).')
+def serve_command(socket_path):
+    """Keep a warm process that runs forwarded commands."""
+    from finance_manager.daemon import serve, SOCKET_PATH
+    serve(socket_path or SOCKET_PATH)
+
+
+@cli.command(name='serve-api')
+@click.option('--host', help='Address to listen on (defaults to FM_API_HOST or 127.0.0.1).')
+@click.option('--port', type=int, help='Port to listen on (defaults to FM_API_PORT or 8000).')
+def serve_api_command(host, port):
+    """Serve the HTTP/JSON API for web and mobile front ends."""
+    from finance_manager.database import SchemaOutdated
+    from finance_manager.server import serve, HOST, PORT
+    try:
+        serve(host or HOST, port or PORT)
+    except SchemaOutdated as e:
+        print(e)
+        sys.exit(1)
+
+
+@cli.command(name='export')
+@click.argument('path', required=False)
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl', 'parquet']),
+              help='Output format (defaults to the file extension, or CSV).')
+@click.option('--since', type=click.DateTime(), help='Only transactions on or after this date.')
+@click.option('--until', type=click.DateTime(), help='Only transactions up to and including this date.')
+def export_command(path, fmt, since, until):
+    """Export your transactions to a CSV, JSONL or Parquet file (or CSV/JSONL to stdout)."""
+    if until is not None and until.time() == datetime.min.time():
+        # A bare date includes the whole day
+        until += timedelta(days=1)
+    export_transactions(None if path == '-' else path, fmt, since, until)
+
+
+@cli.command(name='import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Statement format (defaults to the file extension).')
+@click.option('--keep-duplicates', is_flag=True,
+              help='Import rows matching an existing transaction (same day, amount, type and description) instead of skipping them.')
+def import_command(path, fmt, keep_duplicates):
+    """Import transactions from a CSV or JSONL statement."""
+    import_statement(path, fmt, keep_duplicates)
+
+
+def _parse_pairs(value, convert, what):
+    """Split NAME=VALUE options, converting the values."""
+    pairs = []
+    for item in value:
+        name, separator, amount = item.rpartition('=')
+        try:
+            if not separator or not name.strip():
+                raise ValueError
+            pairs.append((name.strip(), convert(amount)))
+        except ValueError:
+            raise click.BadParameter(f"expected NAME={what}, got {item!r}")
+    return pairs
+
+
+@cli.command(name='simulate')
+@click.option('--salary-change', type=float, default=0.0, help='Change in income, in percent (e.g. 10 or -20).')
+@click.option('--recurring', multiple=True, metavar='NAME=AMOUNT',
+              callback=lambda ctx, param, value: _parse_pairs(value, _cents, 'AMOUNT'),
+              help='New monthly expense in Ksh; repeatable.')
+@click.option('--cut', multiple=True, metavar='CATEGORY=PERCENT',
+              callback=lambda ctx, param, value: _parse_pairs(value, float, 'PERCENT'),
+              help='Cut spending in a category by a percentage; repeatable.')
+@click.option('--months', type=click.IntRange(1), default=12, show_default=True, help='Months to project.')
+@click.option('--paths', type=click.IntRange(1), default=5000, show_default=True, help='Simulated paths.')
+@click.option('--seed', type=int, default=0, show_default=True, help='Random seed; the same seed gives the same results.')
+@click.option('--history', type=click.IntRange(1), default=12, show_default=True,
+              help='Past months the simulation draws from.')
+@click.option('--balance', callback=lambda ctx, param, value: None if value is None else _cents(value),
+              help='Starting balance in Ksh (defaults to all income minus all expenses, archive included).')
+@click.option('--narrate', is_flag=True, help='Have Gemini explain the results.')
+def simulate_command(salary_change, recurring, cut, months, paths, seed, history, balance, narrate):
+    """Project your balance with and without a scenario using a local Monte Carlo simulation."""
+    simulate(salary_change, recurring, cut, months, paths, seed, history, balance, narrate)
+
+
+def _cents(value):
+    from finance_manager.money import to_cents
+    return to_cents(value)
+
+
+@cli.command(name='report')
+@click.option('--months', type=click.IntRange(1), default=12, show_default=True, help='Calendar months to cover.')
+@click.option('--window', type=click.IntRange(1), default=3, show_default=True,
+              help='Months in the rolling average and the top movers baseline.')
+@click.option('--top', type=click.IntRange(0), default=5, show_default=True, help='Number of top movers shown.')
+@click.option('--include-archive', is_flag=True, help='Include archived transactions.')
+def report_command(months, window, top, include_archive):
+    """Cash-flow report: monthly income and expenses, categories and top movers."""
+    report(months, window, top, include_archive)
+
+
+@cli.command(name='search')
+@click.argument('words', nargs=-1, required=True)
+@click.option('--limit', type=click.IntRange(min=1), default=20, show_default=True, help='Show at most this many matches.')
+def search_command(words, limit):
+    """Search your transactions by description; each word also matches as a prefix."""
+    search(' '.join(words), limit)
+
+
+@cli.command(name='archive')
+@click.option('--months', type=click.IntRange(1), default=12, show_default=True,
+              help='Keep this many calendar months (plus the current one) in the transactions table.')
+def archive_command(months):
+    """Move transactions older than N months into the compressed archive."""
+    archive(months)
+
+
 if __name__ == '__main__':
+    load_settings()
     menu()
@@ -0,0 +1,256 @@
+"""
+Warm daemon mode.
+
+`fm.sh serve` keeps one process running with the database engine, caches,
+classifier and AI client already loaded, listening on a Unix socket in the
+current directory. `python -m finance_manager.main` (and so `fm.sh`)
+forwards commands to it when it is running, and runs them in-process when
+it is not.
+
+The client side of this module only uses the standard library and
+python-dotenv, so forwarding costs an interpreter start and a socket round
+trip. Output comes back in frames of up to OUTPUT_CHUNK characters as the
+command writes it, so long listings and `export -` stream instead of
+arriving all at the end.
+
+The client sends its working directory, database and the SETTINGS the
+daemon read at startup; when any of them differ, the command runs
+in-process instead.
+
+The daemon runs one command at a time: commands redirect the process-wide
+sys.stdout, so they cannot share it. Other clients queue on the socket
+until the running command finishes.
+"""
+import io
+import json
+import os
+import socket
+import struct
+import sys
+
+from finance_manager import profiling
+
+# The socket lives next to the database and session file, which are relative to the working directory
+SOCKET_PATH = os.getenv('FM_SOCKET', '.fm.sock')
+
+# Commands that prompt for input; they are only forwarded when stdin is piped in
+INTERACTIVE_COMMANDS = {'signup', 'login', 'add-transaction', 'update-transaction', 'set-budget', 'menu'}
+# Commands that must never be forwarded
+LOCAL_COMMANDS = {'serve', 'serve-api'}
+# Options before the command name that take a value
+GLOBAL_OPTIONS_WITH_VALUES = {'--profile-json', '--profile-dump'}
+# Global options the client sets from its own environment, which the daemon does not share
+PROFILE_OPTIONS = (('FM_PROFILE_JSON', '--profile-json'), ('FM_PROFILE_DUMP', '--profile-dump'))
+# Settings the daemon reads once at startup; a client with other values runs its command itself
+SETTINGS = ('FM_DATABASE_URL', 'FM_CONFIG_DIR', 'FM_CATEGORIZER')
+# Characters of output buffered before they are sent to the client
+OUTPUT_CHUNK = 65536
+
+
+def _send(sock, payload):
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(struct.pack('!I', len(data)) + data)
+
+
+def _receive(sock):
+    header = _read_exactly(sock, 4)
+    if header is None:
+        return None
+    body = _read_exactly(sock, struct.unpack('!I', header)[0])
+    return json.loads(body.decode('utf-8')) if body is not None else None
+
+
+def _read_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _command_name(argv):
+    args = iter(argv)
+    for arg in args:
+        if arg in GLOBAL_OPTIONS_WITH_VALUES:
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return None
+
+
+def _with_profile_options(argv):
+    """argv with the FM_PROFILE* variables of the client turned into the matching global options."""
+    options = []
+    if os.getenv('FM_PROFILE', '').lower() in ('1', 'true', 't', 'yes', 'y', 'on'):
+        options.append('--profile')
+    for name, option in PROFILE_OPTIONS:
+        if os.getenv(name):
+            options += [option, os.environ[name]]
+    return options + list(argv)
+
+
+def _settings():
+    """The database key and SETTINGS values this process runs commands with, .env file included."""
+    from dotenv import load_dotenv
+    load_dotenv()  # as the CLI does, before anything reads the settings
+    from finance_manager.session import database_key
+    return {'database': database_key(), **{name: os.getenv(name) for name in SETTINGS}}
+
+
+def forward(argv, socket_path=SOCKET_PATH):
+    """
+    Run a command in the daemon and print its output.
+
+    Returns the command's exit code, or None when the command should run
+    in-process instead (no daemon, the command needs a terminal, or the
+    daemon serves another directory, database or configuration).
+    """
+    command = _command_name(argv)
+    if command in LOCAL_COMMANDS or not os.path.exists(socket_path):
+        return None
+
+    stdin = None
+    if command in INTERACTIVE_COMMANDS:
+        if sys.stdin.isatty():
+            return None
+        stdin = sys.stdin.read()
+
+    started = False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            _send(sock, {'argv': _with_profile_options(argv), 'cwd': os.getcwd(), 'settings': _settings(),
+                         'stdin': stdin, 'tty': sys.stdout.isatty()})
+            while True:
+                frame = _receive(sock)
+                if frame is None:
+                    # The daemon went away: run the command here unless it already started there
+                    return 1 if started else None
+                if 'exit_code' in frame:
+                    return None if frame['exit_code'] is None and not started else frame['exit_code']
+                started = True
+                stream = sys.stdout if frame['stream'] == 'stdout' else sys.stderr
+                stream.write(frame['text'])
+                stream.flush()
+    except OSError:
+        return 1 if started else None
+
+
+class _Output(io.TextIOBase):
+    """Output sent to the client in frames, reporting whether the client's stdout is a terminal."""
+
+    def __init__(self, connection, name, tty):
+        self.connection = connection
+        self.name = name
+        self.tty = tty
+        self.pending = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        if not isinstance(text, str):
+            # Like StringIO: click probes streams with write(b'') to find binary ones
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= OUTPUT_CHUNK:
+            self.send()
+        return len(text)
+
+    def send(self):
+        if self.pending:
+            text, self.pending, self.size = ''.join(self.pending), [], 0
+            _send(self.connection, {'stream': self.name, 'text': text})
+
+
+def _run(cli, request, connection):
+    """Run one forwarded command, streaming its output to the client; returns the exit code."""
+    stdout = _Output(connection, 'stdout', request.get('tty', False))
+    stderr = _Output(connection, 'stderr', False)
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin = io.StringIO(request.get('stdin') or '')
+    sys.stdout, sys.stderr = stdout, stderr
+    profiling.mark_start()
+    try:
+        cli.main(args=request['argv'], prog_name='fm.sh', standalone_mode=True)
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        print(f"An error occurred: {e}", file=stderr)
+        exit_code = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+    stdout.send()
+    stderr.send()
+    return exit_code
+
+
+def _listen(socket_path):
+    if os.path.exists(socket_path):
+        # Refuse to start twice; clear the socket left behind by a daemon that died
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    return server
+
+
+def serve(socket_path=SOCKET_PATH):
+    """Warm everything up and serve forwarded commands, one at a time, until interrupted."""
+    from finance_manager.cli import cli, open_db
+    from finance_manager.classifier import get_classifier
+    from finance_manager.ai import get_client
+    # Import the command modules now rather than on the first request
+    from finance_manager import categorizer, importer, queries, response_cache, summary, totals  # noqa: F401
+
+    db = open_db()
+    try:
+        get_classifier(db)
+    finally:
+        db.close()
+    get_client()
+
+    cwd = os.getcwd()
+    settings = _settings()
+    server = _listen(socket_path)
+    print(f"Serving on {os.path.abspath(socket_path)} (Ctrl+C to stop)")
+    try:
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                try:
+                    request = _receive(connection)
+                    if request is None:
+                        continue
+                    if request.get('cwd') != cwd or request.get('settings') != settings:
+                        # The client would use another database, login or categorizer than the one loaded here
+                        _send(connection, {'exit_code': None})
+                        continue
+                    _send(connection, {'exit_code': _run(cli, request, connection)})
+                except OSError:
+                    continue
+    except KeyboardInterrupt:
+        print("Daemon stopped.")
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,114 @@
+"""
+Duplicate detection for added and imported transactions.
+
+Every transaction stores a fingerprint: a 64-bit hash of the user, the day,
+the amount in cents, the type and the description with case and spacing
+normalized, indexed with the user id. Re-typing a transaction or importing
+an overlapping statement produces the same fingerprint again.
+
+Bulk imports load the user's fingerprints into a Bloom filter once (a scan
+of the index, not the table) and test whole chunks against it in memory.
+Rows it has never seen are new for certain; only the few it might have seen
+are confirmed with one indexed IN query per chunk, so duplicate checks cost
+no per-row SELECT. A statement may hold the same transaction twice (two
+fares of the same amount on one day), so imports compare counts: only the
+rows of a fingerprint beyond the number already stored are duplicates.
+"""
+import hashlib
+import math
+import os
+from collections import Counter
+
+import numpy as np
+from sqlalchemy import select
+
+from finance_manager.models import Transaction
+
+# False-positive rate of the Bloom filter; false positives only cost a lookup in the IN query
+ERROR_RATE = float(os.getenv('FM_DEDUPE_ERROR_RATE', '0.01'))
+# Room left in the filter for the rows being imported
+EXPECTED_IMPORT = 100000
+
+
+def normalize(description):
+    return ' '.join((description or '').lower().split())
+
+
+def fingerprint(user_id, timestamp, amount, type, description):
+    """Signed 64-bit hash of a transaction's user, day, amount in cents, type and normalized description."""
+    key = f"{user_id}|{timestamp.date().isoformat()}|{amount}|{type}|{normalize(description)}"
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def with_fingerprint(db, user_id, value):
+    """(id, timestamp) of a user's transactions with this fingerprint."""
+    return db.query(Transaction.id, Transaction.timestamp).filter(
+        Transaction.user_id == user_id, Transaction.fingerprint == value)
+
+
+def find_duplicate(db, user_id, value):
+    """(id, timestamp) of a user's transaction with this fingerprint, or None."""
+    return with_fingerprint(db, user_id, value).first()
+
+
+def fingerprints_of(user_id):
+    """Statement reading all of a user's fingerprints, straight from the (user_id, fingerprint) index."""
+    return select(Transaction.fingerprint).where(Transaction.user_id == user_id, Transaction.fingerprint.isnot(None))
+
+
+def known_fingerprints(db, user_id, values):
+    """Query of the fingerprints in `values`, once per transaction of the user that has it."""
+    return db.query(Transaction.fingerprint).filter(
+        Transaction.user_id == user_id, Transaction.fingerprint.in_(values))
+
+
+class BloomFilter:
+    """
+    Bloom filter over 64-bit fingerprints. Fingerprints are already hashes,
+    so the probe positions are derived from their two halves (double hashing)
+    and whole arrays are added and tested at once with numpy.
+    """
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros(self.size, dtype=bool)
+
+    def _positions(self, fingerprints):
+        values = np.asarray(fingerprints, dtype=np.int64).view(np.uint64)
+        low = values & np.uint64(0xFFFFFFFF)
+        high = (values >> np.uint64(32)) | np.uint64(1)
+        probes = np.arange(self.hashes, dtype=np.uint64)
+        return (low[:, None] + probes[None, :] * high[:, None]) % np.uint64(self.size)
+
+    def add(self, fingerprints):
+        if len(fingerprints):
+            self.bits[self._positions(fingerprints)] = True
+
+    def might_contain(self, fingerprints):
+        """Boolean array: False means the fingerprint was certainly never added."""
+        if not len(fingerprints):
+            return np.zeros(0, dtype=bool)
+        return self.bits[self._positions(fingerprints)].all(axis=1)
+
+
+class DuplicateFilter:
+    """Counts the transactions a user already has per fingerprint, for a bulk import."""
+
+    def __init__(self, db, user_id, expected=EXPECTED_IMPORT):
+        self.db = db
+        self.user_id = user_id
+        # Plain Core rows: no ORM overhead per fingerprint
+        result = db.connection().execute(fingerprints_of(user_id))
+        existing = np.fromiter(result.scalars(), dtype=np.int64)
+        self.bloom = BloomFilter(len(existing) + expected)
+        self.bloom.add(existing)
+
+    def stored_counts(self, fingerprints):
+        """{fingerprint: transactions with it} for those of `fingerprints` the user already has."""
+        candidates = np.asarray(list(fingerprints), dtype=np.int64)
+        candidates = candidates[self.bloom.might_contain(candidates)]
+        if not len(candidates):
+            return Counter()
+        return Counter(value for value, in known_fingerprints(self.db, self.user_id, set(candidates.tolist())))
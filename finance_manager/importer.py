@@ -0,0 +1,229 @@
+import csv
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from finance_manager.models import Transaction, Category
+from finance_manager.categorizer import categorize_many
+from finance_manager.totals import apply_deltas, apply_period_deltas, deltas_for, period_deltas_for
+from finance_manager.money import to_cents
+from finance_manager.dedupe import DuplicateFilter, fingerprint
+from finance_manager import response_cache, profiling
+
+# Rows are written in chunks, each chunk in its own short database transaction
+CHUNK_SIZE = 5000
+# Number of distinct descriptions sent to the model per categorization request
+BATCH_SIZE = 100
+
+# Header aliases found in common bank and M-Pesa statement exports
+COLUMN_ALIASES = {
+    'date': 'timestamp',
+    'completion time': 'timestamp',
+    'transaction date': 'timestamp',
+    'details': 'description',
+    'narrative': 'description',
+    'paid in': 'paid_in',
+    'withdrawn': 'withdrawn',
+}
+
+DATE_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+)
+
+
+def parse_timestamp(value):
+    """Parse a statement date, returning None when it is empty."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+
+def parse_amount(value):
+    """Parse an amount such as '1,250.00' or '-300' into cents."""
+    if value is None or value == '':
+        return None
+    return to_cents(value)
+
+
+def normalize_row(raw):
+    """Turn a raw statement row into a dict with timestamp, description, amount, type and category."""
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        name = key.strip().lower()
+        row[COLUMN_ALIASES.get(name, name)] = value.strip() if isinstance(value, str) else value
+
+    description = row.get('description') or ''
+    amount = parse_amount(row.get('amount'))
+    txn_type = (row.get('type') or '').strip().lower()
+
+    # M-Pesa style statements split money in and out into separate columns
+    if amount is None:
+        paid_in = parse_amount(row.get('paid_in'))
+        withdrawn = parse_amount(row.get('withdrawn'))
+        if paid_in:
+            amount, txn_type = paid_in, txn_type or 'income'
+        elif withdrawn:
+            amount, txn_type = withdrawn, txn_type or 'expense'
+
+    if amount is None:
+        raise ValueError("Row has no amount")
+    if txn_type not in ('income', 'expense'):
+        txn_type = 'expense' if amount < 0 else 'income'
+
+    return {
+        'timestamp': parse_timestamp(row.get('timestamp')) or datetime.utcnow(),
+        'description': description,
+        'amount': abs(amount),
+        'type': txn_type,
+        'category': (row.get('category') or '').strip() or None,
+    }
+
+
+def read_statement(path, fmt=None):
+    """Stream raw rows from a CSV or JSONL statement without loading the whole file."""
+    if fmt is None:
+        fmt = 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        elif fmt == 'jsonl':
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported statement format: {fmt}")
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from `iterable`."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CategoryResolver:
+    """Map category names to ids, creating missing categories in bulk."""
+
+    def __init__(self, db):
+        self.db = db
+        self.ids = {name: id for id, name in db.query(Category.id, Category.name)}
+
+    def resolve(self, names):
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            self.db.execute(insert(Category), [{'name': name} for name in missing])
+            for id, name in self.db.query(Category.id, Category.name).filter(Category.name.in_(missing)):
+                self.ids[name] = id
+        return self.ids
+
+
+@profiling.timed('import')
+def import_transactions(db, user_id, rows, chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE, keep_duplicates=False):
+    """
+    Bulk insert statement rows for a user.
+
+    Rows are processed `chunk_size` at a time: rows the user already has
+    (same fingerprint, see dedupe.py) are dropped unless `keep_duplicates`;
+    a fingerprint repeated in the statement is a duplicate only for as many
+    times as it was stored before the import,
+    descriptions without a category are looked up in the description cache
+    and the misses categorized in batches, then the whole chunk is written
+    with a single executemany INSERT, its running totals updated, and
+    committed. Returns (imported, skipped, duplicates); with `keep_duplicates`
+    duplicates are imported and only counted.
+    """
+    resolver = CategoryResolver(db)
+    duplicate_filter = DuplicateFilter(db, user_id)
+    imported = skipped = duplicates = 0
+    # Rows per fingerprint in this import so far, and stored before it (looked up on first sight)
+    in_file = Counter()
+    stored = Counter()
+
+    for chunk in chunked(rows, chunk_size):
+        records = []
+        for raw in chunk:
+            try:
+                record = normalize_row(raw)
+            except (ValueError, TypeError):
+                skipped += 1
+                continue
+            record['fingerprint'] = fingerprint(user_id, record['timestamp'], record['amount'], record['type'],
+                                                record['description'])
+            records.append(record)
+
+        # Rows beyond the count already stored are new, found before any categorization; fingerprints
+        # seen in an earlier chunk are not looked up again, so rows this import wrote never count as stored
+        stored.update(duplicate_filter.stored_counts({r['fingerprint'] for r in records} - set(in_file)))
+        unique = []
+        for record in records:
+            in_file[record['fingerprint']] += 1
+            if in_file[record['fingerprint']] <= stored[record['fingerprint']]:
+                duplicates += 1
+                if not keep_duplicates:
+                    continue
+            unique.append(record)
+        records = unique
+        if not records:
+            continue
+
+        uncategorized = [r['description'] for r in records if not r['category']]
+        if uncategorized:
+            categories = categorize_many(db, uncategorized, batch_size)
+            for record in records:
+                if not record['category']:
+                    record['category'] = categories.get(record['description']) or 'Uncategorized'
+
+        try:
+            category_ids = resolver.resolve({r['category'] for r in records})
+            db.execute(insert(Transaction), [
+                {
+                    'user_id': user_id,
+                    'category_id': category_ids[r['category']],
+                    'amount': r['amount'],
+                    'type': r['type'],
+                    'timestamp': r['timestamp'],
+                    'description': r['description'] or None,
+                    'fingerprint': r['fingerprint'],
+                }
+                for r in records
+            ])
+            apply_deltas(db, user_id, deltas_for(
+                (category_ids[r['category']], r['type'], r['amount']) for r in records
+            ))
+            apply_period_deltas(db, user_id, period_deltas_for(
+                (category_ids[r['category']], r['type'], r['amount'], r['timestamp']) for r in records
+            ))
+            response_cache.invalidate(db, user_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        imported += len(records)
+
+    return imported, skipped, duplicates
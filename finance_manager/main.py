@@ -1,4 +1,13 @@
-from finance_manager.cli import cli
+import sys
+
+from finance_manager import profiling  # noqa: F401  (imported first: starts the clock for --profile)
+from finance_manager.daemon import forward
 
 if __name__ == "__main__":
+    # Hand the command to a running `serve` daemon, or run it here when there is none
+    exit_code = forward(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from finance_manager.cli import cli
     cli()
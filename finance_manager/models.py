@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Date, DateTime, Index, Text, LargeBinary
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -11,6 +11,7 @@ class User(Base):
     name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False) 
+    data_version = Column(Integer, nullable=False, default=0, server_default='0')  # bumped whenever transactions change
     transactions = relationship('Transaction', back_populates='user')
 
 class Category(Base):
@@ -26,17 +27,99 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(BigInteger, nullable=False)  # in cents, see money.py
     type = Column(String(10), nullable=False)  # 'income' or 'expense'
     timestamp = Column(DateTime, default=datetime.utcnow)
+    description = Column(Text)  # as entered or imported; full-text indexed on SQLite, see search.py
+    fingerprint = Column(BigInteger)  # hash of user, day, amount, type and description, see dedupe.py
     user = relationship('User', back_populates='transactions')
     category = relationship('Category', back_populates='transactions')
 
+    __table_args__ = (
+        # Listing a user's transactions in date order
+        Index('ix_transactions_user_timestamp', 'user_id', 'timestamp'),
+        # Per-category lookups and sums for a user
+        Index('ix_transactions_user_category_type', 'user_id', 'category_id', 'type'),
+        Index('ix_transactions_category_id', 'category_id'),
+        # Duplicate checks on add and import
+        Index('ix_transactions_user_fingerprint', 'user_id', 'fingerprint'),
+        # A user's largest expenses, read in amount order
+        Index('ix_transactions_user_type_amount', 'user_id', 'type', 'amount'),
+    )
+
 class Budget(Base):
     __tablename__ = 'budgets'
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(BigInteger, nullable=False)  # in cents
+    period = Column(String(10), nullable=False, default='monthly', server_default='monthly')  # 'weekly', 'monthly' or 'custom'
+    starts_on = Column(Date)  # first and last day of a custom period
+    ends_on = Column(Date)
     user = relationship('User')
     category = relationship('Category')
+
+    __table_args__ = (
+        Index('uq_budgets_user_category', 'user_id', 'category_id', unique=True),
+    )
+
+
+class CategoryCache(Base):
+    __tablename__ = 'category_cache'
+
+    description = Column(String(255), primary_key=True)  # normalized description
+    category = Column(String(50), nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CategoryTotal(Base):
+    __tablename__ = 'category_totals'
+
+    # Running totals per user, category and transaction type, kept in step with `transactions`
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    category_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    type = Column(String(10), primary_key=True)
+    amount = Column(BigInteger, nullable=False, default=0)  # in cents
+    count = Column(Integer, nullable=False, default=0)
+
+
+class PeriodTotal(Base):
+    __tablename__ = 'period_totals'
+
+    # Totals per user, category and type for each day, week (from Monday) and calendar month,
+    # kept in step with `transactions` like CategoryTotal
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    category_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    type = Column(String(10), primary_key=True)
+    period = Column(String(5), primary_key=True)  # 'day', 'week' or 'month'
+    start = Column(Date, primary_key=True)  # first day of the bucket
+    amount = Column(BigInteger, nullable=False, default=0)  # in cents
+    count = Column(Integer, nullable=False, default=0)
+
+
+class AIResponse(Base):
+    __tablename__ = 'ai_responses'
+
+    key = Column(String(64), primary_key=True)  # sha256 of user, data version, prompt and scenario
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class TransactionArchive(Base):
+    __tablename__ = 'transaction_archive'
+
+    # Transactions moved out of `transactions` by `archive`, one row per user, month and batch
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month the transactions fall in
+    count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON rows, see retention.py
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_transaction_archive_user_month', 'user_id', 'month'),
+    )
@@ -0,0 +1,44 @@
+"""
+Money amounts.
+
+Amounts are stored as integers in minor units (cents), so sums and budget
+comparisons in the database are exact. Values entered by users or read from
+statements are parsed as Decimal and converted here; nothing in between
+touches a float.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENTS = 100
+# Amounts are stored in BIGINT columns: signed 64-bit cents
+MIN_CENTS, MAX_CENTS = -2 ** 63, 2 ** 63 - 1
+
+
+def to_cents(value):
+    """
+    Convert '1,250.50', Decimal('1250.5') or 1250 to integer cents (1250.50 -> 125050).
+
+    Raises ValueError for anything that is not a finite amount a BIGINT column holds.
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).replace(',', '').strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    cents = amount * CENTS
+    if not MIN_CENTS <= cents <= MAX_CENTS:
+        raise ValueError(f"Amount out of range: {value!r}")
+    return int(cents.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Decimal amount for integer cents (125050 -> Decimal('1250.50'))."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_amount(cents):
+    """'1250.50' for 125050 cents."""
+    units, rest = divmod(abs(int(cents)), CENTS)
+    return f"{'-' if cents < 0 else ''}{units}.{rest:02d}"
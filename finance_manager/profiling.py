@@ -0,0 +1,229 @@
+"""
+Per-command profiling.
+
+With `--profile` (or FM_PROFILE=1) a command reports where its time went
+on stderr: wall time per phase (startup, opening the database, password
+hashing, categorization, AI calls...), every SQL statement counted and
+timed through SQLAlchemy's cursor events, the slowest and most repeated
+statements (a statement run many times is usually an N+1 lookup), and the
+latency and token counts of the Gemini calls. `--profile-json` writes the
+same metrics as JSON for monitoring, and `--profile-dump` saves cProfile
+statistics for `python -m pstats`.
+
+When profiling is off, phases and the SQL hooks cost a single None check.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+# Started when the entry point imports this module, so 'startup' covers importing and parsing
+STARTED = time.perf_counter()
+
+SLOW_QUERY_MS = float(os.getenv('FM_PROFILE_SLOW_MS', '50'))
+# Statements listed under slow and repeated queries
+TOP_QUERIES = 5
+
+_current = None
+_hooks_installed = False
+
+
+class Profile:
+    def __init__(self, command, dump_path=None, json_path=None):
+        self.command = command
+        self.dump_path = dump_path
+        self.json_path = json_path
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases = {'startup': [self.started - STARTED, 1]}
+        self.queries = {}  # statement -> [count, total seconds, slowest seconds]
+        self.slow = []  # (seconds, statement)
+        self.ai_calls = []  # (seconds, attempts, prompt tokens, response tokens)
+        self.profiler = None
+        if dump_path:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            phase = self.phases.setdefault(name, [0.0, 0])
+            phase[0] += seconds
+            phase[1] += 1
+
+    def add_query(self, statement, seconds):
+        with self.lock:
+            query = self.queries.setdefault(statement, [0, 0.0, 0.0])
+            query[0] += 1
+            query[1] += seconds
+            query[2] = max(query[2], seconds)
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                self.slow.append((seconds, statement))
+
+    def add_ai_call(self, seconds, attempts, response):
+        usage = getattr(response, 'usage_metadata', None)
+        with self.lock:
+            self.ai_calls.append((seconds, attempts, getattr(usage, 'prompt_token_count', None) or 0,
+                                  getattr(usage, 'candidates_token_count', None) or 0))
+
+    def metrics(self):
+        total = time.perf_counter() - STARTED
+        statements = sorted(self.queries.items(), key=lambda item: -item[1][1])
+        return {
+            'command': self.command,
+            'total_ms': total * 1000,
+            'phases': {name: {'ms': seconds * 1000, 'calls': calls} for name, (seconds, calls) in self.phases.items()},
+            'sql': {
+                'statements': sum(count for count, _, _ in self.queries.values()),
+                'distinct': len(self.queries),
+                'ms': sum(seconds for _, seconds, _ in self.queries.values()) * 1000,
+                'slow_threshold_ms': SLOW_QUERY_MS,
+                'slow': [{'ms': seconds * 1000, 'statement': statement}
+                         for seconds, statement in sorted(self.slow, reverse=True)[:TOP_QUERIES]],
+                'top': [{'statement': statement, 'count': count, 'ms': seconds * 1000, 'max_ms': slowest * 1000}
+                        for statement, (count, seconds, slowest) in statements[:TOP_QUERIES]],
+            },
+            'ai': {
+                'calls': len(self.ai_calls),
+                'attempts': sum(attempts for _, attempts, _, _ in self.ai_calls),
+                'ms': sum(seconds for seconds, _, _, _ in self.ai_calls) * 1000,
+                'max_ms': max((seconds for seconds, _, _, _ in self.ai_calls), default=0.0) * 1000,
+                'prompt_tokens': sum(tokens for _, _, tokens, _ in self.ai_calls),
+                'response_tokens': sum(tokens for _, _, _, tokens in self.ai_calls),
+            },
+        }
+
+
+def _statement_key(statement):
+    return ' '.join(statement.split())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current is not None:
+        conn.info.setdefault('fm_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current is not None and conn.info.get('fm_query_started'):
+        _current.add_query(_statement_key(statement), time.perf_counter() - conn.info['fm_query_started'].pop())
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    started = context.connection.info.get('fm_query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def _install_hooks():
+    """Time every statement of every engine, including ones created later."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    _hooks_installed = True
+
+
+def mark_start():
+    """Restart the clock 'startup' is measured from (the daemon does this per forwarded command)."""
+    global STARTED
+    STARTED = time.perf_counter()
+
+
+def start(command, dump_path=None, json_path=None):
+    """Start profiling the current command."""
+    global _current
+    _install_hooks()
+    _current = Profile(command, dump_path, json_path)
+
+
+def finish():
+    """Stop profiling, print the report to stderr and write the requested files."""
+    global _current
+    profile, _current = _current, None
+    if profile is None:
+        return
+    profile.add_phase('command', time.perf_counter() - profile.started)
+    if profile.profiler is not None:
+        profile.profiler.disable()
+        profile.profiler.dump_stats(profile.dump_path)
+    metrics = profile.metrics()
+    print_report(metrics, sys.stderr)
+    if profile.dump_path:
+        print(f"cProfile statistics written to {profile.dump_path} (view with: python -m pstats {profile.dump_path})",
+              file=sys.stderr)
+    if profile.json_path:
+        with open(profile.json_path, 'w') as f:
+            json.dump(metrics, f, indent=2)
+
+
+class _Phase:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profile.add_phase(self.name, time.perf_counter() - self.started)
+
+
+_NOT_PROFILING = nullcontext()
+
+
+def phase(name):
+    """Context manager timing a block as a named phase of the current profile."""
+    if _current is None:
+        return _NOT_PROFILING
+    return _Phase(_current, name)
+
+
+def timed(name):
+    """Decorator timing every call of a function as a named phase."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_ai_call(seconds, attempts, response):
+    if _current is not None:
+        _current.add_ai_call(seconds, attempts, response)
+
+
+def _shorten(statement, width=100):
+    return statement if len(statement) <= width else statement[:width - 3] + '...'
+
+
+def print_report(metrics, out):
+    print(f"\nProfile of '{metrics['command']}': {metrics['total_ms']:.1f} ms", file=out)
+    print("  Phases (nested phases are included in their parents):", file=out)
+    for name, phase in metrics['phases'].items():
+        print(f"    {name:24} {phase['ms']:9.1f} ms  x{phase['calls']}", file=out)
+
+    sql = metrics['sql']
+    print(f"  SQL: {sql['statements']} statements ({sql['distinct']} distinct) in {sql['ms']:.1f} ms", file=out)
+    for query in sql['top']:
+        print(f"    {query['ms']:9.1f} ms  x{query['count']:<5} {_shorten(query['statement'])}", file=out)
+    if sql['slow']:
+        print(f"  Slow statements (over {sql['slow_threshold_ms']:g} ms):", file=out)
+        for query in sql['slow']:
+            print(f"    {query['ms']:9.1f} ms  {_shorten(query['statement'])}", file=out)
+
+    ai = metrics['ai']
+    if ai['calls']:
+        print(f"  AI: {ai['calls']} calls ({ai['attempts']} attempts) in {ai['ms']:.1f} ms, slowest {ai['max_ms']:.1f} ms; "
+              f"{ai['prompt_tokens']} prompt and {ai['response_tokens']} response tokens", file=out)
+    else:
+        print("  AI: no calls", file=out)
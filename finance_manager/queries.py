@@ -0,0 +1,150 @@
+"""
+Read queries shared by the commands and the AI prompt builders.
+
+Each function returns a Query of lightweight rows (named tuples) rather than
+ORM objects, with categories joined in the database, so a command runs a
+fixed number of statements however many transactions a user has. Amounts and
+totals are integer cents; sums run exactly in the database. The lookups at
+the end return the ORM objects the commands go on to change.
+"""
+from sqlalchemy import func, tuple_
+
+from finance_manager.models import Transaction, Category, CategoryTotal, PeriodTotal, User, Budget
+
+# Rows fetched per keyset page when streaming transactions
+PAGE_SIZE = 500
+
+
+def transactions_with_category(db, user_id):
+    """(id, timestamp, type, amount, category) for each of a user's transactions, oldest first."""
+    return db.query(
+        Transaction.id,
+        Transaction.timestamp,
+        Transaction.type,
+        Transaction.amount,
+        Category.name.label('category'),
+    ).join(Category, Category.id == Transaction.category_id).filter(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.timestamp, Transaction.id)
+
+
+def iter_transactions(db, user_id, since=None, until=None, category=None, type=None, limit=None,
+                      page_size=PAGE_SIZE):
+    """
+    Stream a user's transactions, oldest first, with optional filters
+    (`since` is inclusive, `until` exclusive).
+
+    Rows are read in keyset pages ordered by (timestamp, id): each page starts
+    after the last row of the previous one, so every page is an index range
+    scan and memory stays flat however many rows match.
+    """
+    query = transactions_with_category(db, user_id)
+    if since is not None:
+        query = query.filter(Transaction.timestamp >= since)
+    if until is not None:
+        query = query.filter(Transaction.timestamp < until)
+    if category:
+        query = query.filter(Category.name == category)
+    if type:
+        query = query.filter(Transaction.type == type)
+
+    after = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page = query
+        if after is not None:
+            page = page.filter(tuple_(Transaction.timestamp, Transaction.id) > after)
+        size = page_size if remaining is None else min(page_size, remaining)
+
+        fetched = 0
+        for row in page.limit(size).yield_per(size):
+            yield row
+            fetched += 1
+            after = (row.timestamp, row.id)
+
+        if remaining is not None:
+            remaining -= fetched
+        if fetched < size:
+            return
+
+
+def category_summary(db, user_id):
+    """(type, category, total, count) per category and type, read from the running totals."""
+    return db.query(
+        CategoryTotal.type,
+        Category.name.label('category'),
+        CategoryTotal.amount.label('total'),
+        CategoryTotal.count.label('count'),
+    ).join(Category, Category.id == CategoryTotal.category_id).filter(
+        CategoryTotal.user_id == user_id,
+        CategoryTotal.count > 0,
+    ).order_by(CategoryTotal.type, Category.name)
+
+
+def month_of(db, column):
+    """SQL expression for the 'YYYY-MM' month of a timestamp column."""
+    if db.get_bind().dialect.name == 'sqlite':
+        return func.strftime('%Y-%m', column)
+    return func.to_char(column, 'YYYY-MM')
+
+
+def monthly_totals(db, user_id):
+    """(month, type, total, count) per calendar month, oldest first, summed from the month buckets."""
+    month = month_of(db, PeriodTotal.start).label('month')
+    return db.query(
+        month,
+        PeriodTotal.type,
+        func.sum(PeriodTotal.amount).label('total'),
+        func.sum(PeriodTotal.count).label('count'),
+    ).filter(
+        PeriodTotal.user_id == user_id,
+        PeriodTotal.period == 'month',
+    ).group_by(month, PeriodTotal.type).having(func.sum(PeriodTotal.count) > 0).order_by(month)
+
+
+def monthly_category_expenses(db, user_id, since):
+    """(month, category, total) of expenses per month and category from the month of `since` on."""
+    month = month_of(db, PeriodTotal.start).label('month')
+    return db.query(
+        month,
+        Category.name.label('category'),
+        func.sum(PeriodTotal.amount).label('total'),
+    ).join(Category, Category.id == PeriodTotal.category_id).filter(
+        PeriodTotal.user_id == user_id,
+        PeriodTotal.type == 'expense',
+        PeriodTotal.period == 'month',
+        PeriodTotal.start >= since,
+    ).group_by(month, Category.name)
+
+
+def largest_expenses(db, user_id, count):
+    """(timestamp, amount, category) of a user's largest expenses."""
+    return db.query(
+        Transaction.timestamp,
+        Transaction.amount,
+        Category.name.label('category'),
+    ).join(Category, Category.id == Transaction.category_id).filter(
+        Transaction.user_id == user_id,
+        Transaction.type == 'expense',
+    ).order_by(Transaction.amount.desc()).limit(count)
+
+
+def user_by_email(db, email):
+    """The user with this email (at most one)."""
+    return db.query(User).filter(User.email == email)
+
+
+def user_transaction(db, user_id, transaction_id):
+    """The transaction with this id, if it belongs to the user."""
+    return db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == user_id)
+
+
+def budget_for(db, user_id, category_id):
+    """A user's budget for a category (at most one)."""
+    return db.query(Budget).filter(Budget.category_id == category_id, Budget.user_id == user_id)
+
+
+def budgets_with_category(db, user_id):
+    """(Budget, category name) for each of a user's budgets, by category name."""
+    return db.query(Budget, Category.name).join(Category, Category.id == Budget.category_id).filter(
+        Budget.user_id == user_id).order_by(Category.name)
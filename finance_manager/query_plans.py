@@ -0,0 +1,99 @@
+"""
+Check that the CLI's hot queries are served by indexes.
+
+Runs EXPLAIN QUERY PLAN for each query shape used by the commands and
+reports any full table scan of the large tables, and any temporary
+B-tree sort of transactions an index could have returned in order:
+
+    python -m finance_manager.query_plans
+"""
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects import sqlite
+
+from finance_manager.database import init_db, ReadSessionLocal, SchemaOutdated
+from finance_manager.models import Transaction
+from finance_manager import dedupe, export, queries, retention, search, totals
+
+# Tables that grow with usage and must never be scanned in full
+LARGE_TABLES = ('transactions', 'budgets', 'category_totals', 'period_totals')
+
+# Each entry calls the function the commands use, with sample arguments
+HOT_QUERIES = {
+    'user by email': lambda db: queries.user_by_email(db, 'user@example.com'),
+    'transactions by user': lambda db: queries.transactions_with_category(db, 1),
+    'transactions keyset page': lambda db: queries.transactions_with_category(db, 1).filter(
+        tuple_(Transaction.timestamp, Transaction.id) > (datetime(2024, 1, 1), 1)).limit(queries.PAGE_SIZE),
+    'category summary': lambda db: queries.category_summary(db, 1),
+    'monthly totals': lambda db: queries.monthly_totals(db, 1),
+    'monthly category expenses': lambda db: queries.monthly_category_expenses(db, 1, date(2024, 1, 1)),
+    'largest expenses': lambda db: queries.largest_expenses(db, 1, 5),
+    'transaction by id': lambda db: queries.user_transaction(db, 1, 1),
+    'budget for category': lambda db: queries.budget_for(db, 1, 1),
+    'budgets with categories': lambda db: queries.budgets_with_category(db, 1),
+    'spending in a monthly budget period': lambda db: totals.spending_between(
+        db, 1, [1, 2], date(2024, 3, 1), date(2024, 4, 1)),
+    'spending in a weekly budget period': lambda db: totals.spending_between(
+        db, 1, [1], date(2024, 3, 11), date(2024, 3, 18)),
+    'spending in a custom budget period': lambda db: totals.spending_between(
+        db, 1, [1, 2], date(2024, 1, 15), date(2024, 6, 20)),
+    'description search': lambda db: search.search_query(db, 1, 'kplc tok').limit(search.LIMIT),
+    'duplicate by fingerprint': lambda db: dedupe.with_fingerprint(db, 1, 1234567890),
+    'fingerprints of a user': lambda db: dedupe.fingerprints_of(1),
+    'known fingerprints': lambda db: dedupe.known_fingerprints(db, 1, [1, 2, 3]),
+    'delete batch': lambda db: retention.matching(db, 1).limit(retention.BATCH_SIZE),
+    'delete batch in a range': lambda db: retention.matching(
+        db, 1, datetime(2024, 1, 1), datetime(2024, 2, 1)).limit(retention.BATCH_SIZE),
+    'delete batch of a category': lambda db: retention.matching(db, 1, category_id=1).limit(retention.BATCH_SIZE),
+    'archive batch': lambda db: retention.matching(db, 1, until=datetime(2024, 1, 1)).limit(retention.BATCH_SIZE),
+    'export scan': lambda db: export.export_statement(1),
+    'export scan in a range': lambda db: export.export_statement(1, datetime(2024, 1, 1), datetime(2024, 2, 1)),
+}
+
+
+def explain(db, query):
+    """Return the detail lines of the SQLite query plan for an ORM query or a Core statement."""
+    statement = getattr(query, 'statement', query)
+    sql = statement.compile(dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def full_scans(plan):
+    """Plan lines that read a large table without an index."""
+    return [line for line in plan
+            if line.startswith('SCAN') and line.split()[1] in LARGE_TABLES and 'INDEX' not in line]
+
+
+def unindexed_sorts(plan):
+    """Temporary B-tree lines of a plan that reads a range of transactions, rather than rows looked up by id."""
+    ranges = [line for line in plan if line.split()[:2] in (['SCAN', 'transactions'], ['SEARCH', 'transactions'])
+              and 'PRIMARY KEY' not in line]
+    return [line for line in plan if line.startswith('USE TEMP B-TREE')] if ranges else []
+
+
+def main():
+    try:
+        init_db()
+    except SchemaOutdated as e:
+        print(e)
+        return 1
+    db = ReadSessionLocal()
+    failures = 0
+    try:
+        for name, build in HOT_QUERIES.items():
+            plan = explain(db, build(db))
+            scans = full_scans(plan)
+            sorts = unindexed_sorts(plan)
+            failures += bool(scans or sorts)
+            print(f"{'FULL SCAN' if scans else 'SORT' if sorts else 'OK':9} {name}")
+            for line in plan:
+                print(f"          {line}")
+    finally:
+        db.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Persistent cache of Gemini responses for advice and scenario simulation.
+
+Entries are keyed on a hash of the user's data version, the kind of prompt,
+the summary settings and the scenario text. Any change to a user's
+transactions bumps the data version and drops their cached responses, so a
+stale answer is never served. Entries also expire after a TTL and the
+least recently used ones are evicted once the cache is full.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from finance_manager.models import User, AIResponse
+from finance_manager.summary import TOKEN_BUDGET
+
+TTL = timedelta(seconds=int(os.getenv('FM_RESPONSE_TTL', str(24 * 60 * 60))))
+MAX_ENTRIES = int(os.getenv('FM_RESPONSE_CACHE_SIZE', '500'))
+
+
+def response_key(user, kind, scenario=''):
+    """Hash identifying a response to `kind` ('advice' or 'scenario') for the user's current data."""
+    parts = [str(user.id), str(user.data_version), kind, str(TOKEN_BUDGET), scenario.strip()]
+    return hashlib.sha256("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+
+def get(db, key):
+    """Return the cached response text, or None when missing or expired."""
+    entry = db.query(AIResponse).filter(AIResponse.key == key).first()
+    if entry is None:
+        return None
+    now = datetime.utcnow()
+    if entry.created_at < now - TTL:
+        db.delete(entry)
+        db.commit()
+        return None
+    entry.last_used_at = now
+    db.commit()
+    return entry.response
+
+
+def put(db, user_id, key, kind, response):
+    """Store a response and evict expired and least recently used entries; commits."""
+    now = datetime.utcnow()
+    db.query(AIResponse).filter(AIResponse.key == key).delete(synchronize_session=False)
+    db.execute(insert(AIResponse), [{'key': key, 'user_id': user_id, 'kind': kind, 'response': response,
+                                     'created_at': now, 'last_used_at': now}])
+
+    db.query(AIResponse).filter(AIResponse.created_at < now - TTL).delete(synchronize_session=False)
+    cutoff = db.query(AIResponse.last_used_at).order_by(
+        AIResponse.last_used_at.desc()).offset(MAX_ENTRIES).limit(1).scalar()
+    if cutoff is not None:
+        db.query(AIResponse).filter(AIResponse.last_used_at <= cutoff).delete(synchronize_session=False)
+    db.commit()
+
+
+def invalidate(db, user_id):
+    """
+    Mark a user's transactions as changed.
+
+    Call this in the same database transaction as the change: it bumps the
+    user's data version and drops their cached responses.
+    """
+    db.query(User).filter(User.id == user_id).update(
+        {User.data_version: User.data_version + 1}, synchronize_session=False)
+    db.query(AIResponse).filter(AIResponse.user_id == user_id).delete(synchronize_session=False)
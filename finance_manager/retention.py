@@ -0,0 +1,131 @@
+"""
+Deleting and archiving transactions in bounded batches.
+
+Large deletes run as a series of short database transactions of at most
+BATCH_SIZE rows, so other commands get the write lock between batches
+instead of waiting behind one statement over the whole table. Each batch
+takes its rows out of the running totals and bumps the user's data version
+in the same transaction, so totals and caches are right after every batch,
+even if the command is interrupted.
+
+Archiving moves transactions older than a number of months into
+transaction_archive, one row per user, month and batch holding the
+transactions as zlib-compressed JSON. Archived transactions are not in the
+running totals; the cash-flow report reads them only when asked to.
+"""
+import json
+import os
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from finance_manager.models import Transaction, TransactionArchive
+from finance_manager import response_cache, totals
+
+BATCH_SIZE = int(os.getenv('FM_DELETE_BATCH_SIZE', '5000'))
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def matching(db, user_id, since=None, until=None, category_id=None):
+    """(id, category_id, type, amount, timestamp, description) of a user's transactions in a range; `until` is exclusive."""
+    query = db.query(Transaction.id, Transaction.category_id, Transaction.type, Transaction.amount,
+                     Transaction.timestamp, Transaction.description).filter(Transaction.user_id == user_id)
+    if since is not None:
+        query = query.filter(Transaction.timestamp >= since)
+    if until is not None:
+        query = query.filter(Transaction.timestamp < until)
+    if category_id is not None:
+        query = query.filter(Transaction.category_id == category_id)
+    return query
+
+
+def _remove(db, user_id, rows):
+    """Delete rows read by matching and take them out of the running totals, in the caller's transaction."""
+    db.query(Transaction).filter(Transaction.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+    deltas = totals.deltas_for((row.category_id, row.type, row.amount) for row in rows)
+    totals.apply_deltas(db, user_id, {key: (-amount, -count) for key, (amount, count) in deltas.items()})
+    period_deltas = totals.period_deltas_for((row.category_id, row.type, row.amount, row.timestamp)
+                                             for row in rows if row.timestamp is not None)
+    totals.apply_period_deltas(db, user_id, {key: (-amount, -count) for key, (amount, count) in period_deltas.items()})
+    response_cache.invalidate(db, user_id)
+
+
+def delete_transactions(db, user_id, since=None, until=None, category_id=None, batch_size=BATCH_SIZE):
+    """
+    Delete a user's transactions in a range, committing every batch. Without
+    filters everything goes, including the user's archive.
+    """
+    deleted = 0
+    query = matching(db, user_id, since, until, category_id)
+    while True:
+        # No ORDER BY: deleted rows are gone from the index, so each batch is the start of the range
+        rows = query.limit(batch_size).all()
+        if rows:
+            _remove(db, user_id, rows)
+            deleted += len(rows)
+        last = len(rows) < batch_size
+        if last and since is None and until is None and category_id is None:
+            # Everything is gone: drop the archive and the totals rows, now zero, with the final batch
+            db.query(TransactionArchive).filter(TransactionArchive.user_id == user_id).delete(
+                synchronize_session=False)
+            totals.clear(db, user_id)
+            response_cache.invalidate(db, user_id)
+        db.commit()
+        if last:
+            break
+    return deleted
+
+
+def months_ago(months, today=None):
+    """First day of the month `months` calendar months before the current one."""
+    today = today or datetime.utcnow().date()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _pack(rows):
+    return zlib.compress(json.dumps([
+        [row.id, None if row.timestamp is None else (row.timestamp - EPOCH) // MICROSECOND,
+         row.category_id, row.type, row.amount, row.description]
+        for row in rows
+    ], separators=(',', ':')).encode('utf-8'))
+
+
+def archive_transactions(db, user_id, before, batch_size=BATCH_SIZE):
+    """
+    Move a user's transactions dated before `before` into the archive, in
+    batches that commit separately. Returns (transactions moved, compressed bytes).
+    """
+    moved = size = 0
+    query = matching(db, user_id, until=datetime.combine(before, datetime.min.time()))
+    while True:
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[row.timestamp.date().replace(day=1)].append(row)
+        archived = [{'user_id': user_id, 'month': month, 'count': len(month_rows), 'data': _pack(month_rows),
+                     'created_at': datetime.utcnow()}
+                    for month, month_rows in by_month.items()]
+        db.execute(insert(TransactionArchive), archived)
+        _remove(db, user_id, rows)
+        db.commit()
+        moved += len(rows)
+        size += sum(len(row['data']) for row in archived)
+        if len(rows) < batch_size:
+            break
+    return moved, size
+
+
+def iter_archived(db, user_id):
+    """
+    [id, microseconds since 1970 or None, category_id, type, amount, description]
+    for each archived transaction; archives written before descriptions were
+    stored have no description.
+    """
+    for (data,) in db.query(TransactionArchive.data).filter(TransactionArchive.user_id == user_id).yield_per(100):
+        yield from json.loads(zlib.decompress(data))
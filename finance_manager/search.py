@@ -0,0 +1,122 @@
+"""
+Full-text search over transaction descriptions.
+
+On SQLite, descriptions are indexed in `transactions_fts`, an FTS5 table
+that reads its text from `transactions` (an external-content index, so
+descriptions are not stored twice) and is kept in step by triggers on
+insert, update and delete. Searches match every word of the query as a
+prefix ("kpl pay" finds "KPLC prepaid payment") and are ranked with bm25,
+so they use the inverted index instead of scanning every description.
+
+The owner of each transaction is indexed as a token too ('u42'), so the
+index intersects a user's rows with the matching ones itself rather than
+returning every user's matches for SQL to filter.
+
+Other databases fall back to case-insensitive LIKE matching of each word,
+which works but scans the user's transactions.
+"""
+import re
+
+from sqlalchemy import and_, or_, table, column
+
+from finance_manager.models import Transaction, Category
+
+# Default number of results shown by `search`
+LIMIT = 20
+
+# Prefix indexes for 2- and 3-character prefixes make short prefix queries
+# index lookups instead of scans of every term in the vocabulary
+CREATE_STATEMENTS = (
+    # The indexed columns as FTS5 reads them when rebuilding the index
+    """CREATE VIEW IF NOT EXISTS transactions_fts_content AS
+        SELECT id, description, 'u' || user_id AS owner FROM transactions""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, owner, content='transactions_fts_content', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+        INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+)
+DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TABLE IF EXISTS transactions_fts",
+    "DROP VIEW IF EXISTS transactions_fts_content",
+)
+REBUILD_STATEMENT = "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"
+
+# The FTS table for queries; its hidden column of the same name takes MATCH expressions
+transactions_fts = table('transactions_fts', column('rowid'), column('rank'), column('transactions_fts'))
+
+
+def create_index(connection):
+    """Create the FTS5 table and its triggers if missing, indexing existing descriptions (SQLite only)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'").first()
+    for statement in CREATE_STATEMENTS:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql(REBUILD_STATEMENT)
+
+
+def words(text):
+    return re.findall(r"\w+", text or '')
+
+
+def match_expression(user_id, text):
+    """
+    FTS5 query for a user's descriptions containing every word of `text` as
+    a prefix, e.g. 'owner:"u1" AND description:("kplc"* AND "pay"*)'.
+    """
+    # Quoted words can't be read as FTS5 operators or column names
+    prefixes = ' AND '.join(f'"{word}"*' for word in words(text))
+    return f'owner:"u{user_id}" AND description:({prefixes})'
+
+
+
+def search_query(db, user_id, text):
+    """
+    (id, timestamp, type, amount, category, description) of a user's
+    transactions whose description matches every word of `text` as a
+    prefix, best matches first.
+    """
+    query = db.query(
+        Transaction.id,
+        Transaction.timestamp,
+        Transaction.type,
+        Transaction.amount,
+        Category.name.label('category'),
+        Transaction.description,
+    ).join(Category, Category.id == Transaction.category_id).filter(Transaction.user_id == user_id)
+
+    if db.get_bind().dialect.name == 'sqlite':
+        # bm25 rank from the FTS table; ties go to the most recent transaction
+        fts = transactions_fts.c
+        query = query.join(transactions_fts, fts.rowid == Transaction.id).filter(
+            fts.transactions_fts.op('MATCH')(match_expression(user_id, text))
+        ).order_by(fts.rank, Transaction.timestamp.desc())
+    else:
+        query = query.filter(and_(*(
+            or_(Transaction.description.ilike(f"{word}%"), Transaction.description.ilike(f"% {word}%"))
+            for word in words(text)
+        ))).order_by(Transaction.timestamp.desc())
+    return query
+
+
+def search(db, user_id, text, limit=LIMIT):
+    """The best `limit` matches of search_query, or nothing for a query without words."""
+    if not words(text):
+        return []
+    return search_query(db, user_id, text).limit(limit).all()
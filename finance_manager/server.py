@@ -0,0 +1,683 @@
+"""
+HTTP/JSON API for web and mobile front ends.
+
+`python -m finance_manager.main serve-api` runs an asyncio server exposing
+signup, login, transactions, budgets, advice and simulation over JSON. The
+event loop only parses requests and writes responses; everything that
+blocks runs on one of three thread pools, so a slow call never holds up
+the others:
+
+  database   queries and writes, as many threads as the engine's connection
+             pool has connections (FM_DB_POOL_SIZE + FM_DB_MAX_OVERFLOW)
+  passwords  bcrypt hashing and checks, one thread per CPU
+  ai         Gemini calls, which mostly wait on the network; they commit
+             before calling out, so they hold no database connection
+
+Clients authenticate with the same signed session tokens as the CLI:
+`/signup` and `/login` return one, and other requests send it as
+`Authorization: Bearer <token>`. Checking a token is an HMAC, with no
+database query. Money amounts are Ksh, sent and returned as numbers with
+at most two decimals.
+
+The HTTP side is a small HTTP/1.1 implementation on the standard library,
+with keep-alive, Content-Length bodies, and limits on header and body size.
+"""
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+HOST = os.getenv('FM_API_HOST', '127.0.0.1')
+PORT = int(os.getenv('FM_API_PORT', '8000'))
+# Threads waiting on Gemini at once
+AI_THREADS = int(os.getenv('FM_API_AI_THREADS', '16'))
+# Seconds an idle keep-alive connection stays open
+KEEPALIVE = float(os.getenv('FM_API_KEEPALIVE', '15'))
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# Upper bounds on what one request may ask for
+MAX_TRANSACTIONS = 1000
+MAX_PATHS = 20000
+
+DUPLICATE_MESSAGE = "This looks like a transaction you already have; send allow_duplicate to add it."
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'error': message, **extra}
+
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HTTPError(400, "Request body is not valid JSON.")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        return data
+
+
+class Pools:
+    """The thread pools blocking work runs on."""
+
+    def __init__(self):
+        from finance_manager.database import POOL_SIZE, MAX_OVERFLOW
+        self.database = ThreadPoolExecutor(POOL_SIZE + MAX_OVERFLOW, thread_name_prefix='api-db')
+        self.passwords = ThreadPoolExecutor(os.cpu_count() or 1, thread_name_prefix='api-bcrypt')
+        self.ai = ThreadPoolExecutor(AI_THREADS, thread_name_prefix='api-ai')
+
+    def shutdown(self):
+        for pool in (self.database, self.passwords, self.ai):
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+pools = None
+
+
+async def run(pool, function, *args, **kwargs):
+    """Run a blocking function on a pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(pool, partial(function, *args, **kwargs))
+
+
+def _session(readonly=False):
+    from finance_manager.database import SessionLocal, ReadSessionLocal
+    return ReadSessionLocal() if readonly else SessionLocal()
+
+
+def _amount(value, field='amount'):
+    from finance_manager.money import to_cents
+    if isinstance(value, bool) or value is None:
+        raise HTTPError(400, f"'{field}' must be a number.")
+    try:
+        return to_cents(value)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+
+def _ksh(cents):
+    return cents / 100
+
+
+def _required(body, *fields):
+    missing = [field for field in fields if body.get(field) in (None, '')]
+    if missing:
+        raise HTTPError(400, f"Missing fields: {', '.join(missing)}.")
+    return [body[field] for field in fields]
+
+
+def _day(value, field):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{field}' must be a date (YYYY-MM-DD).")
+
+
+def _user(request):
+    """The LoggedInUser of the request's bearer token."""
+    from finance_manager import session
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    user = session.verify(token) if scheme.lower() == 'bearer' and token else None
+    if user is None:
+        raise HTTPError(401, "A valid session token is required.")
+    return user
+
+
+def _token(user):
+    from finance_manager import session
+    token = session.issue(user.id, user.name, user.email)
+    return {'token': token, 'expires': session.verify(token).expires,
+            'user': {'id': user.id, 'name': user.name, 'email': user.email}}
+
+
+# Users
+
+def _create_user(name, email, password_hash):
+    from sqlalchemy.exc import IntegrityError
+    from finance_manager.models import User
+    db = _session()
+    try:
+        user = User(name=name, email=email, password_hash=password_hash)
+        db.add(user)
+        db.commit()
+        return _token(user)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPError(409, "Email already exists.")
+    finally:
+        db.close()
+
+
+async def signup(request):
+    from finance_manager.session import hash_password
+    name, email, password = _required(request.json(), 'name', 'email', 'password')
+    password_hash = await run(pools.passwords, hash_password, password)
+    return 201, await run(pools.database, _create_user, name, email, password_hash)
+
+
+def _find_user(email):
+    from finance_manager.models import User
+    from finance_manager import queries
+    db = _session(readonly=True)
+    try:
+        return queries.user_by_email(db, email).with_entities(
+            User.id, User.name, User.email, User.password_hash).first()
+    finally:
+        db.close()
+
+
+def _update_password_hash(user_id, password_hash):
+    from finance_manager.models import User
+    db = _session()
+    try:
+        db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash})
+        db.commit()
+    finally:
+        db.close()
+
+
+_dummy_hash = None
+
+
+def _check_unknown_user(password):
+    """Take as long as checking a real password, so response times do not tell which emails have accounts."""
+    from finance_manager.session import check_password, hash_password
+    global _dummy_hash
+    if _dummy_hash is None:
+        # Hashed with the current FM_BCRYPT_ROUNDS, the cost real users' hashes are brought to
+        _dummy_hash = hash_password('not the password of any user')
+    check_password(password, _dummy_hash)
+    return False, None
+
+
+async def login(request):
+    from finance_manager.session import check_password
+    email, password = _required(request.json(), 'email', 'password')
+    user = await run(pools.database, _find_user, email)
+    verified, new_hash = (await run(pools.passwords, check_password, password, user.password_hash)
+                          if user else await run(pools.passwords, _check_unknown_user, password))
+    if not verified:
+        raise HTTPError(401, "Invalid email or password.")
+    if new_hash:
+        # Stored with a different bcrypt cost than FM_BCRYPT_ROUNDS
+        await run(pools.database, _update_password_hash, user.id, new_hash)
+    return 200, _token(user)
+
+
+# Transactions
+
+def _list_transactions(user_id, since, until, category, type, limit):
+    from finance_manager import queries
+    db = _session(readonly=True)
+    try:
+        return [{'id': row.id, 'date': row.timestamp.isoformat(' ', 'seconds'), 'type': row.type,
+                 'amount': _ksh(row.amount), 'category': row.category}
+                for row in queries.iter_transactions(db, user_id, since, until, category, type, limit)]
+    finally:
+        db.close()
+
+
+async def list_transactions(request):
+    user = _user(request)
+    query = request.query
+    since = until = None
+    if 'since' in query:
+        since = datetime.combine(_day(query['since'], 'since'), datetime.min.time())
+    if 'until' in query:
+        # Like the CLI, `until` includes the whole day
+        until = datetime.combine(_day(query['until'], 'until'), datetime.min.time()) + timedelta(days=1)
+    type = query.get('type')
+    if type not in (None, 'income', 'expense'):
+        raise HTTPError(400, "'type' must be income or expense.")
+    try:
+        limit = min(int(query.get('limit', 100)), MAX_TRANSACTIONS)
+    except ValueError:
+        raise HTTPError(400, "'limit' must be a number.")
+    if limit < 1:
+        raise HTTPError(400, "'limit' must be at least 1.")
+    rows = await run(pools.database, _list_transactions, user.id, since, until, query.get('category'), type, limit)
+    return 200, {'transactions': rows}
+
+
+def _check_duplicate(user_id, fingerprint):
+    from finance_manager import dedupe
+    db = _session(readonly=True)
+    try:
+        return dedupe.find_duplicate(db, user_id, fingerprint)
+    finally:
+        db.close()
+
+
+def _categorize(description):
+    """Category for a description; may call Gemini, so it runs on the ai pool."""
+    from finance_manager.categorizer import categorize
+    db = _session()
+    try:
+        category = categorize(db, description)
+        db.commit()
+        return category
+    finally:
+        db.close()
+
+
+def _add_transaction(user_id, description, amount, type, category_name, timestamp, fingerprint,
+                     allow_duplicate=False):
+    """Insert a transaction with its running totals; returns the response and the budget status."""
+    from finance_manager.models import Transaction, Category, User
+    from finance_manager import budgets, dedupe, queries, response_cache, totals
+    db = _session()
+    try:
+        # Adds for one user run one at a time (BEGIN IMMEDIATE on SQLite, the row lock elsewhere),
+        # so two identical requests cannot both pass the duplicate check
+        db.query(User.id).filter(User.id == user_id).with_for_update().one()
+        if not allow_duplicate:
+            duplicate = dedupe.find_duplicate(db, user_id, fingerprint)
+            if duplicate:
+                raise HTTPError(409, DUPLICATE_MESSAGE, duplicate_of=duplicate.id)
+
+        category = db.query(Category).filter(Category.name == category_name).first()
+        if not category:
+            category = Category(name=category_name)
+            db.add(category)
+            db.flush()
+
+        transaction = Transaction(user_id=user_id, category_id=category.id, amount=amount, type=type,
+                                  timestamp=timestamp, description=description or None, fingerprint=fingerprint)
+        db.add(transaction)
+        totals.record(db, user_id, category.id, type, amount, timestamp)
+        response_cache.invalidate(db, user_id)
+        db.commit()
+
+        result = {'id': transaction.id, 'date': timestamp.isoformat(' ', 'seconds'), 'type': type,
+                  'amount': _ksh(amount), 'category': category_name, 'description': description}
+        if type == 'expense':
+            budget = queries.budget_for(db, user_id, category.id).first()
+            spent = budgets.spent_in_period(db, budget, timestamp.date()) if budget else None
+            if spent is not None:
+                result['budget'] = {'period': budget.period, 'amount': _ksh(budget.amount), 'spent': _ksh(spent),
+                                    'remaining': _ksh(budget.amount - spent)}
+        return result
+    finally:
+        db.close()
+
+
+async def add_transaction(request):
+    from finance_manager import dedupe
+    user = _user(request)
+    body = request.json()
+    description, amount, type = _required(body, 'description', 'amount', 'type')
+    amount = _amount(amount)
+    if type not in ('income', 'expense'):
+        raise HTTPError(400, "'type' must be income or expense.")
+    description = str(description).strip()
+
+    timestamp = datetime.utcnow()
+    fingerprint = dedupe.fingerprint(user.id, timestamp, amount, type, description)
+    allow_duplicate = bool(body.get('allow_duplicate'))
+    if not allow_duplicate:
+        # Spares categorizing a plain repeat; _add_transaction checks again in its transaction
+        duplicate = await run(pools.database, _check_duplicate, user.id, fingerprint)
+        if duplicate:
+            raise HTTPError(409, DUPLICATE_MESSAGE, duplicate_of=duplicate.id)
+
+    category = (body.get('category') or '').strip().title() or await run(pools.ai, _categorize, description)
+    if not category:
+        raise HTTPError(502, "Unable to determine the transaction category.")
+    return 201, await run(pools.database, _add_transaction, user.id, description, amount, type, category,
+                          timestamp, fingerprint, allow_duplicate)
+
+
+# Budgets
+
+def _list_budgets(user_id):
+    from finance_manager.budgets import overview, today
+    db = _session(readonly=True)
+    try:
+        return [{'category': category, 'period': period, 'amount': _ksh(amount), 'spent': _ksh(spent),
+                 'remaining': _ksh(amount - spent)}
+                for category, period, amount, spent in overview(db, user_id, today())]
+    finally:
+        db.close()
+
+
+async def list_budgets(request):
+    user = _user(request)
+    return 200, {'budgets': await run(pools.database, _list_budgets, user.id)}
+
+
+def _set_budget(user_id, category_name, amount, period, starts_on, ends_on):
+    from finance_manager.models import Category, Budget
+    from finance_manager import queries
+    db = _session()
+    try:
+        category = db.query(Category).filter(Category.name == category_name).first()
+        if not category:
+            raise HTTPError(404, f"Category '{category_name}' not found.")
+        budget = queries.budget_for(db, user_id, category.id).first()
+        if budget is None:
+            budget = Budget(user_id=user_id, category_id=category.id)
+            db.add(budget)
+        budget.amount = amount
+        budget.period = period
+        budget.starts_on = starts_on
+        budget.ends_on = ends_on
+        db.commit()
+    finally:
+        db.close()
+
+
+async def set_budget(request):
+    from finance_manager.budgets import PERIODS
+    user = _user(request)
+    body = request.json()
+    category, amount = _required(body, 'category', 'amount')
+    amount = _amount(amount)
+    period = body.get('period', 'monthly')
+    if period not in PERIODS:
+        raise HTTPError(400, f"'period' must be one of {', '.join(PERIODS)}.")
+    starts_on = ends_on = None
+    if period == 'custom':
+        starts_on, ends_on = (_day(value, field) for field, value in zip(
+            ('starts_on', 'ends_on'), _required(body, 'starts_on', 'ends_on')))
+        if ends_on < starts_on:
+            raise HTTPError(400, "'ends_on' must not be before 'starts_on'.")
+    await run(pools.database, _set_budget, user.id, category, amount, period, starts_on, ends_on)
+    return 200, {'category': category, 'amount': _ksh(amount), 'period': period,
+                 'starts_on': starts_on and starts_on.isoformat(), 'ends_on': ends_on and ends_on.isoformat()}
+
+
+# Advice and simulation
+
+def _cached_response(user_id, kind, scenario='', summarize=False):
+    """(cache key, cached text or None, summary for the prompt when not cached)."""
+    from finance_manager.models import User
+    from finance_manager import response_cache
+    from finance_manager.summary import build_summary
+    db = _session()  # a cache hit records when the response was last used
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            raise HTTPError(404, "User not found.")
+        key = response_cache.response_key(user, kind, scenario)
+        text = response_cache.get(db, key)
+        summary = build_summary(db, user_id) if text is None and summarize else None
+        db.commit()
+        return key, text, summary
+    finally:
+        db.close()
+
+
+def _store_response(user_id, key, kind, text):
+    from finance_manager import response_cache
+    db = _session()
+    try:
+        response_cache.put(db, user_id, key, kind, text)
+    finally:
+        db.close()
+
+
+async def _generate(user_id, key, kind, prompt_function, prompt):
+    """Call Gemini on the ai pool and cache the text; None when the model gave none."""
+    response = await run(pools.ai, prompt_function, prompt)
+    text = getattr(response, 'text', None)
+    if text is not None:
+        await run(pools.database, _store_response, user_id, key, kind, text)
+    return text
+
+
+async def advice(request):
+    from finance_manager.ai import generate_financial_advice
+    user = _user(request)
+    # Reuse the last answer while the user's transactions are unchanged
+    key, text, summary = await run(pools.database, _cached_response, user.id, 'advice', summarize=True)
+    if text is None:
+        if not summary:
+            raise HTTPError(404, "No transactions found.")
+        text = await _generate(user.id, key, 'advice', generate_financial_advice, summary)
+        if text is None:
+            raise HTTPError(502, "No advice available at the moment.")
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        result = None
+    if not isinstance(result, dict):
+        raise HTTPError(502, "The model's advice could not be read; try again later.")
+    return 200, {'analysis': result.get('analysis', ''), 'advice': result.get('advice', [])}
+
+
+def _simulate(user_id, salary_change, recurring, cuts, horizon, paths, seed, history_months, balance):
+    from finance_manager.models import User
+    from finance_manager.analytics import load_columns, current_month
+    from finance_manager import simulation
+    db = _session(readonly=True)
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            raise HTTPError(404, "User not found.")
+        # Archived transactions count towards the starting balance
+        columns = load_columns(db, user, include_archive=True)
+    finally:
+        db.close()
+    if not len(columns.day):
+        raise HTTPError(404, "No transactions found.")
+
+    codes = {name.lower(): code for code, name in enumerate(columns.categories)}
+    unknown = [category for category, _ in cuts if category.lower() not in codes]
+    if unknown:
+        raise HTTPError(400, f"Unknown categories: {', '.join(unknown)}.", categories=sorted(columns.categories))
+    scenario = simulation.Scenario(
+        salary_change=salary_change / 100,
+        recurring=recurring,
+        cuts={codes[category.lower()]: percent / 100 for category, percent in cuts},
+    )
+    result = simulation.simulate(columns, scenario, current_month(), horizon, paths, seed, history_months, balance)
+
+    parts = [f"income {salary_change:+g}%"] if salary_change else []
+    parts += [f"new recurring expense {name} of Ksh {amount / 100:,.2f}/month" for name, amount in recurring]
+    parts += [f"{category} cut by {percent:g}%" for category, percent in cuts]
+    scenario_text = "; ".join(parts) or "no change"
+
+    def percentiles(rows):
+        return {f"p{p}": [round(value) / 100 for value in row] for p, row in zip(simulation.PERCENTILES, rows)}
+
+    return {
+        'scenario': scenario_text,
+        'months': result.months,
+        'history_months': result.history_months,
+        'paths': result.paths,
+        'start_balance': _ksh(result.start_balance),
+        'baseline': percentiles(result.baseline),
+        'with_scenario': percentiles(result.scenario),
+        'baseline_net': round(result.baseline_net) / 100,
+        'scenario_net': round(result.scenario_net) / 100,
+        'baseline_negative': result.baseline_negative,
+        'scenario_negative': result.scenario_negative,
+    }, simulation.describe(result, scenario_text)
+
+
+def _number(body, field, default, convert=float, low=None, high=None):
+    value = body.get(field, default)
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        value = convert(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{field}' must be a number.")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise HTTPError(400, f"'{field}' must be between {low} and {high}.")
+    return value
+
+
+async def simulate(request):
+    from finance_manager.ai import narrate_simulation
+    user = _user(request)
+    body = request.json()
+    try:
+        recurring = [(str(item['name']), _amount(item['amount'])) for item in body.get('recurring', [])]
+        cuts = [(str(item['category']), _number(item, 'percent', None)) for item in body.get('cuts', [])]
+    except (KeyError, TypeError):
+        raise HTTPError(400, "'recurring' items need name and amount, 'cuts' items category and percent.")
+    balance = _amount(body['balance'], 'balance') if body.get('balance') is not None else None
+
+    # Numpy releases the GIL for the heavy lifting, so this shares the database pool
+    result, results_text = await run(
+        pools.database, _simulate, user.id,
+        _number(body, 'salary_change', 0.0), recurring, cuts,
+        _number(body, 'months', 12, int, 1, 120), _number(body, 'paths', 5000, int, 1, MAX_PATHS),
+        _number(body, 'seed', 0, int), _number(body, 'history', 12, int, 1, 600), balance)
+
+    if body.get('narrate'):
+        key, text, _ = await run(pools.database, _cached_response, user.id, 'simulation', results_text)
+        if text is None:
+            text = await _generate(user.id, key, 'simulation', narrate_simulation, results_text)
+        result['narration'] = text
+    return 200, result
+
+
+async def health(request):
+    return 200, {'status': 'ok'}
+
+
+ROUTES = {
+    ('GET', '/health'): health,
+    ('POST', '/signup'): signup,
+    ('POST', '/login'): login,
+    ('GET', '/transactions'): list_transactions,
+    ('POST', '/transactions'): add_transaction,
+    ('GET', '/budgets'): list_budgets,
+    ('PUT', '/budgets'): set_budget,
+    ('GET', '/advice'): advice,
+    ('POST', '/simulate'): simulate,
+}
+
+
+# HTTP
+
+async def read_request(reader):
+    """The next Request on a connection, or None when the client closed it."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request headers are too large.")
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HTTPError(400, "Malformed request line.")
+    headers = {}
+    for line in lines[1:]:
+        name, separator, value = line.partition(':')
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    if version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive':
+        headers.setdefault('connection', 'close')
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(411, "Send a Content-Length instead of a chunked body.")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length.")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body is too large.")
+    body = await reader.readexactly(length) if length else b''
+
+    url = urlsplit(target)
+    return Request(method.upper(), url.path.rstrip('/') or '/', dict(parse_qsl(url.query)), headers, body)
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+
+
+async def dispatch(request):
+    handler = ROUTES.get((request.method, request.path))
+    if handler is None:
+        methods = sorted(method for method, path in ROUTES if path == request.path)
+        if methods:
+            raise HTTPError(405, f"Use {' or '.join(methods)} for {request.path}.")
+        raise HTTPError(404, f"No endpoint {request.path}.")
+    return await handler(request)
+
+
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                status, payload = await dispatch(request)
+            except HTTPError as e:
+                status, payload = e.status, e.payload
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception as e:
+                print(f"Error handling request: {e!r}", file=sys.stderr)
+                status, payload = 500, {'error': "Internal server error."}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _serve(host, port):
+    server = await asyncio.start_server(handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    print(f"API listening on http://{host}:{port} (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+def serve(host=HOST, port=PORT):
+    """Warm up and serve the API until interrupted."""
+    global pools
+    from finance_manager.database import init_db, SessionLocal
+    from finance_manager.classifier import get_classifier
+    # Import the handler modules now rather than on the first request
+    from finance_manager import (analytics, budgets, categorizer, dedupe, queries, response_cache,  # noqa: F401
+                                 session, simulation, summary, totals)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        get_classifier(db)
+    finally:
+        db.close()
+
+    pools = Pools()
+    try:
+        asyncio.run(_serve(host, port))
+    except KeyboardInterrupt:
+        print("API server stopped.")
+    finally:
+        pools.shutdown()
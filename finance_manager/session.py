@@ -0,0 +1,149 @@
+"""
+Login sessions and password hashing.
+
+Logging in saves a signed token with the user's id, name, email and expiry
+in the config directory (FM_CONFIG_DIR, by default ~/.config/finance-manager),
+one token per database so directories with different databases keep their
+own logins. Commands check the token's signature and expiry locally and use
+the id it carries, so knowing who is logged in costs no database query.
+Tokens are signed with HMAC-SHA256 using FM_SESSION_SECRET, or a random key
+created in the config directory on first use.
+
+Only the standard library is imported here; passlib is imported when a
+password is hashed.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import namedtuple
+
+CONFIG_DIR = os.getenv('FM_CONFIG_DIR') or os.path.join(
+    os.getenv('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'), 'finance-manager')
+SESSION_DAYS = float(os.getenv('FM_SESSION_DAYS', '30'))
+# bcrypt cost (4-31): each step doubles the time to hash or check a password
+BCRYPT_ROUNDS = int(os.getenv('FM_BCRYPT_ROUNDS', '12'))
+
+LoggedInUser = namedtuple('LoggedInUser', ['id', 'name', 'email', 'expires'])
+
+
+def database_key():
+    """Short hash identifying the database, with relative SQLite paths made absolute."""
+    url = os.getenv('FM_DATABASE_URL', "sqlite:///finance_manager.db")  # same default as database.py
+    if url.startswith('sqlite:///') and not url.startswith('sqlite:////'):
+        url = 'sqlite:///' + os.path.abspath(url[len('sqlite:///'):])
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+
+
+def _token_path():
+    return os.path.join(CONFIG_DIR, 'sessions', f"{database_key()}.token")
+
+
+def _write_private(path, data):
+    """Atomically write a file only the current user can read."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+_secret_key = None
+
+
+def _secret():
+    """The signing key, read once per process (the API server verifies a token on every request)."""
+    global _secret_key
+    if _secret_key is None:
+        _secret_key = _load_secret()
+    return _secret_key
+
+
+def _load_secret():
+    secret = os.getenv('FM_SESSION_SECRET')
+    if secret:
+        return secret.encode('utf-8')
+    path = os.path.join(CONFIG_DIR, 'secret.key')
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        key = secrets.token_bytes(32)
+        _write_private(path, key)
+        return key
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _sign(body):
+    return _encode(hmac.new(_secret(), body, hashlib.sha256).digest())
+
+
+def issue(user_id, name, email, days=SESSION_DAYS):
+    """A signed token for the user, valid for `days` days."""
+    payload = {'id': user_id, 'name': name, 'email': email, 'exp': int(time.time() + days * 86400),
+               'db': database_key()}
+    body = _encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    return (body + b'.' + _sign(body)).decode('ascii')
+
+
+def verify(token):
+    """The LoggedInUser a token was issued for, or None if it is forged, expired or for another database."""
+    try:
+        body, signature = token.strip().encode('ascii').split(b'.')
+    except (UnicodeEncodeError, ValueError):
+        return None
+    if not hmac.compare_digest(signature, _sign(body)):
+        return None
+    payload = json.loads(_decode(body))
+    if payload['exp'] < time.time() or payload['db'] != database_key():
+        return None
+    return LoggedInUser(payload['id'], payload['name'], payload['email'], payload['exp'])
+
+
+def save(token):
+    _write_private(_token_path(), token.encode('ascii'))
+
+
+def load():
+    """The logged-in user for this database, or None."""
+    try:
+        with open(_token_path(), 'r') as f:
+            return verify(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def clear():
+    try:
+        os.remove(_token_path())
+    except FileNotFoundError:
+        pass
+
+
+def hash_password(password):
+    from passlib.hash import bcrypt
+    return bcrypt.using(rounds=BCRYPT_ROUNDS).hash(password)
+
+
+def check_password(password, password_hash):
+    """
+    Return (matches, new hash). The new hash is set when the password
+    matches but was hashed with a different cost than FM_BCRYPT_ROUNDS,
+    so changing the cost takes effect at each user's next login.
+    """
+    from passlib.hash import bcrypt
+    handler = bcrypt.using(rounds=BCRYPT_ROUNDS)
+    if not handler.verify(password, password_hash):
+        return False, None
+    return True, handler.hash(password) if handler.needs_update(password_hash) else None
@@ -0,0 +1,113 @@
+"""
+Seeded Monte Carlo simulation of a user's balance.
+
+Future months are drawn from the user's own history: each simulated month
+reuses the income and per-category expenses of a randomly chosen past
+month, which keeps seasonal and cross-category patterns together. The
+baseline and the scenario (salary change, new recurring expenses, category
+cuts) are run on the same draws, so the difference between them is the
+effect of the scenario alone. The same seed always gives the same numbers.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from finance_manager.analytics import month_numbers, month_label, group_sum
+from finance_manager import profiling
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+Scenario = namedtuple('Scenario', ['salary_change', 'recurring', 'cuts'])
+"""
+salary_change: fraction of income (0.1 is a 10% raise); recurring: list of
+(name, cents per month); cuts: {category code: fraction cut (0.2 is 20% less)}.
+"""
+
+Simulation = namedtuple('Simulation', [
+    'months', 'history_months', 'start_balance', 'paths',
+    'baseline', 'scenario',  # balance percentiles, one row per PERCENTILES entry, one column per month
+    'baseline_net', 'scenario_net',  # median monthly net
+    'baseline_negative', 'scenario_negative',  # share of paths whose balance drops below zero
+])
+
+
+def history(columns, months, current_month):
+    """
+    Income (months,) and expenses per category (months, categories) for the
+    last `months` complete calendar months, in cents.
+    """
+    month = month_numbers(columns.day)
+    last = int(month.max())
+    if last >= current_month and int(month.min()) < current_month:
+        last = current_month - 1  # the current month is incomplete
+    first = max(int(month.min()), last - months + 1)
+    selected = (month >= first) & (month <= last)
+    size = last - first + 1
+    index = month[selected] - first
+    expense = columns.expense[selected]
+    amount = columns.amount[selected]
+    n_categories = len(columns.categories)
+
+    income = group_sum(index[~expense], amount[~expense], size)
+    keys = index[expense] * n_categories + columns.category[selected][expense]
+    expenses = group_sum(keys, amount[expense], size * n_categories).reshape(size, n_categories)
+    return income, expenses, last
+
+
+@profiling.timed('simulate')
+def simulate(columns, scenario, current_month, horizon=12, paths=5000, seed=0, history_months=12,
+             start_balance=None):
+    """
+    Run baseline and scenario paths; returns a Simulation with amounts in
+    cents. The start balance defaults to the net of every transaction in
+    `columns`, so pass columns loaded with the archive.
+    """
+    income, expenses, last = history(columns, history_months, current_month)
+    if start_balance is None:
+        start_balance = int(np.where(columns.expense, -columns.amount, columns.amount).sum())
+
+    # Scenario totals per historical month, so each path only indexes two vectors
+    factors = np.ones(expenses.shape[1])
+    for category, cut in scenario.cuts.items():
+        factors[category] = 1 - cut
+    baseline_net = income - expenses.sum(axis=1)
+    scenario_net = (income * (1 + scenario.salary_change) - (expenses * factors).sum(axis=1)
+                    - sum(amount for _, amount in scenario.recurring))
+
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(0, len(income), size=(paths, horizon))
+    baseline = start_balance + np.cumsum(baseline_net[draws], axis=1)
+    projected = start_balance + np.cumsum(scenario_net[draws], axis=1)
+
+    return Simulation(
+        months=[month_label(last + 1 + i) for i in range(horizon)],
+        history_months=len(income),
+        start_balance=start_balance,
+        paths=paths,
+        baseline=np.percentile(baseline, PERCENTILES, axis=0),
+        scenario=np.percentile(projected, PERCENTILES, axis=0),
+        baseline_net=float(np.median(baseline_net[draws])),
+        scenario_net=float(np.median(scenario_net[draws])),
+        baseline_negative=float((baseline.min(axis=1) < 0).mean()),
+        scenario_negative=float((projected.min(axis=1) < 0).mean()),
+    )
+
+
+def describe(simulation, scenario_text):
+    """Plain-text results for the narration prompt."""
+    def ksh(cents):
+        return f"{cents / 100:,.0f}"
+
+    lines = [
+        f"Scenario: {scenario_text}",
+        f"{simulation.paths} simulated paths over {len(simulation.months)} months "
+        f"({simulation.months[0]} to {simulation.months[-1]}), drawn from {simulation.history_months} months of history",
+        f"Starting balance: {ksh(simulation.start_balance)}",
+        f"Median monthly net: {ksh(simulation.baseline_net)} now, {ksh(simulation.scenario_net)} with the scenario",
+    ]
+    for label, percentiles in (("Without the scenario", simulation.baseline), ("With the scenario", simulation.scenario)):
+        ends = ", ".join(f"P{p}: {ksh(value)}" for p, value in zip(PERCENTILES, percentiles[:, -1]))
+        lines.append(f"{label}, balance after {len(simulation.months)} months: {ends}")
+    lines.append(f"Chance of the balance dropping below zero: {simulation.baseline_negative:.0%} now, "
+                 f"{simulation.scenario_negative:.0%} with the scenario")
+    return "\n".join(lines)
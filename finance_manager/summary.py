@@ -0,0 +1,136 @@
+"""
+Compact statistics about a user's transactions for the AI prompts.
+
+Instead of one line per transaction, the prompts get totals per month and
+per category, recent category trends and the largest expenses, all
+aggregated in the database and cut to a token budget. The prompt size is
+therefore the same for 50 transactions or 500k.
+"""
+import os
+from datetime import date
+
+from finance_manager import queries, profiling
+from finance_manager.money import format_amount
+
+# Approximate prompt budget for the summary, in tokens
+TOKEN_BUDGET = int(os.getenv('FM_PROMPT_TOKENS', '1500'))
+# Months shown in the month-by-month section, most recent first
+MONTHS = 12
+# Months averaged to judge the latest month's spending in each category
+TREND_MONTHS = 3
+LARGEST_EXPENSES = 5
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _month_start(month, back):
+    """First day of the month `back` months before 'YYYY-MM'."""
+    year, number = map(int, month.split('-'))
+    index = year * 12 + number - 1 - back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class SectionWriter:
+    """Collect summary lines until the token budget is spent."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.lines = []
+
+    def fits(self, *lines):
+        return self.used + sum(estimate_tokens(line) for line in lines) <= self.budget
+
+    def add(self, line):
+        if not self.fits(line):
+            return False
+        self.lines.append(line)
+        self.used += estimate_tokens(line)
+        return True
+
+    def add_items(self, heading, items, omitted_note):
+        """Add a heading and as many items as fit, noting how many were left out."""
+        if not items or not self.fits(heading, items[0]):
+            return
+        self.add(heading)
+        for shown, item in enumerate(items):
+            if not self.add(item):
+                self.add(omitted_note(len(items) - shown))
+                return
+
+    def text(self):
+        return "\n".join(self.lines)
+
+
+@profiling.timed('build summary')
+def build_summary(db, user_id, token_budget=TOKEN_BUDGET):
+    """Return the statistics text for a user's transactions, or None when there are none."""
+    months = queries.monthly_totals(db, user_id).all()
+    if not months:
+        return None
+
+    # Totals are integer cents (exact SUMs from the database)
+    income = sum(int(row.total) for row in months if row.type == 'income')
+    expenses = sum(int(row.total) for row in months if row.type == 'expense')
+    count = sum(row.count for row in months)
+    first, latest = months[0].month, months[-1].month
+
+    writer = SectionWriter(token_budget)
+    writer.add(f"Period: {first} to {latest}, {count} transactions")
+    writer.add(f"Total income: {format_amount(income)}; total expenses: {format_amount(expenses)}; "
+               f"net: {format_amount(income - expenses)}")
+    if income:
+        writer.add(f"Savings rate: {(income - expenses) / income:.0%}")
+
+    # Expenses by category, largest first
+    categories = sorted(
+        (row for row in queries.category_summary(db, user_id) if row.type == 'expense'),
+        key=lambda row: row.total, reverse=True,
+    )
+    writer.add_items(
+        "Expenses by category (total, share, transactions):",
+        [f"- {row.category}: {format_amount(row.total)} ({row.total / (expenses or 1):.0%}), {row.count}"
+         for row in categories],
+        lambda left: f"- {left} smaller categories omitted",
+    )
+
+    # Latest month against the average of the months before it
+    recent = queries.monthly_category_expenses(db, user_id, _month_start(latest, TREND_MONTHS)).all()
+    trends = []
+    for category in sorted({row.category for row in recent}):
+        current = sum(int(row.total) for row in recent if row.category == category and row.month == latest)
+        previous = sum(int(row.total) for row in recent if row.category == category and row.month != latest)
+        average = previous // TREND_MONTHS
+        if average and abs(current - average) / average >= 0.2:
+            trends.append((current - average, f"- {category}: {format_amount(current)} in {latest} vs "
+                                              f"{format_amount(average)} average over the previous "
+                                              f"{TREND_MONTHS} months"))
+    trends.sort(key=lambda item: abs(item[0]), reverse=True)
+    writer.add_items(
+        "Notable changes in spending:",
+        [line for _, line in trends],
+        lambda left: f"- {left} smaller changes omitted",
+    )
+
+    writer.add_items(
+        "Largest expenses:",
+        [f"- {format_amount(row.amount)} on {row.category} ({row.timestamp:%Y-%m-%d})"
+         for row in queries.largest_expenses(db, user_id, LARGEST_EXPENSES)],
+        lambda left: f"- {left} more omitted",
+    )
+
+    # Month by month, most recent first
+    by_month = {}
+    for row in months:
+        by_month.setdefault(row.month, {})[row.type] = int(row.total)
+    writer.add_items(
+        "Monthly income / expenses:",
+        [f"- {month}: {format_amount(totals.get('income', 0))} / {format_amount(totals.get('expense', 0))}"
+         for month, totals in sorted(by_month.items(), reverse=True)[:MONTHS]],
+        lambda left: f"- {left} earlier months omitted",
+    )
+
+    return writer.text()
@@ -0,0 +1,181 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, or_, and_, select, update, bindparam, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from finance_manager.models import CategoryTotal, PeriodTotal
+
+# Buckets kept in period_totals
+PERIODS = ('day', 'week', 'month')
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def add_totals(db, model, rows):
+    """
+    Add each row's amount and count to the row of `model` with the same
+    primary key, creating the rows that do not exist yet.
+
+    On SQLite and PostgreSQL this is a single executemany INSERT ... ON
+    CONFLICT DO UPDATE, so a chunk touching thousands of buckets costs one
+    statement rather than one UPDATE per bucket. Rows must have distinct keys.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    keys = [column.name for column in table.primary_key]
+    upsert = UPSERTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        statement = upsert(table)
+        db.execute(statement.on_conflict_do_update(index_elements=keys, set_={
+            'amount': table.c.amount + statement.excluded.amount,
+            'count': table.c.count + statement.excluded.count,
+        }), rows)
+        return
+
+    # Elsewhere: one query for the keys that exist, then an executemany UPDATE and INSERT
+    key_columns = [table.c[key] for key in keys]
+    existing = set(db.execute(select(*key_columns).where(
+        tuple_(*key_columns).in_([tuple(row[key] for key in keys) for row in rows]))).tuples())
+    updates = [row for row in rows if tuple(row[key] for key in keys) in existing]
+    if updates:
+        db.execute(update(table).where(*(table.c[key] == bindparam(f"key_{key}") for key in keys)).values(
+            amount=table.c.amount + bindparam('delta_amount'), count=table.c.count + bindparam('delta_count'),
+        ), [{**{f"key_{key}": row[key] for key in keys},
+             'delta_amount': row['amount'], 'delta_count': row['count']} for row in updates])
+    inserts = [row for row in rows if tuple(row[key] for key in keys) not in existing]
+    if inserts:
+        db.execute(insert(table), inserts)
+
+
+def apply_deltas(db, user_id, deltas):
+    """
+    Add {(category_id, type): (amount in cents, count)} to the user's running totals.
+
+    Runs inside the caller's transaction, so the totals commit or roll back
+    together with the transaction rows that produced them.
+    """
+    add_totals(db, CategoryTotal, [
+        {'user_id': user_id, 'category_id': category_id, 'type': type, 'amount': amount, 'count': count}
+        for (category_id, type), (amount, count) in deltas.items()
+    ])
+
+
+def bucket_start(period, day):
+    """First day of the day, week (Monday) or month bucket containing `day`."""
+    if isinstance(day, datetime):
+        day = day.date()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def apply_period_deltas(db, user_id, deltas):
+    """
+    Add {(category_id, type, day): (amount in cents, count)} to the user's
+    day, week and month buckets, in the caller's transaction.
+    """
+    buckets = defaultdict(lambda: (0, 0))
+    for (category_id, type, day), (amount, count) in deltas.items():
+        for period in PERIODS:
+            key = (category_id, type, period, bucket_start(period, day))
+            total, total_count = buckets[key]
+            buckets[key] = (total + amount, total_count + count)
+
+    add_totals(db, PeriodTotal, [
+        {'user_id': user_id, 'category_id': category_id, 'type': type, 'period': period, 'start': start,
+         'amount': amount, 'count': count}
+        for (category_id, type, period, start), (amount, count) in buckets.items()
+    ])
+
+
+def record(db, user_id, category_id, type, amount, timestamp, sign=1):
+    """Add (sign=1) or remove (sign=-1) a single transaction from the running and period totals."""
+    apply_deltas(db, user_id, {(category_id, type): (sign * amount, sign)})
+    apply_period_deltas(db, user_id, {(category_id, type, timestamp.date()): (sign * amount, sign)})
+
+
+def deltas_for(rows):
+    """Aggregate (category_id, type, amount) rows into the deltas apply_deltas expects."""
+    deltas = defaultdict(lambda: (0, 0))
+    for category_id, type, amount in rows:
+        total, count = deltas[(category_id, type)]
+        deltas[(category_id, type)] = (total + amount, count + 1)
+    return deltas
+
+
+def period_deltas_for(rows):
+    """Aggregate (category_id, type, amount, timestamp) rows into the deltas apply_period_deltas expects."""
+    deltas = defaultdict(lambda: (0, 0))
+    for category_id, type, amount, timestamp in rows:
+        key = (category_id, type, timestamp.date())
+        total, count = deltas[key]
+        deltas[key] = (total + amount, count + 1)
+    return deltas
+
+
+def bucket_ranges(start, end):
+    """
+    Cover the days start <= day < end with as few buckets as possible: whole
+    months, then whole weeks, then single days at the edges. Returns
+    (period, first start, end of starts) triples.
+    """
+    ranges = []
+    first_month = bucket_start('month', start)
+    if first_month < start:
+        first_month = next_month(first_month)
+    last_month = first_month
+    while next_month(last_month) <= end:
+        last_month = next_month(last_month)
+    if last_month > first_month:
+        ranges.append(('month', first_month, last_month))
+        edges = [(start, first_month), (last_month, end)]
+    else:
+        edges = [(start, end)]
+
+    for low, high in edges:
+        first_week = low + timedelta(days=-low.weekday() % 7)
+        weeks = (high - first_week).days // 7
+        if weeks > 0:
+            last_week = first_week + timedelta(weeks=weeks)
+            ranges += [('week', first_week, last_week), ('day', low, first_week), ('day', last_week, high)]
+        else:
+            ranges.append(('day', low, high))
+    return [(period, low, high) for period, low, high in ranges if low < high]
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def spending_between(db, user_id, category_ids, start, end):
+    """
+    Query of (category_id, total) expenses for start <= day < end, read from
+    the period buckets (a row per whole month or week and per edge day).
+    """
+    conditions = [and_(PeriodTotal.period == period, PeriodTotal.start >= low, PeriodTotal.start < high)
+                  for period, low, high in bucket_ranges(start, end)]
+    return db.query(PeriodTotal.category_id, func.sum(PeriodTotal.amount)).filter(
+        PeriodTotal.user_id == user_id,
+        PeriodTotal.category_id.in_(category_ids),
+        PeriodTotal.type == 'expense',
+        or_(*conditions),
+    ).group_by(PeriodTotal.category_id)
+
+
+def spent_between(db, user_id, category_ids, start, end):
+    """Expenses in cents per category for start <= day < end."""
+    if not category_ids or start >= end:
+        return {}
+    return {category_id: int(total or 0)
+            for category_id, total in spending_between(db, user_id, category_ids, start, end)}
+
+
+def clear(db, user_id):
+    """Reset the running totals of a user whose transactions were all deleted."""
+    db.query(CategoryTotal).filter(CategoryTotal.user_id == user_id).delete(synchronize_session=False)
+    db.query(PeriodTotal).filter(PeriodTotal.user_id == user_id).delete(synchronize_session=False)
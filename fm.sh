@@ -3,9 +3,10 @@
 # The base command for the finance manager CLI
 BASE_COMMAND="python -m finance_manager.main"
 
-python3 finance_manager/banner.py
 # Check if a subcommand is provided
 if [ $# -lt 1 ]; then
+  # The banner starts a separate interpreter, so only show it with the usage text
+  python3 finance_manager/banner.py
   echo "Usage: ./fm.sh [COMMAND]"
   echo ""
   echo "Available Commands:"
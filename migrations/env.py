@@ -1,9 +1,11 @@
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
+from dotenv import load_dotenv
 
 from finance_manager.models import Base
 
@@ -11,6 +13,12 @@ from finance_manager.models import Base
 # access to the values within the .ini file in use.
 config = context.config
 
+load_dotenv()
+
+# FM_DATABASE_URL points the app at another database; migrate that one too
+if os.getenv("FM_DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["FM_DATABASE_URL"].replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -0,0 +1,67 @@
+"""Add budget periods and period totals
+
+Revision ID: 0095691a1666
+Revises: 76006e5de4b6
+Create Date: 2026-10-17 14:21:09.406215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0095691a1666'
+down_revision: Union[str, None] = '76006e5de4b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# First day of the day, week (from Monday) and month containing `timestamp`
+BUCKET_STARTS = {
+    'sqlite': {
+        'day': "date(timestamp)",
+        'week': "date(timestamp, '-' || ((CAST(strftime('%w', timestamp) AS INTEGER) + 6) % 7) || ' days')",
+        'month': "date(timestamp, 'start of month')",
+    },
+    'postgresql': {
+        'day': "CAST(timestamp AS DATE)",
+        'week': "CAST(date_trunc('week', timestamp) AS DATE)",
+        'month': "CAST(date_trunc('month', timestamp) AS DATE)",
+    },
+}
+
+
+def upgrade() -> None:
+    op.add_column('budgets', sa.Column('period', sa.String(length=10), server_default='monthly', nullable=False))
+    op.add_column('budgets', sa.Column('starts_on', sa.Date(), nullable=True))
+    op.add_column('budgets', sa.Column('ends_on', sa.Date(), nullable=True))
+    op.create_table('period_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=10), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('start', sa.Date(), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'category_id', 'type', 'period', 'start')
+    )
+    # Backfill the buckets from the existing transactions
+    for period, start in BUCKET_STARTS[op.get_bind().dialect.name].items():
+        op.execute(f"""
+            INSERT INTO period_totals (user_id, category_id, type, period, start, amount, count)
+            SELECT user_id, category_id, type, '{period}', {start}, SUM(amount), COUNT(*)
+            FROM transactions
+            WHERE timestamp IS NOT NULL
+            GROUP BY user_id, category_id, type, {start}
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('period_totals')
+    with op.batch_alter_table('budgets') as batch_op:
+        batch_op.drop_column('ends_on')
+        batch_op.drop_column('starts_on')
+        batch_op.drop_column('period')
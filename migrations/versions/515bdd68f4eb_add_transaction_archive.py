@@ -0,0 +1,37 @@
+"""Add transaction archive
+
+Revision ID: 515bdd68f4eb
+Revises: 0095691a1666
+Create Date: 2026-10-17 16:02:41.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '515bdd68f4eb'
+down_revision: Union[str, None] = '0095691a1666'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('transaction_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transaction_archive_user_month', 'transaction_archive', ['user_id', 'month'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transaction_archive_user_month', table_name='transaction_archive')
+    op.drop_table('transaction_archive')
@@ -0,0 +1,70 @@
+"""Store amounts as integer cents
+
+Revision ID: 76006e5de4b6
+Revises: 46c7bac95a2c
+Create Date: 2026-10-17 13:02:41.730118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '76006e5de4b6'
+down_revision: Union[str, None] = '46c7bac95a2c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows converted per UPDATE
+CHUNK_SIZE = 10000
+
+
+def _convert_in_chunks(table, expression):
+    """Fill amount_new from `expression` one id range at a time."""
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, CHUNK_SIZE):
+        bind.execute(sa.text(f"UPDATE {table} SET amount_new = {expression} WHERE id >= :start AND id < :end"),
+                     {'start': start, 'end': start + CHUNK_SIZE})
+
+
+def _replace_amount(table, type_):
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.drop_column('amount')
+        batch_op.alter_column('amount_new', new_column_name='amount', existing_type=type_, nullable=False)
+
+
+def upgrade() -> None:
+    for table in ('transactions', 'budgets', 'category_totals'):
+        op.add_column(table, sa.Column('amount_new', sa.BigInteger(), nullable=True))
+
+    _convert_in_chunks('transactions', "CAST(ROUND(amount * 100) AS BIGINT)")
+    _convert_in_chunks('budgets', "CAST(ROUND(amount * 100) AS BIGINT)")
+    # Rebuild the running totals from the converted rows so they equal the integer sums exactly
+    op.execute("""
+        UPDATE category_totals SET amount_new = (
+            SELECT COALESCE(SUM(t.amount_new), 0) FROM transactions t
+            WHERE t.user_id = category_totals.user_id
+              AND t.category_id = category_totals.category_id
+              AND t.type = category_totals.type
+        )
+    """)
+
+    for table in ('transactions', 'budgets', 'category_totals'):
+        _replace_amount(table, sa.BigInteger())
+
+
+def downgrade() -> None:
+    for table in ('transactions', 'budgets', 'category_totals'):
+        op.add_column(table, sa.Column('amount_new', sa.Float(), nullable=True))
+
+    _convert_in_chunks('transactions', "amount / 100.0")
+    _convert_in_chunks('budgets', "amount / 100.0")
+    op.execute("UPDATE category_totals SET amount_new = amount / 100.0")
+
+    for table in ('transactions', 'budgets', 'category_totals'):
+        _replace_amount(table, sa.Float())
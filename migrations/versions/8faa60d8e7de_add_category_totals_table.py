@@ -0,0 +1,42 @@
+"""Add category totals table
+
+Revision ID: 8faa60d8e7de
+Revises: 5a5dc169a0a0
+Create Date: 2026-10-17 10:03:17.552610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8faa60d8e7de'
+down_revision: Union[str, None] = '5a5dc169a0a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('category_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=10), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'category_id', 'type')
+    )
+    # Backfill the running totals from the existing transactions
+    op.execute("""
+        INSERT INTO category_totals (user_id, category_id, type, amount, count)
+        SELECT user_id, category_id, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, category_id, type
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('category_totals')
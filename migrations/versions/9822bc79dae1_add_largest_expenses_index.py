@@ -0,0 +1,26 @@
+"""Add an index for a user's largest expenses
+
+Revision ID: 9822bc79dae1
+Revises: f629c6887834
+Create Date: 2026-10-17 21:12:40.518309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9822bc79dae1'
+down_revision: Union[str, None] = 'f629c6887834'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_user_type_amount', 'transactions', ['user_id', 'type', 'amount'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_user_type_amount', table_name='transactions')
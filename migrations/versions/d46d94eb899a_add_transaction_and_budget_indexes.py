@@ -0,0 +1,38 @@
+"""Add transaction and budget indexes
+
+Revision ID: d46d94eb899a
+Revises: 8faa60d8e7de
+Create Date: 2026-10-17 10:41:52.907715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd46d94eb899a'
+down_revision: Union[str, None] = '8faa60d8e7de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_user_timestamp', 'transactions', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_transactions_user_category_type', 'transactions', ['user_id', 'category_id', 'type'], unique=False)
+    op.create_index('ix_transactions_category_id', 'transactions', ['category_id'], unique=False)
+
+    # Keep the most recent budget where a user has several for the same category
+    op.execute("""
+        DELETE FROM budgets
+        WHERE id NOT IN (SELECT MAX(id) FROM budgets GROUP BY user_id, category_id)
+    """)
+    op.create_index('uq_budgets_user_category', 'budgets', ['user_id', 'category_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_budgets_user_category', table_name='budgets')
+    op.drop_index('ix_transactions_category_id', table_name='transactions')
+    op.drop_index('ix_transactions_user_category_type', table_name='transactions')
+    op.drop_index('ix_transactions_user_timestamp', table_name='transactions')
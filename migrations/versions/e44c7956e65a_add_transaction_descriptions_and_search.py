@@ -0,0 +1,66 @@
+"""Add transaction descriptions and full-text search index
+
+Revision ID: e44c7956e65a
+Revises: 515bdd68f4eb
+Create Date: 2026-10-17 17:12:08.904317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e44c7956e65a'
+down_revision: Union[str, None] = '515bdd68f4eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The full-text index as of this revision (a copy, so later changes to search.py
+# do not change what this migration does)
+CREATE_STATEMENTS = (
+    # The indexed columns as FTS5 reads them when rebuilding the index
+    """CREATE VIEW IF NOT EXISTS transactions_fts_content AS
+        SELECT id, description, 'u' || user_id AS owner FROM transactions""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, owner, content='transactions_fts_content', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+        INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+)
+DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TABLE IF EXISTS transactions_fts",
+    "DROP VIEW IF EXISTS transactions_fts_content",
+)
+REBUILD_STATEMENT = "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('description', sa.Text(), nullable=True))
+    if op.get_bind().dialect.name == 'sqlite':
+        # FTS5 index of descriptions, kept in step with `transactions` by triggers
+        for statement in CREATE_STATEMENTS:
+            op.execute(statement)
+        op.execute(REBUILD_STATEMENT)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in DROP_STATEMENTS:
+            op.execute(statement)
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('description')
@@ -0,0 +1,105 @@
+"""Add transaction fingerprints for duplicate detection
+
+Revision ID: f629c6887834
+Revises: e44c7956e65a
+Create Date: 2026-10-17 18:05:31.270664
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f629c6887834'
+down_revision: Union[str, None] = 'e44c7956e65a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Transactions fingerprinted per UPDATE batch
+BATCH_SIZE = 10000
+
+# The full-text index from e44c7956e65a, which the SQLite downgrade has to take
+# down and put back around the table rebuild
+CREATE_STATEMENTS = (
+    # The indexed columns as FTS5 reads them when rebuilding the index
+    """CREATE VIEW IF NOT EXISTS transactions_fts_content AS
+        SELECT id, description, 'u' || user_id AS owner FROM transactions""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, owner, content='transactions_fts_content', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+        INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+)
+DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TABLE IF EXISTS transactions_fts",
+    "DROP VIEW IF EXISTS transactions_fts_content",
+)
+REBUILD_STATEMENT = "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')"
+
+
+def fingerprint(user_id, timestamp, amount, type, description):
+    """The fingerprint of dedupe.py as of this revision."""
+    description = ' '.join((description or '').lower().split())
+    key = f"{user_id}|{timestamp.date().isoformat()}|{amount}|{type}|{description}"
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('fingerprint', sa.BigInteger(), nullable=True))
+
+    # Fingerprint existing transactions, reading past the last id of each batch
+    connection = op.get_bind()
+    transactions = sa.table('transactions', sa.column('id'), sa.column('user_id'), sa.column('timestamp', sa.DateTime),
+                            sa.column('amount'), sa.column('type'), sa.column('description'),
+                            sa.column('fingerprint'))
+    update = transactions.update().where(transactions.c.id == sa.bindparam('row_id')).values(
+        fingerprint=sa.bindparam('value'))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(transactions.c.id, transactions.c.user_id, transactions.c.timestamp, transactions.c.amount,
+                      transactions.c.type, transactions.c.description)
+            .where(transactions.c.id > last_id, transactions.c.timestamp.isnot(None))
+            .order_by(transactions.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(update, [
+            {'row_id': row.id, 'value': fingerprint(row.user_id, row.timestamp, row.amount, row.type, row.description)}
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+    op.create_index('ix_transactions_user_fingerprint', 'transactions', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+    if is_sqlite:
+        # The full-text view and triggers name `transactions`, which the batch
+        # operation below recreates and renames on SQLite
+        for statement in DROP_STATEMENTS:
+            op.execute(statement)
+    op.drop_index('ix_transactions_user_fingerprint', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('fingerprint')
+    if is_sqlite:
+        for statement in CREATE_STATEMENTS:
+            op.execute(statement)
+        op.execute(REBUILD_STATEMENT)
@@ -0,0 +1,104 @@
+"""
+Shared fixtures.
+
+Settings and the database engine are read from the environment when
+finance_manager is imported, so they are pointed at a throwaway directory
+here, before any test module imports the package. Every test starts with
+an empty database and empty in-process caches.
+"""
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+WORKDIR = tempfile.mkdtemp(prefix='fm-tests-')
+os.environ.update({
+    'FM_DATABASE_URL': f"sqlite:///{os.path.join(WORKDIR, 'finance_manager.db')}",
+    'FM_CONFIG_DIR': os.path.join(WORKDIR, 'config'),
+    'FM_REPORT_CACHE_DIR': os.path.join(WORKDIR, 'cache'),
+    'FM_SOCKET': os.path.join(WORKDIR, 'fm.sock'),
+    'FM_CATEGORIZER': 'local',  # never call Gemini
+    'FM_BCRYPT_ROUNDS': '4',
+})
+
+import pytest  # noqa: E402
+from click.testing import CliRunner  # noqa: E402
+
+from finance_manager import analytics, cache, classifier, session  # noqa: E402
+from finance_manager.database import init_db, engine, SessionLocal  # noqa: E402
+from finance_manager.models import Base, User  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def workdir():
+    yield WORKDIR
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session_ = SessionLocal()
+    yield session_
+    session_.close()
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    cache.description_cache.entries.clear()
+    cache.description_cache.stats = cache.CacheStats()
+    classifier._classifier = None
+    analytics._memory.clear()
+    shutil.rmtree(analytics.SNAPSHOT_DIR, ignore_errors=True)
+    session.clear()
+
+
+def make_user(db, name='Wanjiku', email='wanjiku@example.com'):
+    """
+    A new user, detached from the session: reading an attribute of an
+    attached object after a commit would begin a write transaction and keep
+    the commands under test waiting for the lock.
+    """
+    user = User(name=name, email=email, password_hash='!')
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def user(db):
+    """A user, logged in for CLI commands."""
+    user = make_user(db)
+    session.save(session.issue(user.id, user.name, user.email))
+    return user
+
+
+@pytest.fixture
+def run_cli():
+    """Run a CLI command with the given lines as its input; returns the output."""
+    from finance_manager.cli import cli
+
+    def run(*args, input=None):
+        result = CliRunner().invoke(cli, list(args), input=input, catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        return result.output
+    return run
+
+
+def statement_row(date, amount, description='Lunch', category='Food', type='expense'):
+    """A row as read from a CSV statement."""
+    return {'date': date, 'description': description, 'amount': amount, 'type': type, 'category': category}
+
+
+class FakeModel:
+    """Answers every prompt with the same text."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, parts, generation_config=None, request_options=None):
+        self.calls += 1
+        return SimpleNamespace(text=self.text)
@@ -0,0 +1,35 @@
+import threading
+import time
+
+from finance_manager.ai_client import AIClient
+
+
+class SlowModel:
+    """Counts the calls in flight at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def generate_content(self, parts, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return parts
+
+
+def test_concurrency_bounds_calls_from_any_thread():
+    model = SlowModel()
+    client = AIClient(model, concurrency=2, rate=1000, burst=100)
+    threads = [threading.Thread(target=client.generate, args=(['hello'],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert model.most == 2
+    assert client.generate_many([['a'], ['b'], ['c']]) == [['a'], ['b'], ['c']]
+    assert model.most == 2
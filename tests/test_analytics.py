@@ -0,0 +1,41 @@
+from finance_manager import analytics
+from finance_manager.database import create_db_engine
+from finance_manager.importer import import_transactions
+from finance_manager.models import Base, User
+from sqlalchemy.orm import Session
+
+from conftest import make_user, statement_row
+
+
+def test_columns_are_reloaded_when_transactions_change(db, user):
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100')]))
+    loaded = db.get(User, user.id)
+    assert analytics.load_columns(db, loaded).amount.tolist() == [10000]
+
+    import_transactions(db, user.id, iter([statement_row('2024-03-02', '50')]))
+    db.refresh(loaded)
+    assert sorted(analytics.load_columns(db, loaded).amount.tolist()) == [5000, 10000]
+
+
+def test_databases_do_not_share_snapshots(db, user, tmp_path):
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100')]))
+    analytics.load_columns(db, db.get(User, user.id))
+    db.commit()
+
+    # Another database whose user has the same id and data version
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as other:
+        other.add(User(id=user.id, name='Otieno', email='otieno@example.com', password_hash='!',
+                       data_version=db.get(User, user.id).data_version))
+        other.commit()
+        assert analytics.load_columns(other, other.get(User, user.id)).amount.tolist() == []
+    engine.dispose()
+
+
+def test_memory_keeps_the_most_recent_users(db, monkeypatch):
+    monkeypatch.setattr(analytics, 'MEMORY_SIZE', 2)
+    users = [make_user(db, f"user {n}", f"user{n}@example.com") for n in range(3)]
+    for user in users + users[:1]:
+        analytics.load_columns(db, db.get(User, user.id))
+    assert [user_id for _, user_id, _ in analytics._memory] == [users[2].id, users[0].id]
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from finance_manager import budgets
+from finance_manager.importer import import_transactions
+from finance_manager.models import Budget, Category
+
+from conftest import statement_row
+
+
+@pytest.mark.parametrize('period, day, bounds', [
+    ('weekly', date(2024, 3, 6), (date(2024, 3, 4), date(2024, 3, 11))),  # Wednesday
+    ('weekly', date(2024, 3, 4), (date(2024, 3, 4), date(2024, 3, 11))),  # Monday
+    ('weekly', date(2024, 3, 10), (date(2024, 3, 4), date(2024, 3, 11))),  # Sunday
+    ('weekly', date(2024, 12, 31), (date(2024, 12, 30), date(2025, 1, 6))),
+    ('monthly', date(2024, 2, 29), (date(2024, 2, 1), date(2024, 3, 1))),
+    ('monthly', date(2024, 12, 31), (date(2024, 12, 1), date(2025, 1, 1))),
+])
+def test_period_bounds(period, day, bounds):
+    assert budgets.period_bounds(Budget(period=period), day) == bounds
+
+
+def test_custom_periods_include_their_last_day():
+    budget = Budget(period='custom', starts_on=date(2024, 3, 15), ends_on=date(2024, 4, 14))
+    assert budgets.period_bounds(budget, date(2025, 1, 1)) == (date(2024, 3, 15), date(2024, 4, 15))
+    assert budgets.period_bounds(Budget(period='custom'), date(2024, 3, 15)) is None
+
+
+def test_spending_counts_only_the_period_containing_the_day(db, user):
+    import_transactions(db, user.id, iter([
+        statement_row('2024-02-29 23:59:59', '100'),
+        statement_row('2024-03-01 00:00:00', '200'),
+        statement_row('2024-03-03 12:00:00', '400'),  # Sunday
+        statement_row('2024-03-04 08:00:00', '800'),  # Monday
+        statement_row('2024-03-31 23:59:59', '1600'),
+        statement_row('2024-04-01 00:00:00', '3200'),
+        statement_row('2024-03-10', '50000', 'Salary', 'Food', 'income'),
+        statement_row('2024-03-10', '6400', 'Taxi', 'Transport'),
+    ]))
+    food = db.query(Category.id).filter(Category.name == 'Food').scalar()
+
+    def spent(period, day, **dates):
+        return budgets.spent_in_period(db, Budget(user_id=user.id, category_id=food, period=period, **dates), day)
+
+    assert spent('monthly', date(2024, 3, 20)) == (200 + 400 + 800 + 1600) * 100
+    assert spent('monthly', date(2024, 2, 1)) == 100 * 100
+    assert spent('weekly', date(2024, 3, 1)) == (100 + 200 + 400) * 100
+    assert spent('weekly', date(2024, 3, 4)) == 800 * 100
+    assert spent('custom', date(2024, 3, 2), starts_on=date(2024, 3, 1), ends_on=date(2024, 3, 31)) == (
+        (200 + 400 + 800 + 1600) * 100)
+    assert spent('custom', date(2024, 4, 1), starts_on=date(2024, 3, 1), ends_on=date(2024, 3, 31)) is None
+
+
+def test_overview_groups_budgets_by_period(db, user):
+    import_transactions(db, user.id, iter([
+        statement_row('2024-03-05', '300'),
+        statement_row('2024-03-12', '500'),
+        statement_row('2024-03-12', '700', 'Fare', 'Transport'),
+    ]))
+    ids = dict(db.query(Category.name, Category.id))
+    db.add_all([Budget(user_id=user.id, category_id=ids['Food'], amount=100000, period='weekly'),
+                Budget(user_id=user.id, category_id=ids['Transport'], amount=200000, period='monthly')])
+    db.commit()
+
+    assert budgets.overview(db, user.id, date(2024, 3, 13)) == [
+        ('Food', 'week of 2024-03-11', 100000, 50000),
+        ('Transport', '2024-03', 200000, 70000),
+    ]
@@ -0,0 +1,34 @@
+from finance_manager import classifier
+from finance_manager.classifier import LocalClassifier, CONFIDENCE_THRESHOLD, get_classifier
+from finance_manager.importer import import_transactions
+
+from conftest import statement_row
+
+
+def test_learns_from_categorized_transactions(db, user):
+    import_transactions(db, user.id, iter([
+        statement_row('2024-03-01', '2500', 'Java House Westlands', 'Food'),
+        statement_row('2024-03-02', '2500', 'Java House Westlands', 'Food'),
+        statement_row('2024-03-03', '40000', 'Landlord Kilimani', 'Rent'),
+        statement_row('2024-03-04', '300', 'Matatu CBD', 'Transport'),
+        statement_row('2024-03-05', '300', 'Something', 'Uncategorized'),
+    ]))
+    trained = get_classifier(db)
+    category, confidence = trained.predict('JAVA HOUSE westlands #22')
+    assert category == 'Food' and confidence >= CONFIDENCE_THRESHOLD
+    assert trained.predict('landlord kilimani')[0] == 'Rent'
+    assert 'Uncategorized' not in trained.categories
+    assert classifier.get_classifier(db) is trained
+
+
+def test_one_shared_word_is_not_confident():
+    model = LocalClassifier()
+    for _ in range(20):
+        model.learn('payment to the landlord', 'Rent')
+    model.learn('naivas supermarket', 'Groceries')
+
+    category, confidence = model.predict('payment to the landlord')
+    assert category == 'Rent' and confidence >= CONFIDENCE_THRESHOLD
+    category, confidence = model.predict('the quick brown fox')
+    assert category == 'Rent' and confidence < CONFIDENCE_THRESHOLD
+    assert model.predict('unheard of') == (None, 0.0)
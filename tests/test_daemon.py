@@ -0,0 +1,79 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from finance_manager import daemon
+from finance_manager.importer import import_transactions
+
+from conftest import statement_row
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def serve(db):
+    """Start a daemon (in its own process: commands swap sys.stdout) with small output frames."""
+    socket_path = os.environ['FM_SOCKET']
+    process = subprocess.Popen(
+        [sys.executable, '-c', "import finance_manager.daemon as d; d.OUTPUT_CHUNK = 256; d.serve()"],
+        cwd=os.getcwd(), env=dict(os.environ, PYTHONPATH=ROOT), stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(socket_path):
+        assert process.poll() is None and time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+    yield socket_path
+    process.send_signal(signal.SIGINT)
+    process.wait(10)
+
+
+def test_output_is_streamed_in_frames(serve, db, user, run_cli, capsys, monkeypatch):
+    import_transactions(db, user.id, iter([statement_row(f"2024-03-{day:02}", '100', f"item {day}")
+                                           for day in range(1, 29)]))
+    frames = []
+    receive = daemon._receive
+
+    def counting_receive(sock):
+        frame = receive(sock)
+        frames.append(frame)
+        return frame
+    monkeypatch.setattr(daemon, '_receive', counting_receive)
+
+    assert daemon.forward(['transactions'], serve) == 0
+    output = capsys.readouterr().out
+    assert output == run_cli('transactions')
+    assert len([frame for frame in frames if 'text' in frame]) > 1
+    assert frames[-1] == {'exit_code': 0}
+
+
+def test_exit_codes_and_errors_come_back(serve, capsys):
+    assert daemon.forward(['no-such-command'], serve) == 2
+    assert "No such command" in capsys.readouterr().err
+
+
+def test_profile_variables_become_options(monkeypatch):
+    monkeypatch.setenv('FM_PROFILE', 'true')
+    monkeypatch.setenv('FM_PROFILE_JSON', 'profile.json')
+    monkeypatch.delenv('FM_PROFILE_DUMP', raising=False)
+    assert daemon._with_profile_options(['report', '--months', '3']) == [
+        '--profile', '--profile-json', 'profile.json', 'report', '--months', '3']
+    monkeypatch.setenv('FM_PROFILE', '0')
+    monkeypatch.delenv('FM_PROFILE_JSON')
+    assert daemon._with_profile_options(['report']) == ['report']
+
+
+def test_profiles_of_forwarded_commands(serve, user, capsys, monkeypatch):
+    monkeypatch.setenv('FM_PROFILE', '1')
+    assert daemon.forward(['transactions'], serve) == 0
+    assert "Profile of 'transactions'" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('name, value', [('FM_DATABASE_URL', 'sqlite:///other.db'), ('FM_CATEGORIZER', 'gemini'),
+                                         ('FM_CONFIG_DIR', '/tmp/other-config')])
+def test_clients_with_other_settings_run_commands_themselves(serve, capsys, monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+    assert daemon.forward(['transactions'], serve) is None
+    assert capsys.readouterr().out == ''
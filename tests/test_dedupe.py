@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import numpy as np
+
+from finance_manager import dedupe
+from finance_manager.importer import import_transactions
+from finance_manager.models import Transaction
+
+from conftest import statement_row
+
+
+def test_fingerprints_ignore_case_spacing_and_time_of_day():
+    fingerprint = dedupe.fingerprint(1, datetime(2024, 3, 5, 9), 45000, 'expense', 'Naivas  Supermarket')
+    assert fingerprint == dedupe.fingerprint(1, datetime(2024, 3, 5, 18), 45000, 'expense', ' naivas supermarket')
+    assert fingerprint != dedupe.fingerprint(2, datetime(2024, 3, 5, 9), 45000, 'expense', 'Naivas Supermarket')
+    assert fingerprint != dedupe.fingerprint(1, datetime(2024, 3, 6, 9), 45000, 'expense', 'Naivas Supermarket')
+    assert fingerprint != dedupe.fingerprint(1, datetime(2024, 3, 5, 9), 45001, 'expense', 'Naivas Supermarket')
+    assert fingerprint != dedupe.fingerprint(1, datetime(2024, 3, 5, 9), 45000, 'income', 'Naivas Supermarket')
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    rng = np.random.default_rng(0)
+    added, other = rng.integers(-2**63, 2**63 - 1, size=(2, 20000), dtype=np.int64)
+    bloom = dedupe.BloomFilter(len(added), error_rate=0.01)
+    bloom.add(added)
+    assert bloom.might_contain(added).all()
+    assert bloom.might_contain(other).mean() < 0.03
+
+
+def test_imports_skip_rows_already_imported(db, user):
+    march = [statement_row('2024-03-01', '100', 'Bread'), statement_row('2024-03-02', '250', 'Milk')]
+    assert import_transactions(db, user.id, iter(march)) == (2, 0, 0)
+
+    overlapping = [statement_row('2024-03-02 17:45', '250', 'MILK'), statement_row('2024-03-03', '90', 'Eggs')]
+    assert import_transactions(db, user.id, iter(overlapping), chunk_size=1) == (1, 0, 1)
+    assert db.query(Transaction).count() == 3
+
+    assert import_transactions(db, user.id, iter(overlapping), keep_duplicates=True) == (2, 0, 2)
+    assert db.query(Transaction).count() == 5
+
+
+def test_same_day_repeats_in_a_statement_are_imported(db, user):
+    fares = [statement_row('2024-03-04 07:30', '50', 'Matatu'), statement_row('2024-03-04 18:10', '50', 'matatu')]
+    assert import_transactions(db, user.id, iter(fares), chunk_size=1) == (2, 0, 0)
+    assert db.query(Transaction).count() == 2
+
+    # Re-importing the statement with a third fare adds only the surplus
+    fares.append(statement_row('2024-03-04 21:00', '50', 'MATATU'))
+    assert import_transactions(db, user.id, iter(fares), chunk_size=2) == (1, 0, 2)
+    assert import_transactions(db, user.id, iter(fares)) == (0, 0, 3)
+    assert db.query(Transaction).count() == 3
+
+
+def test_duplicate_filter_confirms_bloom_hits(db, user):
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100', 'Bread')]))
+    known = db.query(Transaction.fingerprint).scalar()
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100', 'Bread')]), keep_duplicates=True)
+    duplicate_filter = dedupe.DuplicateFilter(db, user.id)
+    assert duplicate_filter.stored_counts([known, known + 1]) == {known: 2}
+    assert dedupe.find_duplicate(db, user.id, known).id in {id for id, in db.query(Transaction.id)}
+
+
+def test_adding_a_duplicate_asks_first(db, user, run_cli):
+    assert 'Transaction added' in run_cli('add-transaction', input="Lunch\n450\nexpense\n")
+    assert 'Transaction not added' in run_cli('add-transaction', input="lunch \n450\nexpense\n\n")
+    assert 'Transaction added' in run_cli('add-transaction', input="LUNCH\n450\nexpense\ny\n")
+    assert db.query(Transaction).count() == 2
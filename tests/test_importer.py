@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from finance_manager.importer import import_transactions, normalize_row, parse_timestamp
+from finance_manager.models import Transaction, Category
+
+from conftest import statement_row
+
+
+def test_normalize_row_reads_mpesa_columns():
+    row = normalize_row({'Completion Time': '05/03/2024 14:30', 'Details': 'KPLC prepaid',
+                         'Paid In': '', 'Withdrawn': '1,250.50'})
+    assert row == {'timestamp': datetime(2024, 3, 5, 14, 30), 'description': 'KPLC prepaid',
+                   'amount': 125050, 'type': 'expense', 'category': None}
+
+
+def test_normalize_row_takes_the_type_from_the_sign():
+    assert normalize_row({'date': '2024-03-05', 'description': 'Refund', 'amount': '-300'})['type'] == 'expense'
+    assert normalize_row({'date': '2024-03-05', 'description': 'Salary', 'amount': '300'})['type'] == 'income'
+
+
+@pytest.mark.parametrize('value', ['yesterday', '2024-13-01'])
+def test_parse_timestamp_rejects_unknown_dates(value):
+    with pytest.raises(ValueError):
+        parse_timestamp(value)
+
+
+def test_chunks_with_only_bad_rows_are_skipped(db, user):
+    rows = [
+        statement_row('2024-03-01', '100', 'Bread'),
+        statement_row('2024-03-02', '200', 'Milk'),
+        statement_row('not a date', '300'),
+        statement_row('2024-03-04', ''),
+        statement_row('2024-03-05', '500', 'Eggs'),
+    ]
+    assert import_transactions(db, user.id, iter(rows), chunk_size=2) == (3, 2, 0)
+
+    stored = db.query(Transaction.amount, Transaction.description, Category.name).join(Category).filter(
+        Transaction.user_id == user.id).order_by(Transaction.timestamp).all()
+    assert [tuple(row) for row in stored] == [(10000, 'Bread', 'Food'), (20000, 'Milk', 'Food'),
+                                              (50000, 'Eggs', 'Food')]
+
+
+def test_chunks_committed_before_a_failure_are_kept(db, user):
+    def failing():
+        yield statement_row('2024-03-01', '100', 'Bread')
+        yield statement_row('2024-03-02', '200', 'Milk')
+        yield statement_row('2024-03-03', '300', 'Eggs')
+        raise RuntimeError("statement unreadable")
+
+    with pytest.raises(RuntimeError):
+        import_transactions(db, user.id, failing(), chunk_size=2)
+    assert db.query(Transaction).filter(Transaction.user_id == user.id).count() == 2
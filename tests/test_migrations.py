@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from finance_manager.database import MIGRATION_HEAD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The tables the first revision starts from
+BASELINE = """
+CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL,
+                    email VARCHAR(100) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL);
+CREATE TABLE categories (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(50) NOT NULL UNIQUE);
+CREATE TABLE transactions (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+                           category_id INTEGER NOT NULL REFERENCES categories (id), amount FLOAT NOT NULL,
+                           type VARCHAR(10) NOT NULL, timestamp DATETIME);
+INSERT INTO users VALUES (1, 'Wanjiku', 'wanjiku@example.com', '!');
+INSERT INTO categories VALUES (1, 'Food'), (2, 'Salary');
+INSERT INTO transactions VALUES (1, 1, 1, 250.5, 'expense', '2024-03-01 12:00:00.000000'),
+                                (2, 1, 2, 30000.1, 'income', '2024-03-02 09:00:00.000000');
+"""
+
+
+def alembic_config(path, monkeypatch):
+    """Config migrating the SQLite database at `path`, created with the baseline tables."""
+    with sqlite3.connect(path) as connection:
+        connection.executescript(BASELINE)
+    # env.py takes the database from FM_DATABASE_URL
+    monkeypatch.setenv('FM_DATABASE_URL', f"sqlite:///{path}")
+    config = Config()
+    config.set_main_option('script_location', os.path.join(ROOT, 'migrations'))
+    return config
+
+
+def tables(path):
+    with sqlite3.connect(path) as connection:
+        return {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_the_whole_chain_upgrades_and_downgrades(tmp_path, monkeypatch):
+    path = str(tmp_path / 'finance_manager.db')
+    config = alembic_config(path, monkeypatch)
+    command.upgrade(config, 'head')
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT id, amount FROM transactions ORDER BY id").fetchall() == [
+            (1, 25050), (2, 3000010)]
+        assert connection.execute("SELECT count(*) FROM transactions WHERE fingerprint IS NOT NULL").fetchone() == (2,)
+        connection.execute("UPDATE transactions SET description = 'Lunch at Java' WHERE id = 1")
+        assert connection.execute(
+            "SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH 'java'").fetchall() == [(1,)]
+
+    command.downgrade(config, 'base')
+    assert tables(path) == {'users', 'categories', 'transactions', 'alembic_version'}
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT id, amount FROM transactions ORDER BY id").fetchall() == [
+            (1, 250.5), (2, 30000.1)]
+
+    command.upgrade(config, 'head')
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT count(*) FROM transactions_fts").fetchone() == (2,)
+        assert connection.execute("PRAGMA integrity_check").fetchone() == ('ok',)
+
+
+def test_the_app_expects_the_latest_migration():
+    config = Config()
+    config.set_main_option('script_location', os.path.join(ROOT, 'migrations'))
+    assert ScriptDirectory.from_config(config).get_current_head() == MIGRATION_HEAD
+
+
+def test_databases_behind_the_migrations_are_not_touched(tmp_path, monkeypatch):
+    path = str(tmp_path / 'finance_manager.db')
+    config = alembic_config(path, monkeypatch)
+    command.upgrade(config, '6971390d6219')
+
+    def check_plans():
+        # A new process, so init_db sees the database from FM_DATABASE_URL
+        return subprocess.run([sys.executable, '-m', 'finance_manager.query_plans'], capture_output=True, text=True,
+                              cwd=str(tmp_path), env=dict(os.environ, PYTHONPATH=ROOT))
+    result = check_plans()
+    assert result.returncode == 1
+    assert 'Run `alembic upgrade head` first.' in result.stdout
+    assert 'category_cache' not in tables(path)
+
+    command.upgrade(config, 'head')
+    assert check_plans().returncode == 0
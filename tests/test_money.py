@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+import pytest
+
+from finance_manager.money import to_cents, from_cents, format_amount
+
+
+@pytest.mark.parametrize('value, cents', [
+    ('1,250.50', 125050), ('0.1', 10), (0.1, 10), (1250, 125000), (Decimal('19.995'), 2000),
+    ('-300', -30000), (' 7.05 ', 705), (1.005, 101), ('92233720368547758.07', 2 ** 63 - 1),
+    ('-92233720368547758.08', -2 ** 63),
+])
+def test_to_cents(value, cents):
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize('value', ['abc', '', 'nan', 'inf', None, '1e400', 1e300, '92233720368547758.08',
+                                   '-92233720368547758.09'])
+def test_to_cents_rejects_non_amounts(value):
+    with pytest.raises(ValueError):
+        to_cents(value)
+
+
+def test_sums_of_cents_are_exact():
+    assert sum(to_cents('0.10') for _ in range(10)) == to_cents('1.00')
+
+
+def test_formatting():
+    assert format_amount(125050) == '1250.50'
+    assert format_amount(-5) == '-0.05'
+    assert from_cents(125050) == Decimal('1250.50')
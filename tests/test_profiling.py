@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from finance_manager import profiling
+from finance_manager.database import engine
+
+
+@pytest.fixture
+def profile():
+    profiling.start('test')
+    yield profiling._current
+    profiling._current = None
+
+
+def test_failed_statements_do_not_skew_later_timings(profile):
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM no_such_table"))
+        assert connection.info['fm_query_started'] == []
+        connection.execute(text("SELECT 1"))
+    assert profile.queries['SELECT 1'][0] == 1
@@ -0,0 +1,25 @@
+import pytest
+
+from finance_manager import query_plans
+
+
+@pytest.mark.parametrize('name', list(query_plans.HOT_QUERIES))
+def test_hot_queries_use_indexes(db, name):
+    plan = query_plans.explain(db, query_plans.HOT_QUERIES[name](db))
+    assert plan and not query_plans.full_scans(plan) and not query_plans.unindexed_sorts(plan), plan
+
+
+def test_full_scans_are_reported():
+    assert query_plans.full_scans(['SCAN transactions', 'SCAN transactions USING INDEX ix_transactions_user_timestamp',
+                                   'SCAN categories']) == ['SCAN transactions']
+
+
+def test_sorts_of_transaction_ranges_are_reported():
+    sort = 'USE TEMP B-TREE FOR ORDER BY'
+    assert query_plans.unindexed_sorts(['SEARCH transactions USING INDEX ix_transactions_user_timestamp (user_id=?)',
+                                        sort]) == [sort]
+    # Rows found by the full-text index arrive by id and are sorted by rank
+    assert query_plans.unindexed_sorts(['SCAN transactions_fts VIRTUAL TABLE INDEX 0:M2',
+                                        'SEARCH transactions USING INTEGER PRIMARY KEY (rowid=?)', sort]) == []
+    assert query_plans.unindexed_sorts(['SEARCH budgets USING INDEX uq_budgets_user_category (user_id=?)',
+                                        sort]) == []
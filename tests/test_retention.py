@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+from finance_manager import retention
+from finance_manager.importer import import_transactions
+from finance_manager.models import Transaction, TransactionArchive
+
+from conftest import statement_row
+
+
+def test_months_ago():
+    assert retention.months_ago(0, date(2024, 3, 15)) == date(2024, 3, 1)
+    assert retention.months_ago(3, date(2024, 2, 29)) == date(2023, 11, 1)
+
+
+def test_archive_moves_transactions_and_keeps_them_readable(db, user):
+    import_transactions(db, user.id, iter([
+        statement_row('2023-12-31 23:00:00', '100', 'Bread'),
+        statement_row('2024-01-15 08:30:00', '200', 'Milk'),
+        statement_row('2024-02-01 00:00:00', '300', 'Eggs'),
+    ]))
+    ids = dict(db.query(Transaction.description, Transaction.id))
+
+    moved, size = retention.archive_transactions(db, user.id, date(2024, 2, 1), batch_size=1)
+    assert moved == 2 and size > 0
+    assert [description for description, in db.query(Transaction.description)] == ['Eggs']
+    assert sorted(month for month, in db.query(TransactionArchive.month)) == [date(2023, 12, 1), date(2024, 1, 1)]
+
+    archived = sorted(retention.iter_archived(db, user.id))
+    assert [(row[0], row[1], row[3], row[4], row[5]) for row in archived] == [
+        (ids['Bread'], (datetime(2023, 12, 31, 23) - retention.EPOCH) // retention.MICROSECOND, 'expense', 10000,
+         'Bread'),
+        (ids['Milk'], (datetime(2024, 1, 15, 8, 30) - retention.EPOCH) // retention.MICROSECOND, 'expense', 20000,
+         'Milk'),
+    ]
+
+
+def test_deleting_a_range_keeps_the_rest(db, user):
+    import_transactions(db, user.id, iter([statement_row(f"2024-03-{day:02}", '100', f"item {day}")
+                                           for day in range(1, 21)]))
+    deleted = retention.delete_transactions(db, user.id, since=datetime(2024, 3, 5), until=datetime(2024, 3, 10),
+                                            batch_size=2)
+    assert deleted == 5
+    assert db.query(Transaction).count() == 15
+
+
+def test_deleting_everything_drops_the_archive(db, user):
+    import_transactions(db, user.id, iter([statement_row('2023-01-01', '100'), statement_row('2024-01-01', '100')]))
+    retention.archive_transactions(db, user.id, date(2023, 6, 1))
+    assert retention.delete_transactions(db, user.id) == 1
+    assert not db.query(TransactionArchive).count()
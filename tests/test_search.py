@@ -0,0 +1,42 @@
+from finance_manager import retention, search
+from finance_manager.importer import import_transactions
+from finance_manager.models import Transaction
+
+from conftest import make_user, statement_row
+
+
+def found(db, user_id, text):
+    return [row.description for row in search.search(db, user_id, text)]
+
+
+def test_every_word_matches_as_a_prefix(db, user):
+    import_transactions(db, user.id, iter([
+        statement_row('2024-03-01', '100', 'KPLC prepaid payment'),
+        statement_row('2024-03-02', '100', 'Café Java'),
+        statement_row('2024-03-03', '100', 'Naivas supermarket'),
+    ]))
+    assert found(db, user.id, 'kpl pay') == ['KPLC prepaid payment']
+    assert found(db, user.id, 'cafe') == ['Café Java']
+    assert found(db, user.id, 'kplc naivas') == []
+    assert found(db, user.id, '"*') == []
+
+
+def test_users_only_find_their_own_transactions(db, user):
+    other = make_user(db, 'Otieno', 'otieno@example.com')
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100', 'Rent March')]))
+    import_transactions(db, other.id, iter([statement_row('2024-03-01', '100', 'Rent April')]))
+    assert found(db, user.id, 'rent') == ['Rent March']
+    assert found(db, other.id, 'rent') == ['Rent April']
+
+
+def test_the_index_follows_updates_and_deletes(db, user):
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100', 'Matatu fare'),
+                                           statement_row('2024-03-02', '100', 'Matatu to work')]))
+    transaction = db.query(Transaction).filter(Transaction.description == 'Matatu fare').one()
+    transaction.description = 'Uber fare'
+    db.commit()
+    assert found(db, user.id, 'matatu') == ['Matatu to work']
+    assert found(db, user.id, 'uber') == ['Uber fare']
+
+    retention.delete_transactions(db, user.id)
+    assert found(db, user.id, 'fare') == []
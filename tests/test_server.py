@@ -0,0 +1,198 @@
+import asyncio
+import json
+
+import pytest
+
+from finance_manager import ai, server, session
+from finance_manager.ai_client import AIClient
+from finance_manager.importer import import_transactions
+
+from conftest import FakeModel, statement_row
+
+
+async def _exchange(port, method, path, body, token):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = body if isinstance(body, bytes) else b'' if body is None else json.dumps(body).encode('utf-8')
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    writer.write(head.encode('latin-1') + b"\r\n" + data)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def _send(requests):
+    listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        return await asyncio.gather(*(_exchange(port, *request) for request in requests))
+
+
+def send(*requests):
+    """Send (method, path, body, token) requests to the API at once; (status, payload) for each."""
+    return asyncio.run(_send(requests))
+
+
+def call(method, path, body=None, token=None):
+    return send((method, path, body, token))[0]
+
+
+@pytest.fixture
+def api(db):
+    server.pools = server.Pools()
+    yield
+    server.pools.shutdown()
+    server.pools = None
+
+
+@pytest.fixture
+def token(user):
+    return session.issue(user.id, user.name, user.email)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    def install(text):
+        fake = FakeModel(text)
+        monkeypatch.setattr(ai, 'client', AIClient(fake))
+        return fake
+    return install
+
+
+def test_requests_need_a_valid_token(api, token):
+    assert call('GET', '/transactions')[0] == 401
+    assert call('GET', '/transactions', token=token[:-2] + 'xx')[0] == 401
+    assert call('GET', '/transactions', token=token) == (200, {'transactions': []})
+
+
+def test_unknown_paths_and_methods(api):
+    assert call('GET', '/nowhere') == (404, {'error': "No endpoint /nowhere."})
+    assert call('DELETE', '/budgets') == (405, {'error': "Use GET or PUT for /budgets."})
+    assert call('GET', '/health') == (200, {'status': 'ok'})
+
+
+def test_bodies_are_validated(api, token):
+    assert call('POST', '/transactions', b'{not json', token) == (400, {'error': "Request body is not valid JSON."})
+    assert call('POST', '/transactions', {'amount': 5, 'type': 'expense'}, token) == (
+        400, {'error': "Missing fields: description."})
+    assert call('POST', '/transactions', {'description': 'x', 'amount': 'abc', 'type': 'expense'}, token)[0] == 400
+    for amount in ['1e400', 1e300, float('inf'), '-92233720368547758.09']:
+        assert call('POST', '/transactions', {'description': 'x', 'amount': amount, 'type': 'expense'}, token)[0] == 400
+    assert call('POST', '/transactions', {'description': 'x', 'amount': 5, 'type': 'gift'}, token)[0] == 400
+
+
+def test_adding_and_listing_transactions(api, token):
+    status, added = call('POST', '/transactions', {'description': 'KPLC tokens', 'amount': '1500.50',
+                                                   'type': 'expense', 'category': 'utilities'}, token)
+    assert status == 201
+    assert (added['amount'], added['category'], added['description']) == (1500.5, 'Utilities', 'KPLC tokens')
+
+    status, duplicate = call('POST', '/transactions', {'description': 'kplc  TOKENS', 'amount': 1500.5,
+                                                       'type': 'expense', 'category': 'Utilities'}, token)
+    assert status == 409 and duplicate['duplicate_of'] == added['id']
+    assert call('POST', '/transactions', {'description': 'kplc tokens', 'amount': 1500.5, 'type': 'expense',
+                                          'category': 'Utilities', 'allow_duplicate': True}, token)[0] == 201
+
+    status, listed = call('GET', '/transactions?type=expense&limit=1', token=token)
+    assert status == 200
+    assert [(row['id'], row['amount'], row['category']) for row in listed['transactions']] == [
+        (added['id'], 1500.5, 'Utilities')]
+
+
+def test_budgets_report_spending_in_their_period(api, token):
+    assert call('PUT', '/budgets', {'category': 'Food', 'amount': 1000}, token)[0] == 404
+    call('POST', '/transactions', {'description': 'Lunch', 'amount': 300, 'type': 'expense', 'category': 'Food'}, token)
+
+    assert call('PUT', '/budgets', {'category': 'Food', 'amount': 1000, 'period': 'weekly'}, token)[0] == 200
+    assert call('PUT', '/budgets', {'category': 'Food', 'amount': 1000, 'period': 'custom',
+                                    'starts_on': '2024-03-02', 'ends_on': '2024-03-01'}, token)[0] == 400
+    status, payload = call('GET', '/budgets', token=token)
+    assert status == 200
+    assert payload['budgets'][0]['category'] == 'Food'
+    assert (payload['budgets'][0]['spent'], payload['budgets'][0]['remaining']) == (300, 700)
+
+    status, added = call('POST', '/transactions', {'description': 'Dinner', 'amount': 800, 'type': 'expense',
+                                                   'category': 'Food'}, token)
+    assert added['budget'] == {'period': 'weekly', 'amount': 1000, 'spent': 1100, 'remaining': -100}
+
+
+def test_advice_is_generated_once_per_data_version(api, db, user, token, model):
+    assert call('GET', '/advice', token=token)[0] == 404
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100'),
+                                           statement_row('2024-03-02', '5000', 'Salary', 'Salary', 'income')]))
+    fake = model(json.dumps({'analysis': 'Fine.', 'advice': ['Save more']}))
+
+    assert call('GET', '/advice', token=token) == (200, {'analysis': 'Fine.', 'advice': ['Save more']})
+    assert call('GET', '/advice', token=token)[0] == 200
+    assert fake.calls == 1
+
+
+def test_simulation(api, db, user, token):
+    assert call('POST', '/simulate', {}, token)[0] == 404
+    import_transactions(db, user.id, iter(
+        [statement_row(f"2024-{month:02}-01", '30000', 'Salary', 'Salary', 'income') for month in range(1, 13)]
+        + [statement_row(f"2024-{month:02}-05", '12000', 'Rent', 'Rent') for month in range(1, 13)]))
+
+    status, result = call('POST', '/simulate', {'salary_change': -10, 'months': 6, 'paths': 200, 'seed': 1,
+                                                'cuts': [{'category': 'rent', 'percent': 50}]}, token)
+    assert status == 200
+    assert len(result['months']) == 6 and set(result['baseline']) == {'p5', 'p25', 'p50', 'p75', 'p95'}
+    assert result['scenario'] == "income -10%; rent cut by 50%"
+    assert call('POST', '/simulate', {'salary_change': -10, 'months': 6, 'paths': 200, 'seed': 1,
+                                      'cuts': [{'category': 'rent', 'percent': 50}]}, token)[1] == result
+
+    status, error = call('POST', '/simulate', {'cuts': [{'category': 'Yachts', 'percent': 10}]}, token)
+    assert status == 400 and error['categories'] == ['Rent', 'Salary']
+    assert call('POST', '/simulate', {'paths': 10 ** 9}, token)[0] == 400
+
+
+def _bcrypt_works():
+    try:
+        session.hash_password('password')
+    except Exception:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not _bcrypt_works(), reason="passlib cannot use the installed bcrypt")
+def test_signup_and_login(api):
+    status, signed_up = call('POST', '/signup', {'name': 'Amina', 'email': 'amina@example.com',
+                                                 'password': 'correct horse'})
+    assert status == 201 and session.verify(signed_up['token']).email == 'amina@example.com'
+    assert call('POST', '/signup', {'name': 'Amina', 'email': 'amina@example.com', 'password': 'x'})[0] == 409
+
+    assert call('POST', '/login', {'email': 'amina@example.com', 'password': 'wrong'})[0] == 401
+    assert call('POST', '/login', {'email': 'nobody@example.com', 'password': 'wrong'})[0] == 401
+    status, logged_in = call('POST', '/login', {'email': 'amina@example.com', 'password': 'correct horse'})
+    assert status == 200 and logged_in['user']['id'] == signed_up['user']['id']
+
+
+def test_identical_requests_at_once_add_one_transaction(api, token):
+    body = {'description': 'Rent March', 'amount': 40000, 'type': 'expense', 'category': 'Rent'}
+    statuses = sorted(status for status, _ in send(*[('POST', '/transactions', body, token)] * 8))
+    assert statuses == [201] + [409] * 7
+    assert len(call('GET', '/transactions', token=token)[1]['transactions']) == 1
+
+
+def test_unreadable_advice_is_a_bad_gateway(api, db, user, token, model):
+    import_transactions(db, user.id, iter([statement_row('2024-03-01', '100')]))
+    model("Here is some advice: save more.")
+    status, error = call('GET', '/advice', token=token)
+    assert status == 502 and error['error'] == "The model's advice could not be read; try again later."
+    model(json.dumps(['save more']))
+    assert call('GET', '/advice', token=token)[0] == 502
+
+
+def test_unknown_emails_still_check_a_password(api, monkeypatch):
+    checked = []
+    monkeypatch.setattr(server, '_dummy_hash', None)
+    monkeypatch.setattr(session, 'hash_password', lambda password: f"hash of {password}")
+    monkeypatch.setattr(session, 'check_password',
+                        lambda password, hash: checked.append((password, hash)) or (True, None))
+
+    assert call('POST', '/login', {'email': 'nobody@example.com', 'password': 'guess'})[0] == 401
+    assert call('POST', '/login', {'email': 'nobody@example.com', 'password': 'again'})[0] == 401
+    assert checked == [('guess', 'hash of not the password of any user'),
+                       ('again', 'hash of not the password of any user')]
@@ -0,0 +1,39 @@
+from datetime import date
+
+from finance_manager import ai, cli, retention
+from finance_manager.ai_client import AIClient
+from finance_manager.importer import import_transactions
+
+from conftest import FakeModel, statement_row
+
+
+def test_the_starting_balance_includes_archived_transactions(db, user, run_cli):
+    import_transactions(db, user.id, iter(
+        [statement_row(f"2022-{month:02}-01", '1000', 'Salary', 'Salary', 'income') for month in range(1, 13)]
+        + [statement_row(f"2024-{month:02}-01", '30000', 'Salary', 'Salary', 'income') for month in range(1, 13)]
+        + [statement_row(f"2024-{month:02}-05", '12000', 'Rent', 'Rent') for month in range(1, 13)]))
+    retention.archive_transactions(db, user.id, date(2023, 1, 1))
+
+    output = run_cli('simulate', '--months', '3', '--paths', '50')
+    # 12 archived months of 1,000 plus 12 months of 30,000 - 12,000
+    assert "Starting balance: Ksh 228000.00" in output
+
+
+def test_only_the_narration_is_written(db, user, run_cli, monkeypatch):
+    import_transactions(db, user.id, iter([statement_row(f"2024-{month:02}-01", '30000', 'Salary', 'Salary', 'income')
+                                           for month in range(1, 13)]))
+    db.commit()
+    model = FakeModel('Steady income.')
+    monkeypatch.setattr(ai, 'client', AIClient(model))
+    opened = []
+    open_db = cli.open_db
+
+    def recording_open_db(readonly=False):
+        opened.append(readonly)
+        return open_db(readonly)
+    monkeypatch.setattr(cli, 'open_db', recording_open_db)
+
+    for _ in range(2):
+        assert 'Steady income.' in run_cli('simulate', '--months', '3', '--paths', '50', '--narrate')
+    assert opened == [True, False, True, False]
+    assert model.calls == 1
@@ -0,0 +1,140 @@
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from finance_manager import retention, totals
+from finance_manager.importer import import_transactions
+from finance_manager.models import Transaction, CategoryTotal, PeriodTotal
+
+from conftest import make_user, statement_row
+
+
+def rescanned(db, user_id):
+    """The running and period totals recomputed from the user's transactions."""
+    running = defaultdict(lambda: [0, 0])
+    periods = defaultdict(lambda: [0, 0])
+    for category_id, type, amount, timestamp in db.query(
+            Transaction.category_id, Transaction.type, Transaction.amount, Transaction.timestamp).filter(
+            Transaction.user_id == user_id):
+        for totals_row in [running[(category_id, type)]] + [
+                periods[(category_id, type, period, totals.bucket_start(period, timestamp))]
+                for period in totals.PERIODS]:
+            totals_row[0] += amount
+            totals_row[1] += 1
+    return ({key: tuple(value) for key, value in running.items()},
+            {key: tuple(value) for key, value in periods.items()})
+
+
+def stored(db, user_id):
+    """The running and period totals as stored, leaving out buckets that came back to zero."""
+    running = {(row.category_id, row.type): (row.amount, row.count)
+               for row in db.query(CategoryTotal).filter(CategoryTotal.user_id == user_id) if row.count}
+    periods = {(row.category_id, row.type, row.period, row.start): (row.amount, row.count)
+               for row in db.query(PeriodTotal).filter(PeriodTotal.user_id == user_id) if row.count}
+    return running, periods
+
+
+def assert_totals_match(db, user_id):
+    db.commit()  # see what the commands committed
+    assert stored(db, user_id) == rescanned(db, user_id)
+    db.commit()  # and don't hold the write lock the next command needs
+
+
+def random_statement(count, seed=0, start=date(2023, 11, 1), days=200):
+    rng = random.Random(seed)
+    return [statement_row(f"{start + timedelta(days=rng.randrange(days))} {rng.randrange(24):02}:00:00",
+                          f"{rng.randint(100, 90000) / 100:.2f}", f"item {i}",
+                          rng.choice(['Food', 'Rent', 'Transport']), rng.choice(['expense', 'expense', 'income']))
+            for i in range(count)]
+
+
+def test_totals_follow_imports_adds_updates_deletes_and_archiving(db, user, run_cli):
+    import_transactions(db, user.id, iter(random_statement(400)), chunk_size=150)
+    assert_totals_match(db, user.id)
+
+    assert 'Transaction added' in run_cli('add-transaction', input="Matatu to town\n120.50\nexpense\n")
+    assert_totals_match(db, user.id)
+
+    transaction_id = db.query(Transaction.id).filter(Transaction.user_id == user.id).order_by(Transaction.id).first()[0]
+    db.commit()
+    assert 'updated successfully' in run_cli('update-transaction',
+                                             input=f"{transaction_id}\n999.99\nincome\nSide Hustle\n")
+    assert_totals_match(db, user.id)
+
+    retention.delete_transactions(db, user.id, since=datetime(2024, 1, 1), until=datetime(2024, 2, 1), batch_size=7)
+    assert_totals_match(db, user.id)
+
+    food = db.query(Transaction.category_id).filter(Transaction.user_id == user.id).first()[0]
+    retention.delete_transactions(db, user.id, category_id=food, batch_size=50)
+    assert_totals_match(db, user.id)
+
+    moved, _ = retention.archive_transactions(db, user.id, date(2024, 3, 1), batch_size=40)
+    assert moved
+    assert_totals_match(db, user.id)
+
+    retention.delete_transactions(db, user.id, batch_size=100)
+    assert_totals_match(db, user.id)
+    assert not db.query(CategoryTotal).filter(CategoryTotal.user_id == user.id).count()
+    assert not db.query(PeriodTotal).filter(PeriodTotal.user_id == user.id).count()
+
+
+def test_totals_of_other_users_are_left_alone(db, user):
+    other = make_user(db, 'Otieno', 'otieno@example.com')
+    import_transactions(db, user.id, iter(random_statement(50, seed=1)))
+    import_transactions(db, other.id, iter(random_statement(50, seed=2)))
+    retention.delete_transactions(db, user.id)
+    assert_totals_match(db, other.id)
+    assert stored(db, other.id)[0]
+
+
+@pytest.mark.parametrize('start, end', [
+    (date(2024, 1, 1), date(2024, 2, 1)),
+    (date(2024, 1, 17), date(2024, 1, 18)),
+    (date(2023, 12, 30), date(2024, 3, 5)),
+    (date(2024, 2, 5), date(2024, 2, 19)),
+    (date(2023, 11, 1), date(2024, 6, 1)),
+])
+def test_spent_between_equals_a_sum_of_the_days(db, user, start, end):
+    import_transactions(db, user.id, iter(random_statement(300, seed=3)))
+    db.commit()
+    expected = defaultdict(int)
+    for category_id, amount, timestamp in db.query(Transaction.category_id, Transaction.amount,
+                                                   Transaction.timestamp).filter(Transaction.type == 'expense'):
+        if start <= timestamp.date() < end:
+            expected[category_id] += amount
+    category_ids = [category_id for category_id, in db.query(Transaction.category_id).distinct()]
+    spent = totals.spent_between(db, user.id, category_ids, start, end)
+    assert {key: value for key, value in spent.items() if value} == dict(expected)
+
+
+def test_bucket_ranges_cover_each_day_once():
+    start, end = date(2023, 12, 27), date(2024, 4, 9)
+    covered = []
+    for period, low, high in totals.bucket_ranges(start, end):
+        bucket = low
+        while bucket < high:
+            following = totals.next_month(bucket) if period == 'month' else bucket + timedelta(
+                days=7 if period == 'week' else 1)
+            covered += [bucket + timedelta(days=n) for n in range((following - bucket).days)]
+            bucket = following
+    assert sorted(covered) == [start + timedelta(days=n) for n in range((end - start).days)]
+
+
+def test_an_interrupted_delete_leaves_the_rest_counted(db, user, monkeypatch):
+    import_transactions(db, user.id, iter(random_statement(50)))
+    remove = retention._remove
+    batches = []
+
+    def remove_once(*args):
+        if batches:
+            raise KeyboardInterrupt
+        batches.append(args)
+        remove(*args)
+    monkeypatch.setattr(retention, '_remove', remove_once)
+    with pytest.raises(KeyboardInterrupt):
+        retention.delete_transactions(db, user.id, batch_size=20)
+    db.rollback()
+    assert db.query(Transaction).count() == 30
+    assert_totals_match(db, user.id)